@@ -175,6 +175,19 @@ const FiscalNoteGeneration = () => {
     };
   }, []);
 
+  // Subscribe to updates for jobs that are still generating. The server only sends
+  // events to subscribers and replays each job's latest state, so this also catches
+  // up after a reconnect without polling the file list.
+  useEffect(() => {
+    if (!wsConnected || wsRef.current?.readyState !== WebSocket.OPEN) return;
+    const jobIds = fiscalNoteFiles
+      .filter(file => file.status === 'generating')
+      .map(file => file.name);
+    if (jobIds.length > 0) {
+      wsRef.current.send(JSON.stringify({ type: 'subscribe', job_ids: jobIds }));
+    }
+  }, [wsConnected, fiscalNoteFiles]);
+
   const handleCreateFiscalNote = async () => {
     if (!formData.billNumber.trim()) {
       alert('Please enter a bill number');
@@ -140,11 +140,18 @@ export const createUserApi = (getAccessTokenSilently: () => Promise<string>) =>
     },
 
     // Admin endpoints
-    async getAllUsers(skip = 0, limit = 100, activeOnly = true): Promise<UserProfile[]> {
-      const response = await authApi.get('/api/admin/users', {
-        params: { skip, limit, active_only: activeOnly }
-      });
-      return response.data;
+    async getAllUsers(activeOnly = true, pageSize = 500): Promise<UserProfile[]> {
+      // Follow the keyset cursor until the last page so large user lists are never cut off
+      const users: UserProfile[] = [];
+      let afterId: string | undefined;
+      do {
+        const response = await authApi.get('/api/admin/users', {
+          params: { after_id: afterId, limit: pageSize, active_only: activeOnly }
+        });
+        users.push(...response.data);
+        afterId = response.headers['x-next-after-id'];
+      } while (afterId);
+      return users;
     },
 
     async createUser(userData: { email: string; display_name: string; is_admin: boolean; is_super_admin?: boolean }): Promise<UserProfile> {
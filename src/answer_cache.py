@@ -0,0 +1,230 @@
+"""
+Semantic answer cache for /query and /chat-with-pdf.
+
+Staff often ask the same question in slightly different words. Each answer
+costs several LLM calls, so answers are cached by query meaning:
+
+- Entries are scoped by pipeline and by the exact set of collections (plus
+  any parameters that change the answer, such as the threshold).
+- Inside a scope, a query hits when its normalized text matches exactly, or
+  when the cosine similarity of its embedding to a cached query is at least
+  ``similarity_threshold``. A semantic match also needs the same identifiers
+  (tokens containing digits, e.g. bill numbers and years), so "HB727" never
+  answers for "HB728".
+- Entries expire after ``ttl_seconds``. Re-ingesting a collection bumps its
+  generation, which drops every entry that used it. With Redis the
+  generations are shared, so ingestion on one worker invalidates them all.
+"""
+
+import copy
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIMILARITY_THRESHOLD = 0.95
+DEFAULT_TTL_SECONDS = 3600
+DEFAULT_MAX_ENTRIES = 1000
+REDIS_GENERATION_PREFIX = "answer_cache:generation:"
+
+_PUNCTUATION_RE = re.compile(r"[^\w\s]")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase, strip punctuation and collapse whitespace."""
+    return _WHITESPACE_RE.sub(" ", _PUNCTUATION_RE.sub(" ", query.lower())).strip()
+
+
+def _identifiers(normalized_query: str) -> FrozenSet[str]:
+    return frozenset(token for token in normalized_query.split() if any(c.isdigit() for c in token))
+
+
+class _Entry:
+    __slots__ = ("scope", "query", "normalized", "identifiers", "embedding", "result", "created_at", "generations")
+
+    def __init__(self, scope, query, normalized, embedding, result, generations):
+        self.scope = scope
+        self.query = query
+        self.normalized = normalized
+        self.identifiers = _identifiers(normalized)
+        self.embedding = embedding
+        self.result = result
+        self.created_at = time.time()
+        self.generations = generations
+
+
+class SemanticAnswerCache:
+    """Per-worker LRU of answers, matched by normalized query embedding."""
+
+    def __init__(self, embed: Callable[[List[str]], List[List[float]]],
+                 similarity_threshold: float = DEFAULT_SIMILARITY_THRESHOLD,
+                 ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 max_entries: int = DEFAULT_MAX_ENTRIES,
+                 redis_client=None, enabled: bool = True):
+        self.embed = embed
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.redis = redis_client
+        self.enabled = enabled
+        # (scope, normalized query) -> entry, least recently used first
+        self._entries: "OrderedDict[Tuple, _Entry]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        # Embeddings of recent lookups, so a miss followed by store embeds once
+        self._embeddings: "OrderedDict[str, Optional[np.ndarray]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._metrics = {"hits": 0, "semantic_hits": 0, "misses": 0, "stores": 0, "invalidations": 0}
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], embed: Callable, redis_client=None) -> "SemanticAnswerCache":
+        """Build from the "answer_cache" section of config.json."""
+        cache_config = config.get("answer_cache", {})
+        return cls(
+            embed,
+            similarity_threshold=cache_config.get("similarity_threshold", DEFAULT_SIMILARITY_THRESHOLD),
+            ttl_seconds=cache_config.get("ttl_seconds", DEFAULT_TTL_SECONDS),
+            max_entries=cache_config.get("max_entries", DEFAULT_MAX_ENTRIES),
+            redis_client=redis_client,
+            enabled=cache_config.get("enabled", True),
+        )
+
+    @staticmethod
+    def _scope(namespace: str, collections: Iterable[str], params: Optional[Dict[str, Any]]) -> Tuple:
+        return (namespace, frozenset(c for c in collections if c), tuple(sorted((params or {}).items())))
+
+    def _current_generations(self, collections: FrozenSet[str]) -> Tuple[int, ...]:
+        names = sorted(collections)
+        if self.redis is not None and names:
+            try:
+                values = self.redis.mget([f"{REDIS_GENERATION_PREFIX}{name}" for name in names])
+                return tuple(int(value or 0) for value in values)
+            except Exception as e:
+                logger.warning(f"Could not read answer cache generations from Redis: {e}")
+        return tuple(self._generations.get(name, 0) for name in names)
+
+    def _embedding(self, normalized: str) -> Optional[np.ndarray]:
+        with self._lock:
+            if normalized in self._embeddings:
+                self._embeddings.move_to_end(normalized)
+                return self._embeddings[normalized]
+        try:
+            vector = np.asarray(self.embed([normalized])[0], dtype=np.float32)
+            norm = float(np.linalg.norm(vector))
+            # The embedding function returns zero vectors when the API fails
+            vector = vector / norm if norm > 0 else None
+        except Exception as e:
+            logger.warning(f"Answer cache could not embed query: {e}")
+            vector = None
+        with self._lock:
+            self._embeddings[normalized] = vector
+            while len(self._embeddings) > 256:
+                self._embeddings.popitem(last=False)
+        return vector
+
+    def _live(self, entry: _Entry, generations: Tuple[int, ...], now: float) -> bool:
+        return now - entry.created_at <= self.ttl_seconds and entry.generations == generations
+
+    def lookup(self, query: str, namespace: str, collections: Iterable[str],
+               params: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """A copy of the cached result with a ``cache`` block describing the hit, or None."""
+        if not self.enabled:
+            return None
+        scope = self._scope(namespace, collections, params)
+        normalized = normalize_query(query)
+        generations = self._current_generations(scope[1])
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get((scope, normalized))
+            if entry is not None and not self._live(entry, generations, now):
+                del self._entries[(scope, normalized)]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end((scope, normalized))
+                self._metrics["hits"] += 1
+                return self._hit(entry, 1.0, now)
+            candidates = [e for e in self._entries.values()
+                          if e.scope == scope and e.embedding is not None and self._live(e, generations, now)]
+
+        if not candidates:
+            self._count("misses")
+            return None
+        embedding = self._embedding(normalized)
+        if embedding is None:
+            self._count("misses")
+            return None
+
+        similarities = np.vstack([e.embedding for e in candidates]) @ embedding
+        identifiers = _identifiers(normalized)
+        for index in np.argsort(-similarities):
+            if similarities[index] < self.similarity_threshold:
+                break
+            entry = candidates[index]
+            if entry.identifiers == identifiers:
+                with self._lock:
+                    self._metrics["hits"] += 1
+                    self._metrics["semantic_hits"] += 1
+                return self._hit(entry, float(similarities[index]), now)
+        self._count("misses")
+        return None
+
+    def _hit(self, entry: _Entry, similarity: float, now: float) -> Dict[str, Any]:
+        result = copy.deepcopy(entry.result)
+        result["cache"] = {
+            "hit": True,
+            "similarity": round(similarity, 4),
+            "matched_query": entry.query,
+            "age_seconds": round(now - entry.created_at, 1),
+        }
+        return result
+
+    def store(self, query: str, namespace: str, collections: Iterable[str], result: Dict[str, Any],
+              params: Optional[Dict[str, Any]] = None) -> None:
+        if not self.enabled:
+            return
+        scope = self._scope(namespace, collections, params)
+        normalized = normalize_query(query)
+        entry = _Entry(scope, query, normalized, self._embedding(normalized),
+                       copy.deepcopy(result), self._current_generations(scope[1]))
+        with self._lock:
+            self._entries[(scope, normalized)] = entry
+            self._entries.move_to_end((scope, normalized))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._metrics["stores"] += 1
+
+    def invalidate_collection(self, collection: str) -> None:
+        """Drop every answer that used ``collection`` (call after re-ingesting it)."""
+        if self.redis is not None:
+            try:
+                self.redis.incr(f"{REDIS_GENERATION_PREFIX}{collection}")
+            except Exception as e:
+                logger.warning(f"Could not bump answer cache generation in Redis: {e}")
+        with self._lock:
+            self._generations[collection] = self._generations.get(collection, 0) + 1
+            for key in [key for key, entry in self._entries.items() if collection in entry.scope[1]]:
+                del self._entries[key]
+            self._metrics["invalidations"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._embeddings.clear()
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._metrics[name] += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics["entries"] = len(self._entries)
+        metrics["enabled"] = self.enabled
+        return metrics
@@ -1,23 +1,65 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import desc, func
+from typing import Dict, List, Optional
 from pydantic import BaseModel, field_serializer
 from datetime import datetime
 import logging
 import json
 import uuid
+import time
+import threading
 
 from database.connection import get_db
 from database.models import User, Permission, UserPermission, AuditLog
 from auth.middleware import require_admin, require_super_admin, get_current_user
 from auth.permissions import permission_checker
+from auth.token_cache import token_cache
+from auth.audit_sink import audit_sink
 from .auth_helpers import auth0_mgmt
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/admin", tags=["admin"])
 
+# Permissions are seeded by init_db and effectively static, so the admin
+# endpoints resolve permission ids to names from an in-memory table instead
+# of joining the permissions table on every request. Every mutating admin
+# endpoint drops the table (invalidate_user_caches); rows changed outside
+# this process are picked up within PERMISSION_TABLE_TTL_SECONDS.
+PERMISSION_TABLE_TTL_SECONDS = 300
+
+_permission_table: Optional[Dict[int, dict]] = None
+_permission_table_loaded_at = 0.0
+_permission_table_lock = threading.Lock()
+
+def get_permission_table(db: Session) -> Dict[int, dict]:
+    """Permission id -> {name, description, category, created_at}, cached for a few minutes"""
+    global _permission_table, _permission_table_loaded_at
+    with _permission_table_lock:
+        if _permission_table is None or time.monotonic() - _permission_table_loaded_at > PERMISSION_TABLE_TTL_SECONDS:
+            _permission_table = {
+                perm.id: {
+                    "name": perm.name,
+                    "description": perm.description or "",
+                    "category": perm.category,
+                    "created_at": perm.created_at,
+                }
+                for perm in db.query(Permission).order_by(Permission.id).all()
+            }
+            _permission_table_loaded_at = time.monotonic()
+        return _permission_table
+
+def invalidate_permission_table() -> None:
+    global _permission_table
+    with _permission_table_lock:
+        _permission_table = None
+
+def invalidate_user_caches(user_id: int) -> None:
+    """Called after every committed change to a user or their permissions"""
+    token_cache.invalidate_user(user_id)
+    invalidate_permission_table()
+
 def can_admin_manage_permission(admin_user: User, permission_name: str, db: Session) -> bool:
     """
     Check if an admin can manage a specific permission based on hierarchical rules:
@@ -142,47 +184,63 @@ class UpdateUserRequest(BaseModel):
 
 @router.get("/users", response_model=List[UserSummaryWithPermissions])
 async def list_users(
-    skip: int = Query(0, ge=0),
+    response: Response,
+    after_id: Optional[int] = Query(None, ge=0, description="Keyset cursor: return users with id greater than this"),
+    skip: int = Query(0, ge=0, description="Deprecated offset pagination, ignored when after_id is set"),
     limit: int = Query(100, ge=1, le=1000),
     active_only: bool = Query(True),
     admin_user: User = Depends(require_admin()),
     db: Session = Depends(get_db)
 ):
-    """List all users with pagination and their permissions"""
+    """
+    List users with their permissions, ordered by id.
+
+    Users and their permission ids are fetched in a single query; the cursor
+    for the next page is returned in the ``X-Next-After-Id`` header.
+    """
     try:
-        query = db.query(User)
-        
+        permission_table = get_permission_table(db)
+
+        page = db.query(User.id)
         if active_only:
-            query = query.filter(User.is_active == True)
-        
-        users = query.offset(skip).limit(limit).all()
-        
-        # Get permissions for each user
+            page = page.filter(User.is_active == True)
+        if after_id is not None:
+            page = page.filter(User.id > after_id)
+        page = page.order_by(User.id)
+        if after_id is None and skip:
+            page = page.offset(skip)
+        page_ids = page.limit(limit).subquery()
+
+        rows = (
+            db.query(User, UserPermission.permission_id)
+            .join(page_ids, User.id == page_ids.c.id)
+            .outerjoin(UserPermission, UserPermission.user_id == User.id)
+            .order_by(User.id, UserPermission.permission_id)
+            .all()
+        )
+
         user_summaries = []
-        for user in users:
-            # Get user permissions
-            user_permissions = (
-                db.query(Permission.name)
-                .join(UserPermission, Permission.id == UserPermission.permission_id)
-                .filter(UserPermission.user_id == user.id)
-                .all()
-            )
-            permission_names = [perm.name for perm in user_permissions]
-            
-            user_summary = UserSummaryWithPermissions(
-                id=user.id,
-                auth0_user_id=user.auth0_user_id,
-                email=user.email,
-                display_name=user.display_name,
-                is_active=user.is_active,
-                is_admin=user.is_admin,
-                is_super_admin=user.is_super_admin or False,
-                created_at=user.created_at.isoformat(),
-                updated_at=user.updated_at.isoformat(),
-                permissions=permission_names
-            )
-            user_summaries.append(user_summary)
-        
+        for user, permission_id in rows:
+            if not user_summaries or user_summaries[-1].id != user.id:
+                user_summaries.append(UserSummaryWithPermissions(
+                    id=user.id,
+                    auth0_user_id=user.auth0_user_id,
+                    email=user.email,
+                    display_name=user.display_name,
+                    is_active=user.is_active,
+                    is_admin=user.is_admin,
+                    is_super_admin=user.is_super_admin or False,
+                    created_at=user.created_at.isoformat(),
+                    updated_at=user.updated_at.isoformat(),
+                    permissions=[]
+                ))
+            permission = permission_table.get(permission_id)
+            if permission is not None:
+                user_summaries[-1].permissions.append(permission["name"])
+
+        if len(user_summaries) == limit:
+            response.headers["X-Next-After-Id"] = str(user_summaries[-1].id)
+
         return user_summaries
         
     except Exception as e:
@@ -241,6 +299,7 @@ async def create_user(
         )
         db.add(audit_log)
         db.commit()
+        invalidate_user_caches(new_user.id)
         
         logger.info(f"Admin {admin_user.email} created user: {user_data.email}")
         
@@ -305,6 +364,7 @@ async def update_user_permissions(
         )
         db.add(audit_log)
         db.commit()
+        invalidate_user_caches(user_id)
         
         logger.info(f"Admin {admin_user.email} updated permissions for user {user.email}: {permissions_data.permission_names}")
         
@@ -325,28 +385,32 @@ async def get_user_detail(
 ):
     """Get detailed information about a specific user"""
     try:
-        user = db.query(User).filter(User.id == user_id).first()
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-        
-        # Get user permissions with granter information
-        permissions_query = (
-            db.query(Permission, UserPermission, User)
-            .join(UserPermission, Permission.id == UserPermission.permission_id)
-            .outerjoin(User, User.id == UserPermission.granted_by)
-            .filter(UserPermission.user_id == user_id)
+        permission_table = get_permission_table(db)
+
+        # User, permission grants and granter emails in one query
+        granter = aliased(User)
+        rows = (
+            db.query(User, UserPermission, granter.email)
+            .outerjoin(UserPermission, UserPermission.user_id == User.id)
+            .outerjoin(granter, granter.id == UserPermission.granted_by)
+            .filter(User.id == user_id)
+            .order_by(UserPermission.permission_id)
             .all()
         )
+        if not rows:
+            raise HTTPException(status_code=404, detail="User not found")
+        user = rows[0][0]
         
         permissions = [
             UserPermissionDetail(
-                permission_id=perm.id,
-                permission_name=perm.name,
-                permission_description=perm.description or "",
+                permission_id=user_perm.permission_id,
+                permission_name=permission_table[user_perm.permission_id]["name"],
+                permission_description=permission_table[user_perm.permission_id]["description"],
                 granted_at=user_perm.granted_at.isoformat(),
-                granted_by_email=granter.email if granter else "System"
+                granted_by_email=granter_email or "System"
             )
-            for perm, user_perm, granter in permissions_query
+            for _, user_perm, granter_email in rows
+            if user_perm is not None and user_perm.permission_id in permission_table
         ]
         
         user_summary = UserSummary(
@@ -391,6 +455,7 @@ async def update_user(
             user.is_active = update_request.is_active
         
         db.commit()
+        invalidate_user_caches(user_id)
         db.refresh(user)
         
         # Get permission count
@@ -467,6 +532,7 @@ async def grant_permission(
             raise HTTPException(status_code=400, detail="User already has this permission")
         
         db.commit()
+        invalidate_user_caches(user_id)
         
         logger.info(f"Admin {admin_user.email} granted permission {permission.name} to {user.email}")
         
@@ -528,6 +594,7 @@ async def revoke_permission(
             raise HTTPException(status_code=400, detail="User does not have this permission")
         
         db.commit()
+        invalidate_user_caches(user_id)
         
         logger.info(f"Admin {admin_user.email} revoked permission {permission.name} from {user.email}")
         
@@ -551,25 +618,23 @@ async def list_permissions(
 ):
     """List all available permissions"""
     try:
-        permissions = db.query(Permission).all()
-        
-        permission_summaries = []
-        for permission in permissions:
-            user_count = (
-                db.query(UserPermission)
-                .filter(UserPermission.permission_id == permission.id)
-                .count()
-            )
-            
-            permission_summary = PermissionSummary(
-                id=permission.id,
-                name=permission.name,
-                description=permission.description or "",
-                category=permission.category,
-                created_at=permission.created_at.isoformat(),
-                user_count=user_count
+        user_counts = dict(
+            db.query(UserPermission.permission_id, func.count(UserPermission.id))
+            .group_by(UserPermission.permission_id)
+            .all()
+        )
+        
+        permission_summaries = [
+            PermissionSummary(
+                id=permission_id,
+                name=permission["name"],
+                description=permission["description"],
+                category=permission["category"],
+                created_at=permission["created_at"].isoformat(),
+                user_count=user_counts.get(permission_id, 0)
             )
-            permission_summaries.append(permission_summary)
+            for permission_id, permission in get_permission_table(db).items()
+        ]
         
         return permission_summaries
         
@@ -577,6 +642,11 @@ async def list_permissions(
         logger.error(f"Error listing permissions: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@router.get("/audit-log/metrics")
+async def get_audit_log_metrics(admin_user: User = Depends(require_admin())):
+    """Queue depth, drops and write statistics for the background audit log writer"""
+    return audit_sink.metrics()
+
 @router.get("/audit-log", response_model=List[AuditLogEntry])
 async def get_audit_log(
     skip: int = Query(0, ge=0),
@@ -687,6 +757,7 @@ async def delete_user(
         db.add(audit_log)
         
         db.commit()
+        invalidate_user_caches(user_id)
         
         # Prepare response message
         message = f"User {user_email} deleted successfully from local database"
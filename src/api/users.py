@@ -9,6 +9,7 @@ from database.connection import get_db
 from database.models import User, Permission, UserPermission
 from auth.middleware import get_current_user
 from auth.permissions import permission_checker
+from auth.token_cache import token_cache
 
 logger = logging.getLogger(__name__)
 
@@ -111,6 +112,7 @@ async def update_user_profile(
     try:
         current_user.display_name = profile_update.display_name
         db.commit()
+        token_cache.invalidate_user(current_user.id)
         db.refresh(current_user)
         
         logger.info(f"User {current_user.email} updated profile")
@@ -152,7 +154,9 @@ async def sync_user_from_auth0(
 ):
     """Force sync current user from Auth0 (user data is already synced by middleware)"""
     try:
-        # User is already synced by the middleware, just return success
+        # User is already synced by the middleware; drop the cached copy so the
+        # next request re-reads the user and permissions from the database
+        token_cache.invalidate_user(current_user.id)
         logger.info(f"User {current_user.email} requested sync")
         return {
             "message": "User synchronized successfully",
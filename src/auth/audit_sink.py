@@ -0,0 +1,177 @@
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import logging
+
+from sqlalchemy import event, insert
+from sqlalchemy.orm import Session
+
+from database.connection import db_manager
+from database.models import AuditLog
+
+logger = logging.getLogger(__name__)
+
+# session.info key holding entries waiting for their transaction to commit
+_PENDING_KEY = "audit_sink_pending"
+
+class AuditLogSink:
+    """
+    Buffered writer for audit log entries.
+
+    Entries are queued in memory and written by a background thread in
+    batched inserts, so recording an audit event never adds a write to the
+    request's transaction. Entries recorded against a session are only queued
+    once that session commits and are discarded if it rolls back, so the log
+    never shows an action that did not happen. When the queue is full,
+    ``add`` waits up to ``put_timeout_seconds`` and then drops the entry;
+    ``metrics()`` reports the queue depth, drops and write failures.
+
+    Until ``start()`` is called (scripts, tests) entries are written
+    synchronously.
+    """
+
+    def __init__(self, max_queue_size: int = 10000, batch_size: int = 500,
+                 flush_interval_seconds: float = 1.0, put_timeout_seconds: float = 0.05):
+        self.batch_size = batch_size
+        self.flush_interval_seconds = flush_interval_seconds
+        self.put_timeout_seconds = put_timeout_seconds
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(maxsize=max_queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._metrics_lock = threading.Lock()
+        self._metrics = {
+            "enqueued": 0,
+            "written": 0,
+            "dropped": 0,
+            "failed": 0,
+            "batches": 0,
+            "max_queue_depth": 0,
+            "last_batch_size": 0,
+            "last_flush_ms": 0.0,
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _count(self, **increments) -> None:
+        with self._metrics_lock:
+            for name, value in increments.items():
+                self._metrics[name] += value
+
+    @staticmethod
+    def make_entry(user_id: Optional[int], action: str, resource: Optional[str] = None,
+                   details: Optional[str] = None, ip_address: Optional[str] = None) -> Dict[str, Any]:
+        return {
+            "user_id": user_id,
+            "action": action,
+            "resource": resource,
+            "details": details,
+            "ip_address": ip_address,
+            # Stamped now so batching does not shift the recorded time
+            "timestamp": datetime.utcnow(),
+        }
+
+    def add(self, entry: Dict[str, Any], session: Optional[Session] = None) -> None:
+        """Record an entry, deferred until ``session`` commits if one is given"""
+        if session is not None:
+            session.info.setdefault(_PENDING_KEY, []).append(entry)
+            return
+        self._enqueue([entry])
+
+    def _enqueue(self, entries: List[Dict[str, Any]]) -> None:
+        if not self.running:
+            self._write(entries)
+            return
+        for entry in entries:
+            try:
+                self._queue.put(entry, timeout=self.put_timeout_seconds)
+            except queue.Full:
+                self._count(dropped=1)
+                logger.warning(f"Audit log queue full, dropped '{entry['action']}' entry")
+                continue
+            self._count(enqueued=1)
+        depth = self._queue.qsize()
+        with self._metrics_lock:
+            if depth > self._metrics["max_queue_depth"]:
+                self._metrics["max_queue_depth"] = depth
+
+    def _write(self, entries: List[Dict[str, Any]]) -> None:
+        started = time.perf_counter()
+        try:
+            with db_manager.get_session() as session:
+                session.execute(insert(AuditLog), entries)
+        except Exception as e:
+            self._count(failed=len(entries))
+            logger.error(f"Failed to write {len(entries)} audit log entries: {e}")
+            return
+        with self._metrics_lock:
+            self._metrics["written"] += len(entries)
+            self._metrics["batches"] += 1
+            self._metrics["last_batch_size"] = len(entries)
+            self._metrics["last_flush_ms"] = round((time.perf_counter() - started) * 1000, 2)
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            try:
+                entry = self._queue.get(timeout=self.flush_interval_seconds)
+            except queue.Empty:
+                continue
+            batch = []
+            while True:
+                if entry is None:
+                    stopping = True
+                else:
+                    batch.append(entry)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    entry = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                self._write(batch)
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._thread = threading.Thread(target=self._run, name="audit-log-writer", daemon=True)
+        self._thread.start()
+        logger.info("Audit log writer started")
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Flush everything queued so far and stop the writer"""
+        if not self.running:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.warning(f"Audit log writer did not finish within {timeout}s; {self._queue.qsize()} entries pending")
+        else:
+            self._thread = None
+            logger.info("Audit log writer stopped")
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+        metrics["queue_depth"] = self._queue.qsize()
+        metrics["queue_capacity"] = self._queue.maxsize
+        metrics["running"] = self.running
+        return metrics
+
+# Process-wide sink used by the permission checker
+audit_sink = AuditLogSink()
+
+@event.listens_for(Session, "after_commit")
+def _flush_pending_audit_entries(session: Session) -> None:
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending:
+        audit_sink._enqueue(pending)
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_pending_audit_entries(session: Session, previous_transaction) -> None:
+    # Savepoint rollbacks leave the outer transaction's entries in place
+    if previous_transaction.parent is None:
+        session.info.pop(_PENDING_KEY, None)
@@ -6,6 +6,7 @@ import logging
 
 from .token_validator import get_token_validator
 from .permissions import permission_checker
+from .token_cache import token_cache
 from database.connection import get_db
 from database.models import User
 
@@ -17,6 +18,39 @@ security = HTTPBearer()
 class AuthMiddleware:
     """Authentication and authorization middleware"""
     
+    @staticmethod
+    def _authenticate(token: str, db: Session) -> Optional[User]:
+        """
+        Resolve a bearer token to a user, using the verified-token cache so warm
+        requests skip signature verification and the database sync
+        
+        Args:
+            token: JWT token string
+            db: Database session
+            
+        Returns:
+            User object, or None if the token is invalid
+        """
+        user_info = token_cache.get_claims(token)
+        if user_info is None:
+            user_info = get_token_validator().validate_token(token)
+            if not user_info:
+                return None
+            token_cache.put_claims(token, user_info)
+        
+        user = token_cache.get_user(user_info, db)
+        if user is not None:
+            return user
+        
+        # Cold path: sync the user and load its permissions, then commit the sync
+        # so the cached copy never refers to a row that a later rollback removes
+        user = permission_checker.sync_user_from_auth0(user_info, db)
+        db.flush()
+        permissions = permission_checker.get_user_permissions(user.id, db)
+        token_cache.put_user(user_info, user, permissions)
+        db.commit()
+        return user
+    
     @staticmethod
     def get_current_user(
         request: Request,
@@ -38,32 +72,20 @@ class AuthMiddleware:
             HTTPException: If authentication fails
         """
         try:
-            # Enhanced request logging
-            logger.info(f"🌐 Auth request: {request.method} {request.url.path}")
-            logger.info(f"📋 Request headers: {dict(request.headers)}")
+            logger.debug(f"🌐 Auth request: {request.method} {request.url.path}")
             
-            # Log token info for debugging
-            if credentials and credentials.credentials:
-                token_length = len(credentials.credentials)
-                token_preview = credentials.credentials[:20] + "..." + credentials.credentials[-10:] if token_length > 30 else credentials.credentials
-                logger.info(f"🔍 Received token (length: {token_length}): {token_preview}")
-            else:
+            if not credentials or not credentials.credentials:
                 logger.warning("❌ No credentials provided")
                 raise HTTPException(status_code=401, detail="No authorization token provided")
             
-            # Validate token
-            validator = get_token_validator()
-            user_info = validator.validate_token(credentials.credentials)
+            user = AuthMiddleware._authenticate(credentials.credentials, db)
             
-            if not user_info:
+            if not user:
                 raise HTTPException(
                     status_code=401,
                     detail="Invalid or expired token"
                 )
             
-            # Sync user with database
-            user = permission_checker.sync_user_from_auth0(user_info, db)
-            
             if not user.is_active:
                 raise HTTPException(
                     status_code=403,
@@ -113,12 +135,8 @@ class AuthMiddleware:
             if not token:
                 return None
             
-            user_info = validator.validate_token(token)
-            if not user_info:
-                return None
-            
-            user = permission_checker.sync_user_from_auth0(user_info, db)
-            return user if user.is_active else None
+            user = AuthMiddleware._authenticate(token, db)
+            return user if user and user.is_active else None
             
         except Exception as e:
             logger.warning(f"Optional authentication failed: {e}")
@@ -148,8 +166,14 @@ def require_permission(permission_name: str):
         if current_user.is_admin:
             return current_user
         
-        # Check specific permission
-        if not permission_checker.has_permission(current_user.id, permission_name, db):
+        # Check specific permission, from the cached permission set when available
+        cached_permissions = token_cache.get_permissions(current_user.id)
+        if cached_permissions is not None:
+            has_permission = permission_name in cached_permissions
+        else:
+            has_permission = permission_checker.has_permission(current_user.id, permission_name, db)
+        
+        if not has_permission:
             # Log access denial
             permission_checker.log_access_attempt(
                 user_id=current_user.id,
@@ -1,7 +1,8 @@
 from typing import List, Optional, Dict, Any
 from sqlalchemy.orm import Session
-from database.models import User, Permission, UserPermission, AuditLog
-from database.connection import db_manager
+from database.models import User, Permission, UserPermission
+from .token_cache import token_cache
+from .audit_sink import audit_sink
 import logging
 import json
 
@@ -84,8 +85,8 @@ class PermissionChecker:
             logger.info(f"Created new user: {email}")
             session.flush()  # Get the user ID
             
-            # Log user creation
-            audit_log = AuditLog(
+            # Log user creation once the new user is committed
+            audit_sink.add(audit_sink.make_entry(
                 user_id=user.id,
                 action="user_created",
                 resource="user_management",
@@ -94,8 +95,7 @@ class PermissionChecker:
                     "auth0_user_id": auth0_user_id,
                     "source": "auth0_sync"
                 })
-            )
-            session.add(audit_log)
+            ), session=session)
             
             logger.info(f"Created new user: {email}")
         
@@ -184,8 +184,8 @@ class PermissionChecker:
         )
         session.add(user_permission)
         
-        # Log the action
-        audit_log = AuditLog(
+        # Log the action once the change is committed
+        audit_sink.add(audit_sink.make_entry(
             user_id=granted_by_id,
             action="permission_granted",
             resource="user_management",
@@ -194,8 +194,8 @@ class PermissionChecker:
                 "permission_name": permission_name,
                 "permission_id": permission.id
             })
-        )
-        session.add(audit_log)
+        ), session=session)
+        token_cache.invalidate_user(user_id)
         
         logger.info(f"Granted permission '{permission_name}' to user {user_id} by user {granted_by_id}")
         return True
@@ -231,8 +231,8 @@ class PermissionChecker:
         
         session.delete(user_permission)
         
-        # Log the action
-        audit_log = AuditLog(
+        # Log the action once the change is committed
+        audit_sink.add(audit_sink.make_entry(
             user_id=revoked_by_id,
             action="permission_revoked",
             resource="user_management",
@@ -241,8 +241,8 @@ class PermissionChecker:
                 "permission_name": permission_name,
                 "permission_id": permission.id
             })
-        )
-        session.add(audit_log)
+        ), session=session)
+        token_cache.invalidate_user(user_id)
         
         logger.info(f"Revoked permission '{permission_name}' from user {user_id} by user {revoked_by_id}")
         return True
@@ -259,11 +259,11 @@ class PermissionChecker:
             success: Whether access was granted
             ip_address: Client IP address
             details: Additional details to log
-            session: Database session (optional, will create new if not provided)
+            session: Unused; entries are written by the background audit writer
         """
         action = "access_granted" if success else "access_denied"
         
-        audit_log = AuditLog(
+        audit_log = audit_sink.make_entry(
             user_id=user_id,
             action=action,
             resource=resource,
@@ -271,11 +271,9 @@ class PermissionChecker:
             ip_address=ip_address
         )
         
-        if session:
-            session.add(audit_log)
-        else:
-            with db_manager.get_session() as new_session:
-                new_session.add(audit_log)
+        # Access checks are recorded whether or not the request's transaction
+        # commits, so the entry goes straight to the background writer
+        audit_sink.add(audit_log)
         
         logger.info(f"Logged {action} for resource '{resource}' by user {user_id}")
 
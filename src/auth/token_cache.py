@@ -0,0 +1,137 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Iterable, Optional, Tuple
+import logging
+
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from database.models import User
+
+logger = logging.getLogger(__name__)
+
+# Claims that, when unchanged, mean the local user row is already in sync
+SYNCED_CLAIMS = ("auth0_user_id", "email", "email_verified", "display_name")
+
+class VerifiedTokenCache:
+    """
+    Bounded cache for the authentication fast path.
+
+    Verified token claims are cached by token hash until the token's ``exp``,
+    so warm requests skip signature verification and the userinfo call. The
+    resolved user row and permission set are cached per Auth0 user for a short
+    TTL and reused as long as the synced claims are unchanged, so warm requests
+    skip the database sync as well. Changes made through the admin API
+    invalidate the affected user immediately; the TTL bounds staleness for
+    changes made on other workers.
+    """
+
+    def __init__(self, max_entries: int = 10000, user_ttl_seconds: float = 60.0,
+                 default_claims_ttl_seconds: float = 300.0):
+        self.max_entries = max_entries
+        self.user_ttl_seconds = user_ttl_seconds
+        self.default_claims_ttl_seconds = default_claims_ttl_seconds
+        self._claims: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        # auth0_user_id -> (expires_at, claims fingerprint, detached user, permission names)
+        self._users: "OrderedDict[str, Tuple[float, Tuple, User, FrozenSet[str]]]" = OrderedDict()
+        # user id -> auth0_user_id, bounded and expired like the entries it points to
+        self._user_ids: "OrderedDict[int, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _token_key(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _fingerprint(claims: Dict[str, Any]) -> Tuple:
+        return tuple(claims.get(name) for name in SYNCED_CLAIMS)
+
+    def _evict(self, cache: OrderedDict) -> None:
+        while len(cache) > self.max_entries:
+            cache.popitem(last=False)
+
+    def get_claims(self, token: str) -> Optional[Dict[str, Any]]:
+        """Verified claims for a token, or None if unknown or expired"""
+        key = self._token_key(token)
+        with self._lock:
+            entry = self._claims.get(key)
+            if entry is None:
+                return None
+            expires_at, claims = entry
+            if time.time() >= expires_at:
+                del self._claims[key]
+                return None
+            self._claims.move_to_end(key)
+            return claims
+
+    def put_claims(self, token: str, claims: Dict[str, Any]) -> None:
+        """Cache verified claims until the token expires"""
+        expires_at = claims.get("exp") or time.time() + self.default_claims_ttl_seconds
+        if expires_at <= time.time():
+            return
+        with self._lock:
+            self._claims[self._token_key(token)] = (expires_at, claims)
+            self._evict(self._claims)
+
+    def get_user(self, claims: Dict[str, Any], session: Session) -> Optional[User]:
+        """
+        The cached user attached to ``session`` without a query, or None if the
+        entry is missing, stale, or the synced claims changed
+        """
+        auth0_user_id = claims.get("auth0_user_id")
+        with self._lock:
+            entry = self._users.get(auth0_user_id)
+            if entry is None:
+                return None
+            expires_at, fingerprint, snapshot, _ = entry
+            if time.monotonic() >= expires_at or fingerprint != self._fingerprint(claims):
+                del self._users[auth0_user_id]
+                return None
+            self._users.move_to_end(auth0_user_id)
+        return session.merge(snapshot, load=False)
+
+    def put_user(self, claims: Dict[str, Any], user: User, permissions: Iterable[str]) -> None:
+        """Cache a synced user (as a detached copy) and its permission names"""
+        snapshot = User(**{column.key: getattr(user, column.key) for column in User.__table__.columns})
+        make_transient_to_detached(snapshot)
+        auth0_user_id = claims.get("auth0_user_id")
+        with self._lock:
+            self._users[auth0_user_id] = (
+                time.monotonic() + self.user_ttl_seconds,
+                self._fingerprint(claims),
+                snapshot,
+                frozenset(permissions),
+            )
+            self._user_ids[user.id] = (time.monotonic() + self.user_ttl_seconds, auth0_user_id)
+            self._user_ids.move_to_end(user.id)
+            self._evict(self._users)
+            self._evict(self._user_ids)
+
+    def get_permissions(self, user_id: int) -> Optional[FrozenSet[str]]:
+        """Cached permission names for a user, or None if not cached"""
+        with self._lock:
+            mapping = self._user_ids.get(user_id)
+            if mapping is None:
+                return None
+            entry = self._users.get(mapping[1])
+            if time.monotonic() >= mapping[0] or entry is None or time.monotonic() >= entry[0]:
+                del self._user_ids[user_id]
+                return None
+            return entry[3]
+
+    def invalidate_user(self, user_id: int) -> None:
+        """Drop a user's cached row and permissions after it was modified"""
+        with self._lock:
+            mapping = self._user_ids.pop(user_id, None)
+            if mapping is not None:
+                self._users.pop(mapping[1], None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._claims.clear()
+            self._users.clear()
+            self._user_ids.clear()
+
+# Process-wide cache used by the auth middleware
+token_cache = VerifiedTokenCache()
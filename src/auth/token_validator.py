@@ -1,52 +1,107 @@
 import jwt
 import requests
 from typing import Dict, Optional
-from functools import lru_cache
 import logging
 import os
+import threading
 from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
 
+# How often the JWKS is refreshed in the background
+JWKS_REFRESH_INTERVAL = timedelta(hours=1)
+# Minimum gap between refetches triggered by tokens with an unknown kid
+JWKS_MIN_REFETCH_INTERVAL = timedelta(seconds=30)
+# How long a validation waits for a refetch triggered by an unknown kid
+JWKS_UNKNOWN_KID_WAIT_SECONDS = 3.0
+
+class JWKSStore:
+    """
+    Auth0 signing keys indexed by kid, parsed once and refreshed by a background
+    thread. Validation only reads the in-memory index; an unknown kid (e.g. after
+    key rotation) triggers a single rate-limited refetch on the refresher thread.
+    """
+    
+    def __init__(self, jwks_url: str):
+        self.jwks_url = jwks_url
+        self._keys: Dict[str, object] = {}
+        self._last_fetch: Optional[datetime] = None
+        self._last_refetch_request: Optional[datetime] = None
+        self._refresh_requested = threading.Event()
+        self._fetched = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+    
+    def start(self):
+        """Start the background refresher (performs the initial fetch)"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="jwks-refresher", daemon=True)
+                self._thread.start()
+    
+    def _run(self):
+        while True:
+            self._fetch()
+            self._refresh_requested.wait(JWKS_REFRESH_INTERVAL.total_seconds())
+            self._refresh_requested.clear()
+    
+    def _fetch(self):
+        try:
+            response = requests.get(self.jwks_url, timeout=10)
+            response.raise_for_status()
+            keys = {}
+            for key in response.json().get("keys", []):
+                if key.get("kty") == "RSA" and key.get("kid"):
+                    keys[key["kid"]] = jwt.algorithms.RSAAlgorithm.from_jwk(key)
+            # Swap the whole index at once so readers never see a partial set
+            self._keys = keys
+            self._last_fetch = datetime.utcnow()
+            logger.info(f"JWKS refreshed ({len(keys)} keys)")
+        except Exception as e:
+            # Keep serving the previous keys; the next cycle will retry
+            logger.error(f"Error fetching JWKS: {e}")
+        finally:
+            self._fetched.set()
+    
+    def request_refresh(self) -> bool:
+        """Ask the refresher to refetch now; rate limited. Returns True if requested."""
+        now = datetime.utcnow()
+        with self._lock:
+            if (self._last_refetch_request is not None and
+                    now - self._last_refetch_request < JWKS_MIN_REFETCH_INTERVAL):
+                return False
+            self._last_refetch_request = now
+            self._fetched.clear()
+        self._refresh_requested.set()
+        return True
+    
+    def get_key(self, kid: Optional[str]):
+        """Pre-parsed public key for a kid, or None if unknown after one refetch"""
+        self.start()
+        key = self._keys.get(kid)
+        if key is not None:
+            return key
+        
+        # Before the first fetch completes, or for a kid we have not seen, wait
+        # (bounded) for the refresher thread rather than fetching inline
+        if self._last_fetch is None or self.request_refresh():
+            self._fetched.wait(JWKS_UNKNOWN_KID_WAIT_SECONDS)
+        return self._keys.get(kid)
+
 class Auth0TokenValidator:
     def __init__(self, domain: str, audience: str):
         self.domain = domain
         self.audience = audience
         self.jwks_url = f"https://{domain}/.well-known/jwks.json"
-        self._jwks_cache = None
-        self._jwks_cache_time = None
-        self._cache_duration = timedelta(hours=1)  # Cache JWKS for 1 hour
-    
-    @lru_cache(maxsize=10)
-    def _get_jwks(self) -> Dict:
-        """Get JSON Web Key Set from Auth0 with caching"""
-        try:
-            if (self._jwks_cache is None or 
-                self._jwks_cache_time is None or 
-                datetime.utcnow() - self._jwks_cache_time > self._cache_duration):
-                
-                response = requests.get(self.jwks_url, timeout=10)
-                response.raise_for_status()
-                self._jwks_cache = response.json()
-                self._jwks_cache_time = datetime.utcnow()
-                logger.info("JWKS cache refreshed")
-            
-            return self._jwks_cache
-        except Exception as e:
-            logger.error(f"Error fetching JWKS: {e}")
-            raise ValueError("Unable to fetch Auth0 JWKS")
+        self.jwks_store = JWKSStore(self.jwks_url)
+        self.jwks_store.start()
     
-    def _get_signing_key(self, token_header: Dict) -> str:
+    def _get_signing_key(self, token_header: Dict):
         """Get the signing key for the JWT token"""
-        jwks = self._get_jwks()
-        
-        for key in jwks.get("keys", []):
-            if key.get("kid") == token_header.get("kid"):
-                # Construct the key
-                if key.get("kty") == "RSA":
-                    return jwt.algorithms.RSAAlgorithm.from_jwk(key)
-        
-        raise ValueError("Unable to find appropriate signing key")
+        key = self.jwks_store.get_key(token_header.get("kid"))
+        if key is None:
+            raise ValueError("Unable to find appropriate signing key")
+        return key
     
     def validate_token(self, token: str) -> Optional[Dict]:
         """
@@ -11,6 +11,13 @@ from sklearn.metrics.pairwise import cosine_similarity
 from typing import List, Tuple, Dict
 import argparse
 
+try:
+    from .similar_bill_index import resolve_bill_name
+    from .vectorize_bills import BillVectorStore
+except ImportError:
+    from similar_bill_index import resolve_bill_name
+    from vectorize_bills import BillVectorStore
+
 class BillSimilaritySearcher:
     def __init__(self, vectors_file: str):
         self.vectors_file = vectors_file
@@ -26,17 +33,25 @@ class BillSimilaritySearcher:
         
         if not os.path.exists(self.vectors_file):
             print(f"Error: Vector file {self.vectors_file} not found!")
-            print("Please run compute_tfidf_embeddings.py first to generate the vectors.")
+            print("Please run vectorize_bills.py first to generate the vectors.")
             return
         
-        with open(self.vectors_file, 'r', encoding='utf-8') as f:
-            self.data = json.load(f)
-        
-        self.documents = self.data['documents']
-        
-        # Convert vectors back to numpy arrays
-        self.tfidf_vectors = np.array([doc['tfidf_vector'] for doc in self.documents])
-        self.embeddings = np.array([doc['gemini_embedding'] for doc in self.documents])
+        if os.path.isdir(self.vectors_file):
+            # Binary vector store written by vectorize_bills.py
+            store = BillVectorStore(self.vectors_file)
+            self.data = store.load_manifest()
+            self.documents = store.load_documents()
+            self.tfidf_vectors, self.embeddings = store.load_vectors()
+        else:
+            # Legacy JSON file with inline vectors
+            with open(self.vectors_file, 'r', encoding='utf-8') as f:
+                self.data = json.load(f)
+            
+            self.documents = self.data['documents']
+            
+            # Convert vectors back to numpy arrays
+            self.tfidf_vectors = np.array([doc['tfidf_vector'] for doc in self.documents])
+            self.embeddings = np.array([doc['gemini_embedding'] for doc in self.documents])
         
         # Create bill name to index mapping for quick lookup
         for i, doc in enumerate(self.documents):
@@ -47,38 +62,11 @@ class BillSimilaritySearcher:
         print(f"Embeddings shape: {self.embeddings.shape}")
     
     def find_bill_index(self, bill_name: str) -> int:
-        """Find the index of a bill by name (case-insensitive)."""
-        bill_name_upper = bill_name.upper()
-        # Direct match
-        if bill_name_upper in self.bill_name_to_index:
-            return self.bill_name_to_index[bill_name_upper]
-        
-        # Partial match - find bills containing the search term
-        matches = []
-        for name, idx in self.bill_name_to_index.items():
-            if bill_name_upper in name:
-                matches.append((name, idx))
-        
-        if len(matches) == 1:
-            return matches[0][1]
-        elif len(matches) > 1:
-            print(f"Multiple matches found for '{bill_name}':")
-            for i, (name, idx) in enumerate(matches[:10]):  # Show first 10 matches
-                print(f"  {i+1}. {name}")
-            
-            try:
-                choice = int(input("Enter the number of your choice: ")) - 1
-                if 0 <= choice < len(matches):
-                    return matches[choice][1]
-                else:
-                    print("Invalid choice.")
-                    return -1
-            except ValueError:
-                print("Invalid input.")
-                return -1
-        else:
+        """Find the index of a bill by name (case-insensitive, never prompts)."""
+        idx = resolve_bill_name(bill_name, self.bill_name_to_index)
+        if idx == -1:
             print(f"No bill found matching '{bill_name}'")
-            return -1
+        return idx
     
     def compute_tfidf_similarity(self, query_idx: int, top_k: int = 10) -> List[Tuple[int, float]]:
         """Compute TF-IDF cosine similarity for a query document."""
@@ -154,14 +142,14 @@ class BillSimilaritySearcher:
         # Load data if not already loaded
         if self.data is None:
             print("Error: Data not loaded. Please run load_data() first.")
-            return None, None
+            return None, None, None
         
         # Find the bill
         query_idx = self.find_bill_index(bill_name)
 
         if query_idx == -1:
             print(f"Error: unable to find bill {bill_name}")
-            return None, None
+            return None, None, None
         
         print(f"\nSearching for bills similar to: {self.documents[query_idx]['bill_name']}")
         
@@ -220,7 +208,7 @@ class BillSimilaritySearcher:
 def main():
     parser = argparse.ArgumentParser(description="Search for similar bills using TF-IDF and embeddings")
     parser.add_argument("--vectors-file", default="document_vectors.json", 
-                       help="Path to the vectors JSON file")
+                       help="Path to the vectors JSON file or vector store directory")
     parser.add_argument("--bill-name", help="Bill name to search for")
     parser.add_argument("--top-k", type=int, default=10, 
                        help="Number of similar bills to return")
@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+Precomputed similar-bill neighbour table.
+
+Computes the top-N TF-IDF and Gemini embedding neighbours for every bill once,
+offline, and stores them in a compact ``.npz`` lookup table so the API can
+answer ``/get_similar_bills`` with a dictionary lookup instead of recomputing
+cosine similarities against the whole corpus on every request.
+"""
+
+import os
+import tempfile
+import threading
+import time
+import argparse
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_TOP_N = 10
+DEFAULT_INDEX_FILE = os.path.join(os.path.dirname(__file__), "similar_bills_index.npz")
+
+# Rows are scored against the corpus in blocks to keep the similarity matrix small
+BLOCK_SIZE = 512
+
+# How often a running API process checks whether the table was rebuilt on disk
+RELOAD_CHECK_SECONDS = 60
+
+# Partial bill names whose resolution is memoized (least recently used are dropped)
+MAX_RESOLVED_NAMES = 4096
+
+
+def resolve_bill_name(bill_name: str, name_to_index: Dict[str, int]) -> int:
+    """
+    Resolve a (possibly partial) bill name to an index without prompting.
+
+    Exact matches win. Otherwise the candidates containing the search term are
+    ranked deterministically: prefix matches first, then the shortest name,
+    then alphabetical order. Returns -1 when nothing matches.
+    """
+    query = bill_name.strip().upper()
+    if not query:
+        return -1
+    if query in name_to_index:
+        return name_to_index[query]
+
+    matches = [name for name in name_to_index if query in name]
+    if not matches:
+        return -1
+
+    best = min(matches, key=lambda name: (not name.startswith(query), len(name), name))
+    return name_to_index[best]
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalize rows so a dot product equals cosine similarity."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _top_n_neighbors(queries: np.ndarray, corpus: np.ndarray, query_offset: int,
+                     top_n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Top-N neighbours of each query row within the corpus, excluding itself.
+
+    ``queries`` and ``corpus`` must already be row-normalized; ``query_offset``
+    is the corpus index of the first query row. Missing slots (tiny corpora)
+    are padded with index -1 and score -inf.
+    """
+    n_queries = queries.shape[0]
+    indices = np.full((n_queries, top_n), -1, dtype=np.int32)
+    scores = np.full((n_queries, top_n), -np.inf, dtype=np.float32)
+
+    k = min(top_n, corpus.shape[0] - 1)
+    if k <= 0:
+        return indices, scores
+
+    for start in range(0, n_queries, BLOCK_SIZE):
+        block = queries[start:start + BLOCK_SIZE]
+        sims = block @ corpus.T
+        rows = np.arange(block.shape[0])
+        self_cols = query_offset + start + rows
+        in_corpus = self_cols < corpus.shape[0]
+        sims[rows[in_corpus], self_cols[in_corpus]] = -np.inf
+
+        candidates = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        candidate_scores = np.take_along_axis(sims, candidates, axis=1)
+        order = np.argsort(-candidate_scores, axis=1, kind="stable")
+
+        indices[start:start + block.shape[0], :k] = np.take_along_axis(candidates, order, axis=1)
+        scores[start:start + block.shape[0], :k] = np.take_along_axis(candidate_scores, order, axis=1)
+
+    return indices, scores
+
+
+def _merge_neighbors(indices: np.ndarray, scores: np.ndarray, new_indices: np.ndarray,
+                     new_scores: np.ndarray, top_n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Merge existing neighbour lists with scores against newly added bills."""
+    all_indices = np.concatenate([indices, new_indices], axis=1)
+    all_scores = np.concatenate([scores, new_scores], axis=1)
+    order = np.argsort(-all_scores, axis=1, kind="stable")[:, :top_n]
+    return (np.take_along_axis(all_indices, order, axis=1).astype(np.int32),
+            np.take_along_axis(all_scores, order, axis=1).astype(np.float32))
+
+
+class SimilarBillIndex:
+    """Lookup table of the top-N most similar bills for every bill."""
+
+    def __init__(self, index_file: str = DEFAULT_INDEX_FILE, top_n: int = DEFAULT_TOP_N):
+        self.index_file = index_file
+        self.top_n = top_n
+        self.bill_names: List[str] = []
+        self.summaries: List[str] = []
+        self.name_to_index: Dict[str, int] = {}
+        self.tfidf_neighbors = np.zeros((0, top_n), dtype=np.int32)
+        self.tfidf_scores = np.zeros((0, top_n), dtype=np.float32)
+        self.embedding_neighbors = np.zeros((0, top_n), dtype=np.int32)
+        self.embedding_scores = np.zeros((0, top_n), dtype=np.float32)
+        self._resolved: "OrderedDict[str, int]" = OrderedDict()
+        self._loaded_mtime: Optional[float] = None
+        self._last_reload_check = 0.0
+        # Reloads run in a worker thread; lookups never see a half-swapped table
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.bill_names)
+
+    def _set_names(self, bill_names: List[str], summaries: List[str]) -> None:
+        self.bill_names = list(bill_names)
+        self.summaries = list(summaries)
+        self.name_to_index = {name.upper(): i for i, name in enumerate(self.bill_names)}
+        self._resolved = OrderedDict()
+
+    def build(self, bill_names: List[str], summaries: List[str],
+              tfidf_vectors: np.ndarray, embeddings: np.ndarray) -> None:
+        """Compute the full neighbour table from scratch."""
+        tfidf = _normalize_rows(tfidf_vectors)
+        embedded = _normalize_rows(embeddings)
+
+        self.tfidf_neighbors, self.tfidf_scores = _top_n_neighbors(tfidf, tfidf, 0, self.top_n)
+        self.embedding_neighbors, self.embedding_scores = _top_n_neighbors(embedded, embedded, 0, self.top_n)
+        self._set_names(bill_names, summaries)
+
+    def refresh(self, bill_names: List[str], summaries: List[str],
+                tfidf_vectors: np.ndarray, embeddings: np.ndarray) -> int:
+        """
+        Incrementally extend the table with bills appended since the last build.
+
+        The inputs must cover the whole corpus with the already-indexed bills
+        first, in the same order. Only the new rows are scored against the
+        corpus, and existing rows are merged with their scores against the new
+        bills. Returns the number of bills added.
+        """
+        n_old = len(self.bill_names)
+        if n_old == 0 or list(bill_names[:n_old]) != self.bill_names:
+            self.build(bill_names, summaries, tfidf_vectors, embeddings)
+            return len(self.bill_names)
+
+        n_new = len(bill_names) - n_old
+        if n_new <= 0:
+            self._set_names(bill_names, summaries)
+            return 0
+
+        tables = []
+        for vectors, neighbors, scores in (
+            (tfidf_vectors, self.tfidf_neighbors, self.tfidf_scores),
+            (embeddings, self.embedding_neighbors, self.embedding_scores),
+        ):
+            corpus = _normalize_rows(vectors)
+            new_rows = corpus[n_old:]
+
+            # Neighbours of the new bills against everything
+            new_neighbors, new_scores = _top_n_neighbors(new_rows, corpus, n_old, self.top_n)
+
+            # Existing bills only need to consider the new bills as candidates
+            old_vs_new = corpus[:n_old] @ new_rows.T
+            candidate_ids = np.broadcast_to(
+                np.arange(n_old, n_old + n_new, dtype=np.int32), old_vs_new.shape
+            )
+            neighbors, scores = _merge_neighbors(neighbors, scores, candidate_ids, old_vs_new, self.top_n)
+
+            tables.append((np.vstack([neighbors, new_neighbors]), np.vstack([scores, new_scores])))
+
+        (self.tfidf_neighbors, self.tfidf_scores), (self.embedding_neighbors, self.embedding_scores) = tables
+        self._set_names(bill_names, summaries)
+        return n_new
+
+    def save(self) -> None:
+        """Write the table to ``index_file`` atomically."""
+        # A unique temporary name, so concurrent rebuilds never share a partial file
+        with tempfile.NamedTemporaryFile(dir=os.path.dirname(os.path.abspath(self.index_file)),
+                                         prefix=os.path.basename(self.index_file) + ".",
+                                         suffix=".tmp", delete=False) as f:
+            tmp_file = f.name
+            np.savez_compressed(
+                f,
+                bill_names=np.array(self.bill_names, dtype=object),
+                summaries=np.array(self.summaries, dtype=object),
+                tfidf_neighbors=self.tfidf_neighbors,
+                tfidf_scores=self.tfidf_scores,
+                embedding_neighbors=self.embedding_neighbors,
+                embedding_scores=self.embedding_scores,
+            )
+        try:
+            os.replace(tmp_file, self.index_file)
+        except OSError:
+            os.unlink(tmp_file)
+            raise
+
+    def load(self) -> bool:
+        """Load the table from ``index_file``. Returns False if it does not exist."""
+        if not os.path.exists(self.index_file):
+            return False
+
+        mtime = os.path.getmtime(self.index_file)
+        with np.load(self.index_file, allow_pickle=True) as data:
+            arrays = {name: data[name] for name in
+                      ("tfidf_neighbors", "tfidf_scores", "embedding_neighbors", "embedding_scores")}
+            bill_names, summaries = data["bill_names"].tolist(), data["summaries"].tolist()
+
+        with self._lock:
+            for name, array in arrays.items():
+                setattr(self, name, array)
+            self._set_names(bill_names, summaries)
+            self.top_n = self.tfidf_neighbors.shape[1]
+            self._loaded_mtime = mtime
+        print(f"Loaded similar-bill index with {len(self.bill_names)} bills from {self.index_file}")
+        return True
+
+    def reload_if_changed(self) -> bool:
+        """
+        Pick up a table refreshed by the vectorization pipeline, checking the
+        file's mtime at most every ``RELOAD_CHECK_SECONDS``.
+        """
+        now = time.monotonic()
+        if now - self._last_reload_check < RELOAD_CHECK_SECONDS:
+            return False
+        self._last_reload_check = now
+
+        try:
+            mtime = os.path.getmtime(self.index_file)
+        except OSError:
+            return False
+        if mtime == self._loaded_mtime:
+            return False
+        return self.load()
+
+    def resolve(self, bill_name: str) -> int:
+        """Resolve a bill name to its row, memoizing partial-name lookups."""
+        key = bill_name.strip().upper()
+        if key in self.name_to_index:
+            return self.name_to_index[key]
+        if key in self._resolved:
+            self._resolved.move_to_end(key)
+            return self._resolved[key]
+        idx = self._resolved[key] = resolve_bill_name(key, self.name_to_index)
+        if len(self._resolved) > MAX_RESOLVED_NAMES:
+            self._resolved.popitem(last=False)
+        return idx
+
+    def _format(self, neighbors: np.ndarray, scores: np.ndarray, top_k: int) -> List[Dict]:
+        results = []
+        for idx, score in zip(neighbors[:top_k], scores[:top_k]):
+            if idx < 0:
+                break
+            results.append({
+                "bill_name": self.bill_names[idx],
+                "summary": self.summaries[idx],
+                "score": float(score),
+            })
+        return results
+
+    def lookup(self, bill_name: str, top_k: Optional[int] = None):
+        """
+        Return ``(tfidf_documents, embedding_documents, search_bill)`` for a bill,
+        in the same shape as ``BillSimilaritySearcher.search_similar_bills``.
+        Returns ``(None, None, None)`` if the bill is unknown.
+        """
+        with self._lock:
+            idx = self.resolve(bill_name)
+            if idx == -1:
+                return None, None, None
+
+            top_k = self.top_n if top_k is None else min(top_k, self.top_n)
+            search_bill = {"bill_name": self.bill_names[idx], "summary": self.summaries[idx], "score": 1.0}
+            return (
+                self._format(self.tfidf_neighbors[idx], self.tfidf_scores[idx], top_k),
+                self._format(self.embedding_neighbors[idx], self.embedding_scores[idx], top_k),
+                search_bill,
+            )
+
+
+def build_from_searcher(searcher, index_file: str = DEFAULT_INDEX_FILE,
+                        top_n: int = DEFAULT_TOP_N, incremental: bool = True) -> SimilarBillIndex:
+    """Build (or incrementally refresh) the table from a loaded ``BillSimilaritySearcher``."""
+    index = SimilarBillIndex(index_file, top_n)
+    if incremental:
+        index.load()
+
+    bill_names = [doc["bill_name"] for doc in searcher.documents]
+    summaries = [doc.get("summary", "") for doc in searcher.documents]
+
+    if incremental and len(index) > 0 and index.top_n == top_n:
+        added = index.refresh(bill_names, summaries, searcher.tfidf_vectors, searcher.embeddings)
+        print(f"Refreshed similar-bill index: {added} new bills, {len(index)} total")
+    else:
+        index.top_n = top_n
+        index.build(bill_names, summaries, searcher.tfidf_vectors, searcher.embeddings)
+        print(f"Built similar-bill index for {len(index)} bills")
+
+    index.save()
+    return index
+
+
+def main():
+    try:
+        from .bill_similarity_search import BillSimilaritySearcher
+    except ImportError:
+        from bill_similarity_search import BillSimilaritySearcher
+
+    parser = argparse.ArgumentParser(description="Precompute the similar-bill neighbour table")
+    parser.add_argument("--vectors-file", default="introduction_document_vectors.json",
+                        help="Path to the vectors JSON file")
+    parser.add_argument("--index-file", default=DEFAULT_INDEX_FILE,
+                        help="Where to write the neighbour table")
+    parser.add_argument("--top-n", type=int, default=DEFAULT_TOP_N,
+                        help="Number of neighbours to keep per bill")
+    parser.add_argument("--full", action="store_true",
+                        help="Rebuild from scratch instead of refreshing incrementally")
+
+    args = parser.parse_args()
+
+    searcher = BillSimilaritySearcher(args.vectors_file)
+    searcher.load_data()
+    if searcher.data is None:
+        return
+
+    build_from_searcher(searcher, args.index_file, args.top_n, incremental=not args.full)
+
+
+if __name__ == "__main__":
+    main()
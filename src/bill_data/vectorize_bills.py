@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Incremental vectorization pipeline for bill introductions.
+
+Replaces the wholesale rebuild of ``introduction_document_vectors.json``.
+The TF-IDF vocabulary and IDF weights are fitted once and persisted, so new
+bills are projected into the same space without refitting, and vectors are
+appended to flat float32 files described by a small JSON manifest:
+
+    vectors/
+        manifest.json          counts, dimensions, model settings
+        documents.jsonl        one line of metadata per bill, in row order
+        tfidf.f32              row-major float32 TF-IDF matrix
+        embeddings.f32         row-major float32 Gemini embedding matrix
+        tfidf_vocabulary.json  term -> column
+        tfidf_idf.npy          IDF weight per column
+
+Only bills that are not already in the store are vectorized, and the
+similar-bill neighbour table is refreshed incrementally afterwards, so new
+introductions become searchable without a full rebuild.
+"""
+
+import os
+import json
+import time
+import tempfile
+import argparse
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_STORE_DIR = os.path.join(os.path.dirname(__file__), "vectors")
+DEFAULT_TEXT_FIELD = "summary"
+DEFAULT_EMBEDDING_MODEL = "text-embedding-004"
+EMBEDDING_BATCH_SIZE = 100
+
+MANIFEST_FILE = "manifest.json"
+DOCUMENTS_FILE = "documents.jsonl"
+TFIDF_FILE = "tfidf.f32"
+EMBEDDINGS_FILE = "embeddings.f32"
+VOCABULARY_FILE = "tfidf_vocabulary.json"
+IDF_FILE = "tfidf_idf.npy"
+
+# TfidfVectorizer settings used for the initial fit; persisted in the manifest
+DEFAULT_TFIDF_PARAMS = {
+    "lowercase": True,
+    "stop_words": "english",
+    "max_features": 10000,
+    "ngram_range": [1, 1],
+}
+
+
+class TfidfProjector:
+    """A frozen TF-IDF space: fitted once, then used to project new documents."""
+
+    def __init__(self, vocabulary: Dict[str, int], idf: np.ndarray, params: Dict[str, Any]):
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        self.vocabulary = vocabulary
+        self.idf = np.asarray(idf, dtype=np.float32)
+        self.params = params
+        vectorizer_params = dict(params, ngram_range=tuple(params.get("ngram_range", (1, 1))))
+        self._analyzer = TfidfVectorizer(**vectorizer_params).build_analyzer()
+
+    @property
+    def dim(self) -> int:
+        return len(self.idf)
+
+    @classmethod
+    def fit(cls, texts: List[str], params: Optional[Dict[str, Any]] = None) -> "TfidfProjector":
+        """Fit the vocabulary and IDF weights on a corpus."""
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        params = dict(params or DEFAULT_TFIDF_PARAMS)
+        vectorizer = TfidfVectorizer(**dict(params, ngram_range=tuple(params["ngram_range"])))
+        vectorizer.fit(texts)
+        vocabulary = {term: int(col) for term, col in vectorizer.vocabulary_.items()}
+        return cls(vocabulary, vectorizer.idf_, params)
+
+    def transform(self, texts: List[str]) -> np.ndarray:
+        """Project documents into the fitted space (raw tf * idf, L2-normalized)."""
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for term in self._analyzer(text or ""):
+                col = self.vocabulary.get(term)
+                if col is not None:
+                    matrix[row, col] += 1.0
+        matrix *= self.idf
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def save(self, store_dir: str) -> None:
+        with open(os.path.join(store_dir, VOCABULARY_FILE), 'w', encoding='utf-8') as f:
+            json.dump(self.vocabulary, f)
+        np.save(os.path.join(store_dir, IDF_FILE), self.idf)
+
+    @classmethod
+    def load(cls, store_dir: str, params: Dict[str, Any]) -> "TfidfProjector":
+        with open(os.path.join(store_dir, VOCABULARY_FILE), 'r', encoding='utf-8') as f:
+            vocabulary = json.load(f)
+        idf = np.load(os.path.join(store_dir, IDF_FILE))
+        return cls(vocabulary, idf, params)
+
+
+class BillVectorStore:
+    """Append-only binary store of bill vectors with a JSON manifest."""
+
+    def __init__(self, store_dir: str = DEFAULT_STORE_DIR):
+        self.store_dir = store_dir
+        self.manifest: Dict[str, Any] = {}
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.store_dir, name)
+
+    def exists(self) -> bool:
+        return os.path.exists(self._path(MANIFEST_FILE))
+
+    def load_manifest(self) -> Dict[str, Any]:
+        with open(self._path(MANIFEST_FILE), 'r', encoding='utf-8') as f:
+            self.manifest = json.load(f)
+        return self.manifest
+
+    def _write_manifest(self) -> None:
+        # The manifest is written last and atomically; its count is the commit point,
+        # so readers never see rows from a partially finished append.
+        self.manifest["updated_at"] = datetime.now().isoformat()
+        # A unique temporary name, so concurrent rebuilds never share a partial manifest
+        with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=self.store_dir, prefix=MANIFEST_FILE + ".",
+                                         suffix=".tmp", delete=False) as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(f.name, self._path(MANIFEST_FILE))
+
+    def create(self, projector: TfidfProjector, embedding_dim: int, text_field: str,
+               embedding_model: str) -> None:
+        """Initialize an empty store around a fitted TF-IDF space."""
+        os.makedirs(self.store_dir, exist_ok=True)
+        projector.save(self.store_dir)
+        for name in (DOCUMENTS_FILE, TFIDF_FILE, EMBEDDINGS_FILE):
+            open(self._path(name), 'wb').close()
+        self.manifest = {
+            "version": 1,
+            "count": 0,
+            "documents_bytes": 0,
+            "tfidf_dim": projector.dim,
+            "embedding_dim": embedding_dim,
+            "embedding_model": embedding_model,
+            "text_field": text_field,
+            "tfidf_params": projector.params,
+        }
+        self._write_manifest()
+
+    def load_projector(self) -> TfidfProjector:
+        return TfidfProjector.load(self.store_dir, self.manifest["tfidf_params"])
+
+    def load_documents(self) -> List[Dict[str, Any]]:
+        """Metadata for the committed rows, in row order."""
+        count = self.manifest["count"]
+        documents = []
+        with open(self._path(DOCUMENTS_FILE), 'r', encoding='utf-8') as f:
+            for line in f:
+                if len(documents) >= count:
+                    break
+                documents.append(json.loads(line))
+        return documents
+
+    def _load_matrix(self, name: str, dim: int) -> np.ndarray:
+        count = self.manifest["count"]
+        if count == 0:
+            return np.zeros((0, dim), dtype=np.float32)
+        return np.memmap(self._path(name), dtype=np.float32, mode='r', shape=(count, dim))
+
+    def load_vectors(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Memory-map the committed TF-IDF and embedding rows."""
+        return (self._load_matrix(TFIDF_FILE, self.manifest["tfidf_dim"]),
+                self._load_matrix(EMBEDDINGS_FILE, self.manifest["embedding_dim"]))
+
+    def _truncate_uncommitted(self) -> None:
+        """Drop rows left behind by an append that crashed before committing."""
+        count = self.manifest["count"]
+        for name, dim in ((TFIDF_FILE, self.manifest["tfidf_dim"]),
+                          (EMBEDDINGS_FILE, self.manifest["embedding_dim"])):
+            with open(self._path(name), 'r+b') as f:
+                f.truncate(count * dim * 4)
+        with open(self._path(DOCUMENTS_FILE), 'r+b') as f:
+            f.truncate(self.manifest["documents_bytes"])
+
+    def append(self, documents: List[Dict[str, Any]], tfidf: np.ndarray, embeddings: np.ndarray) -> None:
+        """Append rows and commit them by bumping the manifest count."""
+        if not documents:
+            return
+        self._truncate_uncommitted()
+        with open(self._path(TFIDF_FILE), 'ab') as f:
+            f.write(np.ascontiguousarray(tfidf, dtype=np.float32).tobytes())
+        with open(self._path(EMBEDDINGS_FILE), 'ab') as f:
+            f.write(np.ascontiguousarray(embeddings, dtype=np.float32).tobytes())
+        lines = "".join(json.dumps(doc, ensure_ascii=False) + "\n" for doc in documents).encode('utf-8')
+        with open(self._path(DOCUMENTS_FILE), 'ab') as f:
+            f.write(lines)
+        self.manifest["count"] += len(documents)
+        self.manifest["documents_bytes"] += len(lines)
+        self._write_manifest()
+
+
+def embed_texts(texts: List[str], model_name: str = DEFAULT_EMBEDDING_MODEL) -> np.ndarray:
+    """Embed texts with Gemini in batches."""
+    import google.generativeai as genai
+
+    try:
+        from settings import settings
+        if settings.google_api_key:
+            genai.configure(api_key=settings.google_api_key)
+    except ImportError:
+        genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+
+    embeddings = []
+    for start in range(0, len(texts), EMBEDDING_BATCH_SIZE):
+        batch = [text or " " for text in texts[start:start + EMBEDDING_BATCH_SIZE]]
+        result = genai.embed_content(
+            model=f"models/{model_name}",
+            content=batch,
+            task_type="retrieval_document"
+        )
+        embeddings.extend(result['embedding'])
+        print(f"Embedded {min(start + EMBEDDING_BATCH_SIZE, len(texts))}/{len(texts)} bills")
+        # Small delay between batches to respect rate limits
+        time.sleep(0.1)
+    return np.asarray(embeddings, dtype=np.float32)
+
+
+def _document_metadata(doc: Dict[str, Any], text_field: str) -> Dict[str, Any]:
+    return {
+        "bill_name": doc["bill_name"],
+        "url": doc.get("url", ""),
+        "summary": doc.get("summary", ""),
+        text_field: doc.get(text_field, ""),
+    }
+
+
+def vectorize_bills(bills: List[Dict[str, Any]], store_dir: str = DEFAULT_STORE_DIR,
+                    text_field: str = DEFAULT_TEXT_FIELD,
+                    embedding_model: str = DEFAULT_EMBEDDING_MODEL) -> int:
+    """
+    Vectorize the bills that are not yet in the store and append them.
+
+    The first run fits the TF-IDF space on the given bills; later runs reuse
+    the persisted vocabulary and IDF. Returns the number of bills appended.
+    """
+    store = BillVectorStore(store_dir)
+
+    if store.exists():
+        store.load_manifest()
+        text_field = store.manifest["text_field"]
+        embedding_model = store.manifest["embedding_model"]
+        known = {doc["bill_name"].upper() for doc in store.load_documents()}
+    else:
+        known = set()
+
+    new_bills, seen = [], set(known)
+    for bill in bills:
+        key = bill["bill_name"].upper()
+        if key not in seen:
+            seen.add(key)
+            new_bills.append(bill)
+
+    if not new_bills:
+        print("No new bills to vectorize")
+        return 0
+
+    texts = [bill.get(text_field, "") for bill in new_bills]
+    if store.exists():
+        projector = store.load_projector()
+    else:
+        print(f"Fitting TF-IDF space on {len(texts)} bills...")
+        projector = TfidfProjector.fit(texts)
+
+    tfidf = projector.transform(texts)
+    embeddings = np.asarray(
+        [bill["gemini_embedding"] for bill in new_bills], dtype=np.float32
+    ) if all("gemini_embedding" in bill for bill in new_bills) else embed_texts(texts, embedding_model)
+
+    if not store.exists():
+        store.create(projector, embeddings.shape[1], text_field, embedding_model)
+
+    store.append([_document_metadata(bill, text_field) for bill in new_bills], tfidf, embeddings)
+    print(f"Appended {len(new_bills)} bills to {store_dir} ({store.manifest['count']} total)")
+    return len(new_bills)
+
+
+def refresh_similar_bill_index(store_dir: str = DEFAULT_STORE_DIR, index_file: Optional[str] = None) -> None:
+    """Refresh the precomputed neighbour table from the store."""
+    try:
+        from .bill_similarity_search import BillSimilaritySearcher
+        from .similar_bill_index import DEFAULT_INDEX_FILE, build_from_searcher
+    except ImportError:
+        from bill_similarity_search import BillSimilaritySearcher
+        from similar_bill_index import DEFAULT_INDEX_FILE, build_from_searcher
+
+    searcher = BillSimilaritySearcher(store_dir)
+    searcher.load_data()
+    if searcher.data is not None:
+        build_from_searcher(searcher, index_file or DEFAULT_INDEX_FILE)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incrementally vectorize bill introductions")
+    parser.add_argument("input_file",
+                        help="JSON file with a list of bills (bill_name, url, summary, ...) or a legacy "
+                             "vectors file with a 'documents' key, whose Gemini embeddings are reused")
+    parser.add_argument("--store-dir", default=DEFAULT_STORE_DIR, help="Vector store directory")
+    parser.add_argument("--text-field", default=DEFAULT_TEXT_FIELD,
+                        help="Bill field to vectorize (only used when creating a new store)")
+    parser.add_argument("--index-file", default=None, help="Similar-bill neighbour table to refresh")
+    parser.add_argument("--skip-index", action="store_true", help="Do not refresh the neighbour table")
+
+    args = parser.parse_args()
+
+    with open(args.input_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    bills = data["documents"] if isinstance(data, dict) else data
+
+    added = vectorize_bills(bills, args.store_dir, args.text_field)
+    if added and not args.skip_index:
+        refresh_similar_bill_index(args.store_dir, args.index_file)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Conversation state storage for the NLP Backend.
+
+Conversations used to live in an unbounded dict on each worker. The stores
+here bound that state: the in-memory store evicts conversations that have
+been idle longer than a TTL and keeps at most ``max_conversations`` in LRU
+order, and the Redis store shares conversations across workers with the TTL
+applied as a key expiry. Per-conversation history caps are applied by
+``GlobalState.trim`` before every save.
+"""
+
+import json
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONVERSATIONS = 1000
+DEFAULT_IDLE_TTL_SECONDS = 3600
+REDIS_KEY_PREFIX = "nlp:conversation:"
+
+
+class ConversationStore(ABC):
+    """Interface for conversation state storage."""
+
+    @abstractmethod
+    def get(self, conversation_id: str) -> Optional[Any]:
+        """The stored state, or None if unknown or expired."""
+
+    @abstractmethod
+    def put(self, state: Any) -> None:
+        """Store ``state`` under its ``conversation_id``."""
+
+    @abstractmethod
+    def delete(self, conversation_id: str) -> bool:
+        """Remove a conversation; False if it was not stored."""
+
+
+class InMemoryConversationStore(ConversationStore):
+    """Per-worker store with idle-TTL and LRU eviction."""
+
+    def __init__(self, max_conversations: int = DEFAULT_MAX_CONVERSATIONS,
+                 idle_ttl_seconds: float = DEFAULT_IDLE_TTL_SECONDS):
+        self.max_conversations = max_conversations
+        self.idle_ttl_seconds = idle_ttl_seconds
+        # conversation_id -> (last_used, state), least recently used first
+        self._states: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict(self, now: float) -> None:
+        while self._states:
+            conversation_id, (last_used, _) = next(iter(self._states.items()))
+            if len(self._states) <= self.max_conversations and now - last_used <= self.idle_ttl_seconds:
+                break
+            del self._states[conversation_id]
+
+    def get(self, conversation_id: str) -> Optional[Any]:
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            entry = self._states.get(conversation_id)
+            if entry is None:
+                return None
+            self._states[conversation_id] = (now, entry[1])
+            self._states.move_to_end(conversation_id)
+            return entry[1]
+
+    def put(self, state: Any) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._states[state.conversation_id] = (now, state)
+            self._states.move_to_end(state.conversation_id)
+            self._evict(now)
+
+    def delete(self, conversation_id: str) -> bool:
+        with self._lock:
+            return self._states.pop(conversation_id, None) is not None
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+
+class RedisConversationStore(ConversationStore):
+    """Store shared across workers; each conversation is a JSON value with an expiry."""
+
+    def __init__(self, redis_client, to_dict: Callable[[Any], Dict[str, Any]],
+                 from_dict: Callable[[Dict[str, Any]], Any],
+                 idle_ttl_seconds: float = DEFAULT_IDLE_TTL_SECONDS,
+                 key_prefix: str = REDIS_KEY_PREFIX):
+        self.redis = redis_client
+        self.to_dict = to_dict
+        self.from_dict = from_dict
+        self.idle_ttl_seconds = int(idle_ttl_seconds)
+        self.key_prefix = key_prefix
+
+    def _key(self, conversation_id: str) -> str:
+        return f"{self.key_prefix}{conversation_id}"
+
+    def get(self, conversation_id: str) -> Optional[Any]:
+        key = self._key(conversation_id)
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.get(key)
+        pipe.expire(key, self.idle_ttl_seconds)
+        raw, _ = pipe.execute()
+        if raw is None:
+            return None
+        try:
+            return self.from_dict(json.loads(raw))
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Discarding unreadable conversation state {conversation_id}: {e}")
+            self.redis.delete(key)
+            return None
+
+    def put(self, state: Any) -> None:
+        payload = json.dumps(self.to_dict(state), default=str)
+        self.redis.set(self._key(state.conversation_id), payload, ex=self.idle_ttl_seconds)
+
+    def delete(self, conversation_id: str) -> bool:
+        return self.redis.delete(self._key(conversation_id)) > 0
+
+
+def create_conversation_store(config: Dict[str, Any], redis_client=None,
+                              to_dict: Callable = None, from_dict: Callable = None) -> ConversationStore:
+    """
+    Build the store described by the "conversation_store" section of config.json.
+
+    ``backend`` is "memory" (default) or "redis"; the Redis backend falls back
+    to memory when no Redis client is available.
+    """
+    store_config = config.get("conversation_store", {})
+    backend = store_config.get("backend", "memory")
+    idle_ttl_seconds = store_config.get("idle_ttl_seconds", DEFAULT_IDLE_TTL_SECONDS)
+
+    if backend == "redis":
+        if redis_client is not None and to_dict is not None and from_dict is not None:
+            logger.info("Using Redis conversation store")
+            return RedisConversationStore(redis_client, to_dict, from_dict, idle_ttl_seconds)
+        logger.warning("Redis conversation store requested but Redis is unavailable; using memory")
+
+    return InMemoryConversationStore(
+        max_conversations=store_config.get("max_conversations", DEFAULT_MAX_CONVERSATIONS),
+        idle_ttl_seconds=idle_ttl_seconds,
+    )
@@ -0,0 +1,147 @@
+"""
+source_identifier -> full document index for the extracted bill corpus.
+
+Chunks reference their bill by ``source_identifier`` (the file name at the
+end of the document URL). Instead of scanning the whole extracted corpus for
+every chunk, the corpus is converted once into two sidecar files next to it:
+
+    <corpus>.texts       all document texts, UTF-8, back to back
+    <corpus>.index.json  {source_identifier: [url, byte offset, byte length]}
+
+The texts file is memory-mapped, so a lookup is a dict access plus a slice
+and only the documents actually requested are decoded. The sidecars are
+rebuilt whenever the corpus is newer than them.
+"""
+
+import json
+import logging
+import mmap
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def source_identifier_for(url: str) -> str:
+    """The identifier chunks use for a document: the last path segment of its URL."""
+    return url.split('/')[-1] if url else ''
+
+
+class SourceDocumentIndex:
+    """On-demand access to full documents by source_identifier."""
+
+    def __init__(self, corpus_path: str):
+        self.corpus_path = Path(corpus_path)
+        self.texts_path = self.corpus_path.with_name(self.corpus_path.name + ".texts")
+        self.index_path = self.corpus_path.with_name(self.corpus_path.name + ".index.json")
+        self._index: Dict[str, Tuple[str, int, int]] = {}
+        self._mmap: Optional[mmap.mmap] = None
+        # Used instead of the sidecars when they cannot be written
+        self._texts: Optional[Dict[str, str]] = None
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, source_identifier: str) -> bool:
+        return source_identifier in self._index
+
+    def _sidecars_fresh(self) -> bool:
+        try:
+            corpus_mtime = self.corpus_path.stat().st_mtime
+            return (self.texts_path.stat().st_mtime >= corpus_mtime
+                    and self.index_path.stat().st_mtime >= corpus_mtime)
+        except OSError:
+            return False
+
+    def load(self) -> bool:
+        """Load the index, building the sidecars first if needed. False if the corpus is missing."""
+        if not self._sidecars_fresh():
+            try:
+                with open(self.corpus_path, 'r') as f:
+                    documents = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.error(f"Failed to load extracted documents from {self.corpus_path}: {e}")
+                return False
+            try:
+                self.build(documents)
+            except OSError as e:
+                logger.warning(f"Could not write document index next to {self.corpus_path}: {e}; keeping it in memory")
+                self._build_in_memory(documents)
+                return True
+
+        with open(self.index_path, 'r') as f:
+            self._index = {key: tuple(value) for key, value in json.load(f).items()}
+        self._open_texts()
+        logger.info(f"Indexed {len(self._index)} full documents by source_identifier")
+        return True
+
+    def build(self, documents: List[Dict]) -> None:
+        """Write the texts and index sidecars for ``documents``."""
+        index = {}
+        # Unique temporary names, so concurrent builds never write the same file
+        texts_file = self._temporary_file(self.texts_path, 'wb')
+        index_file = self._temporary_file(self.index_path, 'w')
+        try:
+            offset = 0
+            with texts_file as f:
+                for doc in documents:
+                    url = doc.get('url') or ''
+                    source_identifier = source_identifier_for(url)
+                    # The first document with a given identifier wins, as the linear scan did
+                    if source_identifier in index:
+                        continue
+                    data = (doc.get('text') or '').encode('utf-8')
+                    f.write(data)
+                    index[source_identifier] = (url, offset, len(data))
+                    offset += len(data)
+            with index_file as f:
+                json.dump(index, f)
+            os.replace(texts_file.name, self.texts_path)
+            os.replace(index_file.name, self.index_path)
+        except BaseException:
+            for tmp in (texts_file, index_file):
+                tmp.close()
+                if os.path.exists(tmp.name):
+                    os.unlink(tmp.name)
+            raise
+
+    @staticmethod
+    def _temporary_file(path: Path, mode: str):
+        kwargs = {} if 'b' in mode else {"encoding": "utf-8"}
+        return tempfile.NamedTemporaryFile(mode, dir=path.parent, prefix=path.name + ".", suffix=".tmp",
+                                           delete=False, **kwargs)
+
+    def _build_in_memory(self, documents: List[Dict]) -> None:
+        self._index, self._texts = {}, {}
+        for doc in documents:
+            url = doc.get('url') or ''
+            source_identifier = source_identifier_for(url)
+            if source_identifier not in self._index:
+                text = doc.get('text') or ''
+                self._index[source_identifier] = (url, 0, len(text))
+                self._texts[source_identifier] = text
+
+    def _open_texts(self) -> None:
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self.texts_path.stat().st_size == 0:
+            return
+        with open(self.texts_path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def get(self, source_identifier: str) -> Optional[Dict[str, str]]:
+        """{"url", "text"} for a source_identifier, or None if unknown."""
+        entry = self._index.get(source_identifier)
+        if entry is None:
+            return None
+        url, offset, length = entry
+        if self._texts is not None:
+            text = self._texts[source_identifier]
+        elif self._mmap is None:
+            text = ''
+        else:
+            text = self._mmap[offset:offset + length].decode('utf-8')
+        return {"url": url, "text": text}
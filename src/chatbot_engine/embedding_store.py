@@ -0,0 +1,173 @@
+"""
+Persistent chunk embedding store for KG2RAG semantic retrieval.
+
+Embeddings are keyed by a hash of the chunk text, so re-indexing the same
+corpus (or a corpus that only gained chunks) encodes only what is new. One
+store holds one embedding model's vectors in two files:
+
+    <name>.f32        L2-normalized float32 rows, back to back
+    <name>.keys.json  {"model", "dimension", "keys": [chunk hash per row]}
+
+The rows file is memory-mapped read-only. New rows are appended before the
+keys file is replaced (once per ``embeddings_for`` call, not per batch), so
+an interrupted write leaves extra unreferenced rows that the next load
+ignores and overwrites.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def chunk_hash(text: str) -> str:
+    """Key of a chunk's embedding: SHA-1 of its UTF-8 text."""
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """Float32 copy of ``vectors`` with unit-length rows (zero rows stay zero)."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1.0)
+
+
+class ChunkEmbeddingStore:
+    """Append-only, memory-mapped embeddings keyed by chunk hash."""
+
+    def __init__(self, directory: str, model_name: str):
+        self.directory = Path(directory)
+        self.model_name = model_name
+        name = re.sub(r"[^\w.-]+", "_", model_name)
+        self.rows_path = self.directory / f"{name}.f32"
+        self.keys_path = self.directory / f"{name}.keys.json"
+        self.dimension: Optional[int] = None
+        self._keys: List[str] = []
+        self._rows_by_key: Dict[str, int] = {}
+        self._matrix: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._rows_by_key
+
+    def load(self) -> bool:
+        """Open an existing store. False if there is none (or it is for another model)."""
+        try:
+            with open(self.keys_path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if data.get("model") != self.model_name:
+            logger.warning(f"Embedding store {self.keys_path} was built with {data.get('model')}; ignoring it")
+            return False
+        self.dimension = int(data["dimension"])
+        self._keys = list(data["keys"])
+        self._rows_by_key = {key: row for row, key in enumerate(self._keys)}
+        self._open_rows()
+        logger.info(f"Loaded {len(self._keys)} chunk embeddings from {self.rows_path}")
+        return True
+
+    def _open_rows(self) -> None:
+        if not self._keys:
+            self._matrix = np.zeros((0, self.dimension or 0), dtype=np.float32)
+            return
+        # Rows past len(keys) are leftovers of an interrupted append
+        self._matrix = np.memmap(self.rows_path, dtype=np.float32, mode='r',
+                                 shape=(len(self._keys), self.dimension))
+
+    def add(self, keys: Sequence[str], vectors: np.ndarray, write_keys: bool = True) -> None:
+        """
+        Append normalized ``vectors`` for ``keys`` that are not stored yet.
+        With ``write_keys=False`` the new rows stay unreferenced on disk until
+        the next ``write_keys()``.
+        """
+        vectors = normalize_rows(vectors)
+        with self._lock:
+            if self.dimension is None:
+                self.dimension = vectors.shape[1]
+            elif vectors.shape[1] != self.dimension:
+                raise ValueError(f"Expected {self.dimension}-dimensional embeddings, got {vectors.shape[1]}")
+            # key -> index into vectors, first occurrence of each unseen key
+            new = {}
+            for i, key in enumerate(keys):
+                if key not in self._rows_by_key and key not in new:
+                    new[key] = i
+            if not new:
+                return
+            rows = vectors[list(new.values())]
+
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._matrix = None  # Release the old mapping before growing the file
+            with open(self.rows_path, 'r+b' if self.rows_path.exists() else 'wb') as f:
+                f.seek(len(self._keys) * self.dimension * 4)
+                f.write(np.ascontiguousarray(rows).tobytes())
+                f.truncate()
+            for key in new:
+                self._rows_by_key[key] = len(self._keys)
+                self._keys.append(key)
+            if write_keys:
+                self._write_keys()
+            self._open_rows()
+
+    def write_keys(self) -> None:
+        """Persist the keys file, making every appended row part of the store."""
+        with self._lock:
+            self._write_keys()
+
+    def _write_keys(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile('w', dir=self.directory, prefix=self.keys_path.name + ".",
+                                         suffix=".tmp", delete=False) as f:
+            json.dump({"model": self.model_name, "dimension": self.dimension, "keys": self._keys}, f)
+        try:
+            os.replace(f.name, self.keys_path)
+        except OSError:
+            os.unlink(f.name)
+            raise
+
+    def rows(self, keys: Sequence[str]) -> np.ndarray:
+        """
+        Embedding matrix for ``keys`` (all must be stored). When the keys are
+        the store's rows in order, the memory map itself is returned.
+        """
+        if len(keys) == 0:
+            return np.zeros((0, self.dimension or 0), dtype=np.float32)
+        indices = np.fromiter((self._rows_by_key[key] for key in keys), dtype=np.int64, count=len(keys))
+        if len(indices) == len(self._keys) and np.array_equal(indices, np.arange(len(indices))):
+            return self._matrix
+        return np.asarray(self._matrix[indices])
+
+    def embeddings_for(self, texts: Sequence[str], encode: Callable[[List[str]], np.ndarray],
+                       batch_size: int = 256) -> np.ndarray:
+        """Normalized embeddings for ``texts``, encoding and storing only unseen ones."""
+        keys = [chunk_hash(text) for text in texts]
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in self._rows_by_key:
+                missing.setdefault(key, text)
+        if missing:
+            logger.info(f"Encoding {len(missing)} new chunks ({len(texts) - len(missing)} already stored)")
+            missing_keys = list(missing)
+            try:
+                for start in range(0, len(missing_keys), batch_size):
+                    batch = missing_keys[start:start + batch_size]
+                    self.add(batch, encode([missing[key] for key in batch]), write_keys=False)
+            finally:
+                # One keys rewrite per call; batches encoded before a failure are kept
+                if self._keys:
+                    self.write_keys()
+        return self.rows(keys)
@@ -0,0 +1,201 @@
+"""
+Compact knowledge graph index for KG2RAG graph expansion.
+
+Triplets are stored as parallel integer arrays (head, relation, tail, chunk)
+with entities, relations and chunks mapped to dense ids. Two CSR adjacency
+tables give the triplets touching an entity and the triplets extracted from
+a chunk without any per-triplet Python objects:
+
+    entity_indptr[e]:entity_indptr[e + 1]  ->  rows of entity_triplets for e
+    chunk_indptr[c]:chunk_indptr[c + 1]    ->  rows of chunk_triplets for c
+
+``expand`` runs a bounded, score-weighted frontier expansion from seed
+chunks. Each hop follows a bounded number of triplets per entity and keeps
+only the ``beam_width`` best new entities, so a query touches a few thousand
+triplets however large the graph is.
+"""
+
+import logging
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def _csr(rows: np.ndarray, values: np.ndarray, weights: np.ndarray, num_rows: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(indptr, indices) grouping ``values`` by ``rows``, highest weight first within a row."""
+    order = np.lexsort((-weights, rows))
+    indptr = np.zeros(num_rows + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=num_rows), out=indptr[1:])
+    return indptr, values[order].astype(np.int32)
+
+
+def _gather(indptr: np.ndarray, indices: np.ndarray, rows: np.ndarray,
+            max_per_row: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """CSR entries of ``rows`` (at most ``max_per_row`` each), with the position in ``rows`` each came from."""
+    starts = indptr[rows]
+    counts = indptr[rows + 1] - starts
+    if max_per_row is not None:
+        counts = np.minimum(counts, max_per_row)
+    total = int(counts.sum())
+    if total == 0:
+        return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int64)
+    owners = np.repeat(np.arange(len(rows)), counts)
+    offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    return indices[starts[owners] + offsets], owners
+
+
+def _max_by_key(keys: np.ndarray, scores: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Unique keys and the best score seen for each."""
+    unique, inverse = np.unique(keys, return_inverse=True)
+    best = np.full(len(unique), -np.inf, dtype=np.float32)
+    np.maximum.at(best, inverse, scores)
+    return unique, best
+
+
+def _top(keys: np.ndarray, scores: np.ndarray, limit: int) -> Tuple[np.ndarray, np.ndarray]:
+    """The ``limit`` best (key, score) pairs, best first."""
+    if len(keys) > limit:
+        keep = np.argpartition(-scores, limit - 1)[:limit]
+        keys, scores = keys[keep], scores[keep]
+    order = np.argsort(-scores, kind='stable')
+    return keys[order], scores[order]
+
+
+class CompactGraph:
+    """Integer-id triplet arrays with entity and chunk CSR adjacency."""
+
+    # Arrays that fully describe a graph (see ``arrays``)
+    ARRAY_NAMES = ("heads", "relation_ids", "tails", "triplet_chunks", "confidences",
+                   "entity_indptr", "entity_triplets", "chunk_indptr", "chunk_triplets")
+
+    def __init__(self, entities: List[str], relations: List[str], chunk_ids: List[str],
+                 heads: np.ndarray, relation_ids: np.ndarray, tails: np.ndarray,
+                 triplet_chunks: np.ndarray, confidences: np.ndarray,
+                 adjacency: Optional[Dict[str, np.ndarray]] = None):
+        self.entities = entities
+        self.relations = relations
+        self.chunk_ids = chunk_ids
+        self.entity_index = {name: i for i, name in enumerate(entities)}
+        self.chunk_index = {chunk_id: i for i, chunk_id in enumerate(chunk_ids)}
+        self.heads = np.asarray(heads, dtype=np.int32)
+        self.relation_ids = np.asarray(relation_ids, dtype=np.int32)
+        self.tails = np.asarray(tails, dtype=np.int32)
+        self.triplet_chunks = np.asarray(triplet_chunks, dtype=np.int32)
+        self.confidences = np.asarray(confidences, dtype=np.float32)
+
+        if adjacency is not None:
+            # Precomputed CSR tables, e.g. from a saved artifact
+            self.entity_indptr = adjacency["entity_indptr"]
+            self.entity_triplets = adjacency["entity_triplets"]
+            self.chunk_indptr = adjacency["chunk_indptr"]
+            self.chunk_triplets = adjacency["chunk_triplets"]
+            return
+        triplet_ids = np.arange(len(self.heads), dtype=np.int32)
+        self.entity_indptr, self.entity_triplets = _csr(
+            np.concatenate([self.heads, self.tails]), np.concatenate([triplet_ids, triplet_ids]),
+            np.concatenate([self.confidences, self.confidences]), len(entities))
+        self.chunk_indptr, self.chunk_triplets = _csr(self.triplet_chunks, triplet_ids, self.confidences, len(chunk_ids))
+
+    def __len__(self) -> int:
+        return len(self.heads)
+
+    @classmethod
+    def from_triplets(cls, triplets: Iterable, chunk_ids: Sequence[str] = ()) -> "CompactGraph":
+        """
+        Build from objects with head, relation, tail, chunk_id and confidence.
+        ``chunk_ids`` fixes the chunk id order (e.g. to match an embedding
+        matrix); chunks that only appear in triplets are appended.
+        """
+        entity_index: Dict[str, int] = {}
+        relation_index: Dict[str, int] = {}
+        chunk_index: Dict[str, int] = {chunk_id: i for i, chunk_id in enumerate(chunk_ids)}
+        columns: Tuple[List[int], ...] = ([], [], [], [])
+        confidences: List[float] = []
+        for triplet in triplets:
+            columns[0].append(entity_index.setdefault(triplet.head, len(entity_index)))
+            columns[1].append(relation_index.setdefault(triplet.relation, len(relation_index)))
+            columns[2].append(entity_index.setdefault(triplet.tail, len(entity_index)))
+            columns[3].append(chunk_index.setdefault(triplet.chunk_id, len(chunk_index)))
+            confidences.append(triplet.confidence)
+        return cls(list(entity_index), list(relation_index), list(chunk_index),
+                   np.array(columns[0], dtype=np.int32), np.array(columns[1], dtype=np.int32),
+                   np.array(columns[2], dtype=np.int32), np.array(columns[3], dtype=np.int32),
+                   np.array(confidences, dtype=np.float32))
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """The graph's numeric arrays by name, for serialization."""
+        return {name: getattr(self, name) for name in self.ARRAY_NAMES}
+
+    @classmethod
+    def from_arrays(cls, entities: List[str], relations: List[str], chunk_ids: List[str],
+                    arrays: Dict[str, np.ndarray]) -> "CompactGraph":
+        """Rebuild a graph from ``arrays()`` output without recomputing adjacency."""
+        return cls(entities, relations, chunk_ids, arrays["heads"], arrays["relation_ids"], arrays["tails"],
+                   arrays["triplet_chunks"], arrays["confidences"], adjacency=arrays)
+
+    def triplet(self, index: int) -> Tuple[str, str, str, str, float]:
+        """(head, relation, tail, chunk_id, confidence) of one triplet."""
+        return (self.entities[self.heads[index]], self.relations[self.relation_ids[index]],
+                self.entities[self.tails[index]], self.chunk_ids[self.triplet_chunks[index]],
+                float(self.confidences[index]))
+
+    def expand(self, seed_scores: Dict[str, float], max_hops: int, beam_width: int = 50,
+               max_triplets: int = 200, hop_decay: float = 0.8,
+               max_degree: int = 100) -> Tuple[Dict[str, float], np.ndarray]:
+        """
+        Score-weighted frontier expansion from seed chunks.
+
+        Seed entities take the best score of the seed chunks they were
+        extracted from. Crossing a triplet multiplies the score by its
+        confidence and ``hop_decay``. Each hop follows at most ``max_degree``
+        triplets per entity (most confident first), so hub entities such as
+        "State of Hawaii" cost no more than ordinary ones. It then keeps the
+        ``beam_width`` best unvisited entities. Returns {chunk_id: best
+        triplet score} for every chunk reached (seeds included) and the ids
+        of the ``max_triplets`` best triplets, best first.
+        """
+        seeds = [(self.chunk_index[c], s) for c, s in seed_scores.items() if c in self.chunk_index]
+        if not seeds or len(self) == 0:
+            return {}, np.zeros(0, dtype=np.int32)
+        seed_chunks = np.array([c for c, _ in seeds], dtype=np.int64)
+        seed_values = np.array([s for _, s in seeds], dtype=np.float32)
+
+        # Hop 0: the seed chunks' own triplets
+        triplet_ids, owners = _gather(self.chunk_indptr, self.chunk_triplets, seed_chunks)
+        triplet_scores = seed_values[owners] * self.confidences[triplet_ids]
+        found_triplets, found_scores = [triplet_ids], [triplet_scores]
+        frontier, frontier_scores = _max_by_key(
+            np.concatenate([self.heads[triplet_ids], self.tails[triplet_ids]]),
+            np.concatenate([seed_values[owners], seed_values[owners]]))
+        frontier, frontier_scores = _top(frontier, frontier_scores, beam_width)
+        visited = frontier
+
+        for _ in range(max_hops):
+            if len(frontier) == 0:
+                break
+            triplet_ids, owners = _gather(self.entity_indptr, self.entity_triplets, frontier.astype(np.int64), max_degree)
+            if len(triplet_ids) == 0:
+                break
+            scores = frontier_scores[owners] * self.confidences[triplet_ids] * hop_decay
+            found_triplets.append(triplet_ids)
+            found_scores.append(scores)
+
+            # The far end of each triplet becomes a candidate for the next frontier
+            heads = self.heads[triplet_ids]
+            neighbours = np.where(heads == frontier[owners], self.tails[triplet_ids], heads)
+            candidates, candidate_scores = _max_by_key(neighbours, scores)
+            unvisited = ~np.isin(candidates, visited)
+            frontier, frontier_scores = _top(candidates[unvisited], candidate_scores[unvisited], beam_width)
+            visited = np.concatenate([visited, frontier])
+
+        triplet_ids, triplet_scores = _max_by_key(np.concatenate(found_triplets), np.concatenate(found_scores))
+        triplet_ids, triplet_scores = _top(triplet_ids, triplet_scores, max_triplets)
+
+        chunk_ids, chunk_scores = _max_by_key(self.triplet_chunks[triplet_ids], triplet_scores)
+        reached = {self.chunk_ids[c]: float(s) for c, s in zip(chunk_ids, chunk_scores)}
+        for chunk, score in seeds:
+            chunk_id = self.chunk_ids[chunk]
+            reached[chunk_id] = max(reached.get(chunk_id, float(score)), float(score))
+        return reached, triplet_ids.astype(np.int32)
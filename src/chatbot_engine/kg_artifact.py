@@ -0,0 +1,137 @@
+"""
+Binary artifact holding everything KG2RAG multi-hop retrieval needs.
+
+The offline build (kg_builder.py) writes chunks, the compact knowledge graph
+and normalized chunk embeddings to one file:
+
+    b"KG2RAG01"                      magic and format version
+    uint64 little-endian             header length
+    header JSON                      model, string tables, array directory
+    padding to 64 bytes
+    raw arrays                       each 64-byte aligned, offsets in header
+
+Loading is a single read() of the file. The arrays are zero-copy views into
+that buffer, and only the chunk objects and string tables are built in Python.
+"""
+
+import json
+import logging
+import os
+import struct
+import tempfile
+from typing import Any, Dict, List, NamedTuple
+
+import numpy as np
+
+try:
+    from .graph_index import CompactGraph
+    from .schemas import Chunk
+except ImportError:
+    from graph_index import CompactGraph
+    from schemas import Chunk
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"KG2RAG01"
+ALIGNMENT = 64
+
+
+class KGArtifact(NamedTuple):
+    chunks: List[Chunk]
+    graph: CompactGraph
+    embeddings: np.ndarray  # float32, one L2-normalized row per chunk
+    embedding_model: str
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def save_kg_artifact(path: str, chunks: List[Chunk], graph: CompactGraph,
+                     embeddings: np.ndarray, embedding_model: str) -> None:
+    """Write the artifact atomically; ``graph.chunk_ids`` must list ``chunks`` in order."""
+    if [chunk.id for chunk in chunks] != graph.chunk_ids[:len(chunks)] or len(graph.chunk_ids) != len(chunks):
+        raise ValueError("Graph chunk ids must match the chunks, in order")
+    if len(embeddings) != len(chunks):
+        raise ValueError(f"{len(chunks)} chunks but {len(embeddings)} embeddings")
+
+    encoded = [chunk.content.encode('utf-8') for chunk in chunks]
+    text_offsets = np.zeros(len(chunks) + 1, dtype=np.int64)
+    np.cumsum([len(text) for text in encoded], out=text_offsets[1:])
+    arrays: Dict[str, np.ndarray] = dict(graph.arrays())
+    arrays["embeddings"] = np.ascontiguousarray(embeddings, dtype=np.float32)
+    arrays["text_offsets"] = text_offsets
+    arrays["texts"] = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    arrays["chunk_spans"] = np.array([[chunk.start_pos, chunk.end_pos] for chunk in chunks],
+                                     dtype=np.int64).reshape(len(chunks), 2)
+
+    directory, offset = {}, 0
+    for name, array in arrays.items():
+        offset = _aligned(offset)
+        directory[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset += array.nbytes
+    header = json.dumps({
+        "embedding_model": embedding_model,
+        "entities": graph.entities,
+        "relations": graph.relations,
+        "chunk_ids": graph.chunk_ids,
+        "chunk_documents": [chunk.document_id for chunk in chunks],
+        "chunk_metadata": [chunk.metadata for chunk in chunks],
+        "arrays": directory,
+    }).encode('utf-8')
+    data_start = _aligned(len(MAGIC) + 8 + len(header))
+
+    directory_path = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory_path, exist_ok=True)
+    with tempfile.NamedTemporaryFile('wb', dir=directory_path, prefix=os.path.basename(path) + ".",
+                                     suffix=".tmp", delete=False) as f:
+        try:
+            f.write(MAGIC + struct.pack("<Q", len(header)) + header)
+            for name, array in arrays.items():
+                f.seek(data_start + directory[name]["offset"])
+                f.write(np.ascontiguousarray(array).tobytes())
+            # Empty trailing arrays write nothing; extend the file to their offsets
+            f.truncate(data_start + offset)
+        except BaseException:
+            f.close()
+            os.unlink(f.name)
+            raise
+    os.replace(f.name, path)
+    logger.info(f"Wrote KG artifact {path}: {len(chunks)} chunks, {len(graph)} triplets, "
+                f"{os.path.getsize(path) / 1e6:.1f} MB")
+
+
+def load_kg_artifact(path: str) -> KGArtifact:
+    """Read an artifact written by ``save_kg_artifact``."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not a KG2RAG artifact")
+    (header_length,) = struct.unpack_from("<Q", data, len(MAGIC))
+    header_start = len(MAGIC) + 8
+    header: Dict[str, Any] = json.loads(data[header_start:header_start + header_length])
+    data_start = _aligned(header_start + header_length)
+
+    arrays = {}
+    for name, entry in header["arrays"].items():
+        dtype = np.dtype(entry["dtype"])
+        count = int(np.prod(entry["shape"], dtype=np.int64))
+        arrays[name] = np.frombuffer(data, dtype=dtype, count=count,
+                                     offset=data_start + entry["offset"]).reshape(entry["shape"])
+
+    chunk_ids = header["chunk_ids"]
+    texts, text_offsets, spans = arrays["texts"], arrays["text_offsets"], arrays["chunk_spans"]
+    chunks = [
+        Chunk(
+            id=chunk_id,
+            content=texts[text_offsets[i]:text_offsets[i + 1]].tobytes().decode('utf-8'),
+            document_id=header["chunk_documents"][i],
+            start_pos=int(spans[i, 0]),
+            end_pos=int(spans[i, 1]),
+            metadata=header["chunk_metadata"][i],
+        )
+        for i, chunk_id in enumerate(chunk_ids)
+    ]
+    graph = CompactGraph.from_arrays(header["entities"], header["relations"], chunk_ids, arrays)
+    logger.info(f"Loaded KG artifact {path}: {len(chunks)} chunks, {len(graph)} triplets")
+    return KGArtifact(chunks, graph, arrays["embeddings"], header["embedding_model"])
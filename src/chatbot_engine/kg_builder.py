@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Offline knowledge graph build for KG2RAG multi-hop retrieval.
+
+Extracts (head, relation, tail) triplets from every chunk of the bills
+corpus with Gemini, embeds the chunks, and writes a single binary artifact
+(see kg_artifact.py) that OnlineRetriever.index_artifact loads at startup:
+
+    python kg_builder.py documents/chunked_text/bills/bills_chunked_no_sentence.json \\
+        --output documents/knowledge_graph/bills_kg.bin --workers 8
+
+Extraction runs in parallel worker threads and is checkpointed per chunk in
+``<output>.triplets.jsonl``. An interrupted build resumes where it stopped;
+chunks whose text changed are extracted again. Chunk embeddings are kept in a
+ChunkEmbeddingStore next to the output, so rebuilds only encode new chunks.
+"""
+
+import argparse
+import concurrent.futures
+import json
+import logging
+import math
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+try:
+    from .embedding_store import ChunkEmbeddingStore, chunk_hash, normalize_rows
+    from .graph_index import CompactGraph
+    from .kg_artifact import save_kg_artifact
+    from .schemas import Chunk, KG2RAGConfig, Triplet
+except ImportError:
+    from embedding_store import ChunkEmbeddingStore, chunk_hash, normalize_rows
+    from graph_index import CompactGraph
+    from kg_artifact import save_kg_artifact
+    from schemas import Chunk, KG2RAGConfig, Triplet
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNKS_PATH = os.path.join("documents", "chunked_text", "bills", "bills_chunked_no_sentence.json")
+DEFAULT_ARTIFACT_PATH = os.path.join("documents", "knowledge_graph", "bills_kg.bin")
+DEFAULT_EXTRACTION_MODEL = "gemini-2.5-flash"
+MAX_TRIPLETS_PER_CHUNK = 20
+
+EXTRACTION_PROMPT = """Extract knowledge graph triplets from this excerpt of a Hawaii legislative bill.
+
+Each triplet is (head entity, relation, tail entity). Entities are specific things: bill numbers
+(HB727, SB1367), agencies and departments, programs, funds, statutes (HRS sections), places,
+dollar amounts, fiscal years and people. Relations are short verb phrases ("appropriates",
+"amends", "administered by", "effective on"). Use the exact bill numbers and names from the text.
+Return at most {max_triplets} triplets with a confidence between 0 and 1; skip boilerplate.
+
+BILL: {source}
+TEXT:
+{text}
+
+RESPOND IN JSON:
+{{"triplets": [{{"head": "...", "relation": "...", "tail": "...", "confidence": 0.9}}]}}"""
+
+
+def load_bill_chunks(path: str) -> List[Chunk]:
+    """Chunks of bills_chunked_no_sentence.json, keyed "<source_identifier>:<chunk_id>"."""
+    with open(path, 'r', encoding='utf-8') as f:
+        records = json.load(f)
+    chunks, seen = [], set()
+    for record in records:
+        chunk_id = f"{record.get('source_identifier', '')}:{record.get('chunk_id', len(chunks))}"
+        if chunk_id in seen or not record.get('text'):
+            continue
+        seen.add(chunk_id)
+        chunks.append(Chunk(
+            id=chunk_id,
+            content=record['text'],
+            document_id=record.get('source_identifier', ''),
+            start_pos=0,
+            end_pos=len(record['text']),
+            metadata={key: record[key] for key in ('source_identifier', 'chunk_id', 'chunking_method', 'source_page')
+                      if key in record},
+        ))
+    return chunks
+
+
+def _normalize_entity(name: str) -> str:
+    return " ".join(str(name).split())
+
+
+def _confidence(value) -> float:
+    try:
+        confidence = float(value)
+    except (TypeError, ValueError):
+        return 1.0
+    return min(max(confidence, 0.0), 1.0) if math.isfinite(confidence) else 1.0
+
+
+def _parse_triplets(data, chunk_id: str, max_triplets: int) -> List[Triplet]:
+    """
+    Triplets from the model's JSON response. Malformed items are skipped (and
+    an unusable confidence defaults to 1.0) rather than failing the chunk,
+    which would re-extract it on every run.
+    """
+    items = data.get("triplets") if isinstance(data, dict) else None
+    if not isinstance(items, list):
+        return []
+    triplets = []
+    for item in items[:max_triplets]:
+        if not isinstance(item, dict):
+            continue
+        head, relation, tail = (_normalize_entity(item.get(key) or "") for key in ("head", "relation", "tail"))
+        if head and relation and tail:
+            triplets.append(Triplet(head, relation, tail, chunk_id, _confidence(item.get("confidence", 1.0))))
+    return triplets
+
+
+class GeminiTripletExtractor:
+    """Triplet extraction for one chunk per call, with JSON output and retries."""
+
+    def __init__(self, model_name: str = DEFAULT_EXTRACTION_MODEL, max_triplets: int = MAX_TRIPLETS_PER_CHUNK,
+                 max_retries: int = 3):
+        import google.generativeai as genai
+
+        self.genai = genai
+        self.model = genai.GenerativeModel(model_name)
+        self.max_triplets = max_triplets
+        self.max_retries = max_retries
+
+    def __call__(self, chunk: Chunk) -> List[Triplet]:
+        prompt = EXTRACTION_PROMPT.format(max_triplets=self.max_triplets,
+                                          source=chunk.metadata.get('source_identifier', chunk.document_id),
+                                          text=chunk.content)
+        for attempt in range(self.max_retries):
+            try:
+                response = self.model.generate_content(
+                    prompt,
+                    generation_config=self.genai.types.GenerationConfig(
+                        temperature=0.0,
+                        response_mime_type="application/json"
+                    )
+                )
+                data = json.loads(response.text)
+                break
+            except Exception as e:
+                if attempt == self.max_retries - 1:
+                    raise
+                delay = 2 ** attempt
+                logger.warning(f"Extraction failed for {chunk.id} ({e}); retrying in {delay}s")
+                time.sleep(delay)
+
+        return _parse_triplets(data, chunk.id, self.max_triplets)
+
+
+class TripletCheckpoint:
+    """Append-only JSONL of extracted triplets, one line per finished chunk."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def load(self) -> Dict[str, tuple]:
+        """{chunk_id: (chunk hash, [Triplet])} of every finished chunk."""
+        done = {}
+        if not os.path.exists(self.path):
+            return done
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # A line cut short by an interrupted write
+                done[entry["chunk_id"]] = (entry["hash"], [
+                    Triplet(head, relation, tail, entry["chunk_id"], confidence)
+                    for head, relation, tail, confidence in entry["triplets"]
+                ])
+        return done
+
+    def append(self, chunk: Chunk, triplets: List[Triplet]) -> None:
+        line = json.dumps({
+            "chunk_id": chunk.id,
+            "hash": chunk_hash(chunk.content),
+            "triplets": [[t.head, t.relation, t.tail, t.confidence] for t in triplets],
+        })
+        with self._lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + "\n")
+
+
+def extract_triplets(chunks: List[Chunk], extract: Callable[[Chunk], List[Triplet]],
+                     checkpoint: TripletCheckpoint, max_workers: int = 8) -> Dict[str, List[Triplet]]:
+    """
+    Triplets for every chunk, extracting only chunks without an up-to-date
+    checkpoint entry. Chunks that still fail are left out (and retried by the
+    next run).
+    """
+    done = checkpoint.load()
+    results = {chunk.id: done[chunk.id][1] for chunk in chunks
+               if chunk.id in done and done[chunk.id][0] == chunk_hash(chunk.content)}
+    pending = [chunk for chunk in chunks if chunk.id not in results]
+    logger.info(f"Triplet extraction: {len(results)} chunks checkpointed, {len(pending)} to extract")
+    if not pending:
+        return results
+
+    failed = 0
+    started = time.time()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = {executor.submit(extract, chunk): chunk for chunk in pending}
+        for finished, future in enumerate(concurrent.futures.as_completed(futures), 1):
+            chunk = futures[future]
+            try:
+                triplets = future.result()
+            except Exception as e:
+                failed += 1
+                logger.error(f"Giving up on {chunk.id} for this run: {e}")
+                continue
+            checkpoint.append(chunk, triplets)
+            results[chunk.id] = triplets
+            if finished % 100 == 0 or finished == len(pending):
+                rate = finished / max(time.time() - started, 1e-9)
+                logger.info(f"Extracted {finished}/{len(pending)} chunks ({rate:.1f}/s, {failed} failed)")
+    return results
+
+
+def build_graph(chunks: List[Chunk], triplets_by_chunk: Dict[str, List[Triplet]]) -> CompactGraph:
+    """CompactGraph over ``chunks`` (in order); entity names are merged case-insensitively."""
+    canonical: Dict[str, str] = {}
+
+    def entity(name: str) -> str:
+        return canonical.setdefault(name.lower(), name)
+
+    triplets = (
+        Triplet(entity(t.head), t.relation.lower(), entity(t.tail), t.chunk_id, t.confidence)
+        for chunk in chunks for t in triplets_by_chunk.get(chunk.id, [])
+    )
+    return CompactGraph.from_triplets(triplets, [chunk.id for chunk in chunks])
+
+
+def embed_chunks(chunks: List[Chunk], embedding_model: str, cache_dir: Optional[str] = None) -> np.ndarray:
+    """Normalized chunk embeddings, reusing (and filling) the embedding store in ``cache_dir``."""
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(embedding_model)
+
+    def encode(texts: List[str]) -> np.ndarray:
+        return normalize_rows(model.encode(texts, show_progress_bar=len(texts) > 256))
+
+    texts = [chunk.content for chunk in chunks]
+    if cache_dir is None:
+        return encode(texts)
+    store = ChunkEmbeddingStore(cache_dir, embedding_model)
+    store.load()
+    return np.asarray(store.embeddings_for(texts, encode))
+
+
+def build_kg_artifact(chunks_path: str = DEFAULT_CHUNKS_PATH, output_path: str = DEFAULT_ARTIFACT_PATH,
+                      extract: Optional[Callable[[Chunk], List[Triplet]]] = None,
+                      embed: Optional[Callable[[List[Chunk]], np.ndarray]] = None,
+                      embedding_model: Optional[str] = None, max_workers: int = 8,
+                      limit: Optional[int] = None) -> str:
+    """Run the whole offline build and return the artifact path."""
+    embedding_model = embedding_model or KG2RAGConfig().embedding_model
+    chunks = load_bill_chunks(chunks_path)
+    if limit is not None:
+        chunks = chunks[:limit]
+    if not chunks:
+        raise ValueError(f"No chunks to build a knowledge graph from in {chunks_path}")
+    logger.info(f"Loaded {len(chunks)} chunks from {chunks_path}")
+
+    triplets_by_chunk = extract_triplets(chunks, extract or GeminiTripletExtractor(),
+                                         TripletCheckpoint(output_path + ".triplets.jsonl"), max_workers)
+    graph = build_graph(chunks, triplets_by_chunk)
+    if embed is not None:
+        embeddings = embed(chunks)
+    else:
+        embeddings = embed_chunks(chunks, embedding_model, output_path + ".embeddings")
+
+    missing = len(chunks) - len(triplets_by_chunk)
+    if missing:
+        logger.warning(f"{missing} chunks have no triplets yet; rerun the build to retry them")
+    save_kg_artifact(output_path, chunks, graph, embeddings, embedding_model)
+    return output_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the KG2RAG knowledge graph artifact for the bills corpus")
+    parser.add_argument("chunks_file", nargs="?", default=DEFAULT_CHUNKS_PATH,
+                        help="Chunked bills JSON (source_identifier, chunk_id, text, ...)")
+    parser.add_argument("--output", default=DEFAULT_ARTIFACT_PATH, help="Artifact path")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent extraction calls")
+    parser.add_argument("--model", default=DEFAULT_EXTRACTION_MODEL, help="Gemini model for triplet extraction")
+    parser.add_argument("--embedding-model", default=None, help="SentenceTransformer model for chunk embeddings")
+    parser.add_argument("--limit", type=int, default=None, help="Only process the first N chunks (trial runs)")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        print("❌ GEMINI_API_KEY environment variable not set")
+        return
+    import google.generativeai as genai
+    genai.configure(api_key=api_key)
+
+    path = build_kg_artifact(args.chunks_file, args.output, extract=GeminiTripletExtractor(args.model),
+                             embedding_model=args.embedding_model, max_workers=args.workers, limit=args.limit)
+    print(f"✅ Knowledge graph artifact written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,7 @@ Advanced NLP Backend for Financial RAG System
 Implements a multi-step pipeline with LLM-guided decision making
 """
 
+import concurrent.futures
 import json
 import logging
 from enum import Enum
@@ -14,6 +15,15 @@ from pathlib import Path
 import re
 
 # Handle both relative and absolute imports
+try:
+    from .conversation_store import ConversationStore, create_conversation_store
+    from .document_index import SourceDocumentIndex
+    from .reranker import create_reranker
+except ImportError:
+    from conversation_store import ConversationStore, create_conversation_store
+    from document_index import SourceDocumentIndex
+    from reranker import create_reranker
+
 try:
     from .retrieval import OnlineRetriever
     from .schemas import KG2RAGConfig, Document, Chunk
@@ -47,6 +57,10 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Retrieval plan used when the planner leaves num_documents out (and by the fallbacks)
+DEFAULT_NUM_DOCUMENTS = 3
+MAX_NUM_DOCUMENTS = 10
+
 class RetrievalMethod(Enum):
     """Available retrieval methods"""
     KEYWORD_MATCHING = "keyword_matching"
@@ -70,9 +84,45 @@ class GlobalState:
     last_retrieval_method: Optional[RetrievalMethod] = None
     last_query_type: Optional[QueryType] = None
     
+    # Per-conversation history caps applied before every save
+    MAX_CONTEXT_HISTORY = 10
+    MAX_CURRENT_DOCUMENTS = 20
+    MAX_DECISION_HISTORY = 20
+    MAX_SOURCE_REFERENCES = 10
+    
     def __post_init__(self):
         if self.source_references is None:
             self.source_references = []
+    
+    def trim(self):
+        """Drop the oldest entries beyond the history caps"""
+        self.context_history = self.context_history[-self.MAX_CONTEXT_HISTORY:]
+        self.current_documents = self.current_documents[-self.MAX_CURRENT_DOCUMENTS:]
+        self.decision_history = self.decision_history[-self.MAX_DECISION_HISTORY:]
+        self.source_references = self.source_references[-self.MAX_SOURCE_REFERENCES:]
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "conversation_id": self.conversation_id,
+            "context_history": self.context_history,
+            "current_documents": self.current_documents,
+            "decision_history": self.decision_history,
+            "source_references": self.source_references,
+            "last_retrieval_method": self.last_retrieval_method.value if self.last_retrieval_method else None,
+            "last_query_type": self.last_query_type.value if self.last_query_type else None,
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "GlobalState":
+        return cls(
+            conversation_id=data["conversation_id"],
+            context_history=data.get("context_history", []),
+            current_documents=data.get("current_documents", []),
+            decision_history=data.get("decision_history", []),
+            source_references=data.get("source_references", []),
+            last_retrieval_method=RetrievalMethod(data["last_retrieval_method"]) if data.get("last_retrieval_method") else None,
+            last_query_type=QueryType(data["last_query_type"]) if data.get("last_query_type") else None,
+        )
 
 @dataclass
 class Step1Decision:
@@ -90,6 +140,7 @@ class Step2QueryGeneration:
     search_terms: List[str]
     retrieval_method: RetrievalMethod
     reasoning: str
+    hypothetical_answer: Optional[str] = None  # Filled by the merged planning call
 
 @dataclass
 class RetrievalResult:
@@ -102,7 +153,8 @@ class RetrievalResult:
 class NLPBackend:
     """Main NLP Backend orchestrator"""
     
-    def __init__(self, collection_managers: Dict[str, Any], config: Dict[str, Any]):
+    def __init__(self, collection_managers: Dict[str, Any], config: Dict[str, Any],
+                 conversation_store: Optional[ConversationStore] = None):
         self.collection_managers = collection_managers
         self.config = config
         self.collection_names = config["collections"]
@@ -121,37 +173,85 @@ class NLPBackend:
             logger.error(f"Failed to load chunked data: {e}")
             self.chunked_data = []
         
-        # Load extracted data for full documents
-        try:
-            with open(self.extracted_data_path, 'r') as f:
-                self.extracted_data = json.load(f)
-            logger.info(f"Loaded {len(self.extracted_data)} full documents from real data")
-        except Exception as e:
-            logger.error(f"Failed to load extracted data: {e}")
-            self.extracted_data = []
+        # Index full documents by source_identifier; texts are memory-mapped
+        # from a sidecar file built next to the extracted corpus
+        self.document_index = SourceDocumentIndex(self.extracted_data_path)
+        self.document_index.load()
         
         # Initialize Gemini model
         self.model = genai.GenerativeModel('gemini-2.5-flash')
         
+        # Step 5 reranker; the LLM is only used when config selects "llm" mode
+        self.reranker = create_reranker(config, self.model)
+        
+        # Steps 1 and 2 (plus the dense hypothetical answer) as one LLM call
+        backend_config = config.get("nlp_backend", {})
+        self.merged_planning = backend_config.get("merged_planning", True)
+        self.max_parallel_searches = backend_config.get("max_parallel_searches", 8)
+        
         # Initialize retrieval components
         self.kg2rag_config = KG2RAGConfig()
-        self.online_retriever = None  # Will be initialized when needed
+        # Multi-hop retrieval needs the offline knowledge graph build (kg_builder.py)
+        self.online_retriever = self._load_online_retriever(backend_config.get("kg_artifact_path"))
         
-        # Global state management
-        self.states: Dict[str, GlobalState] = {}
+        # Conversation state management (bounded; optionally shared through Redis)
+        self.conversation_store = conversation_store or create_conversation_store(config)
         
         logger.info("NLP Backend initialized")
 
+    def _load_online_retriever(self, artifact_path: Optional[str]):
+        """KG2RAG retriever over the prebuilt graph artifact, or None if it is unavailable"""
+        if not artifact_path or OnlineRetriever is None:
+            return None
+        if not Path(artifact_path).exists():
+            logger.info(f"No knowledge graph artifact at {artifact_path}; multi-hop retrieval uses dense fallback")
+            return None
+        try:
+            retriever = OnlineRetriever(self.kg2rag_config)
+            retriever.index_artifact(artifact_path)
+            return retriever
+        except Exception as e:
+            logger.error(f"Failed to load knowledge graph artifact {artifact_path}: {e}")
+            return None
+
     def get_or_create_state(self, conversation_id: str) -> GlobalState:
         """Get or create global state for a conversation"""
-        if conversation_id not in self.states:
-            self.states[conversation_id] = GlobalState(
+        state = self.conversation_store.get(conversation_id)
+        if state is None:
+            state = GlobalState(
                 conversation_id=conversation_id,
                 context_history=[],
                 current_documents=[],
                 decision_history=[]
             )
-        return self.states[conversation_id]
+        return state
+    
+    def save_state(self, state: GlobalState):
+        """Trim and persist conversation state after a query"""
+        state.trim()
+        try:
+            self.conversation_store.put(state)
+        except Exception as e:
+            logger.error(f"Failed to save conversation state {state.conversation_id}: {e}")
+
+    def record_cached_turn(self, conversation_id: str, user_query: str, result: Dict[str, Any]):
+        """Seed a new conversation with a turn answered from the answer cache,
+        so follow-ups see the same history and sources as after process_query"""
+        state = self.get_or_create_state(conversation_id)
+        answer = result.get("answer") or ""
+        state.context_history.append(f"Q: {user_query}")
+        state.context_history.append(f"A: {answer[:200]}...")
+        for i, source in enumerate(result.get("sources") or []):
+            metadata = source.get("metadata") or {}
+            state.current_documents.append(metadata.get("id", f"doc_{i}"))
+            state.source_references.append({
+                "source_identifier": metadata.get("source_identifier", "unknown"),
+                "content_preview": (source.get("content") or "")[:200],
+                "timestamp": time.time(),
+                "query": user_query
+            })
+        state.current_documents = list(dict.fromkeys(state.current_documents))
+        self.save_state(state)
 
     def step1_document_retrieval_decision(self, user_query: str, state: GlobalState) -> Step1Decision:
         """
@@ -159,16 +259,7 @@ class NLPBackend:
         """
         logger.info("Step 1: Document Retrieval Decision")
         
-        # Build context from conversation history
-        context_info = "None (new conversation)"
-        if state.current_documents:
-            context_info = f"Current documents in context: {', '.join(state.current_documents)}"
-        
-        if state.context_history:
-            recent_context = state.context_history[-3:]  # Last 3 exchanges
-            context_info = f"Recent conversation:\n" + "\n".join(recent_context)
-            if state.current_documents:
-                context_info += f"\nCurrent documents: {', '.join(state.current_documents)}"
+        context_info = self._conversation_context_info(state)
 
         prompt = f"""You are an intelligent document retrieval planner for a financial RAG system.
 
@@ -218,61 +309,90 @@ RESPOND IN PLAIN JSON FORMAT (no markdown, no code blocks):
             response = self.model.generate_content(prompt)
             logger.debug(f"\n=== STEP 1 LLM RESPONSE ===\n{response.text}\n=== END RESPONSE ===")
             
-            # Clean the response text to handle markdown formatting
-            response_text = response.text.strip()
-            if response_text.startswith('```json'):
-                response_text = response_text[7:]  # Remove ```json
-            if response_text.endswith('```'):
-                response_text = response_text[:-3]  # Remove ```
-            response_text = response_text.strip()
-            
-            decision_data = json.loads(response_text)
-            
-            # Check if LLM can answer immediately
-            if decision_data.get("can_answer_immediately", False):
-                decision = Step1Decision(
-                    query_type=QueryType.FOLLOW_UP,  # Skip retrieval
-                    num_documents=0,
-                    retrieve_full_document=False,
-                    reasoning=decision_data["reasoning"],
-                    immediate_answer=decision_data.get("immediate_answer"),
-                    can_answer_immediately=True
-                )
-            else:
-                decision = Step1Decision(
-                    query_type=QueryType(decision_data["query_type"]),
-                    num_documents=decision_data["num_documents"],
-                    retrieve_full_document=decision_data["retrieve_full_document"],
-                    reasoning=decision_data["reasoning"],
-                    immediate_answer=None,
-                    can_answer_immediately=False
-                )
-            
-            # Update state
-            state.decision_history.append({
-                "step": "document_retrieval_decision",
-                "decision": decision_data,
-                "timestamp": time.time()
-            })
-            state.last_query_type = decision.query_type
-            
-            if decision.can_answer_immediately:
-                logger.info(f"Step 1 Decision: Can answer immediately - {decision.immediate_answer[:50]}...")
-            else:
-                logger.info(f"Step 1 Decision: {decision.query_type.value}, {decision.num_documents} docs, full_doc: {decision.retrieve_full_document}")
-            return decision
+            decision_data = self._parse_json_response(response.text)
+            return self._step1_decision_from_data(decision_data, state)
             
         except Exception as e:
             logger.error(f"Error in Step 1: {e}")
-            # Fallback decision
-            return Step1Decision(
-                query_type=QueryType.NEW_DOCUMENT,
-                num_documents=3,
+            return self._fallback_step1_decision(e)
+
+    def _conversation_context_info(self, state: GlobalState) -> str:
+        """Conversation context shown to the planning prompts"""
+        context_info = "None (new conversation)"
+        if state.current_documents:
+            context_info = f"Current documents in context: {', '.join(state.current_documents)}"
+        
+        if state.context_history:
+            recent_context = state.context_history[-3:]  # Last 3 exchanges
+            context_info = f"Recent conversation:\n" + "\n".join(recent_context)
+            if state.current_documents:
+                context_info += f"\nCurrent documents: {', '.join(state.current_documents)}"
+        return context_info
+
+    @staticmethod
+    def _parse_json_response(text: str) -> Dict[str, Any]:
+        """Parse an LLM JSON response, tolerating markdown code fences"""
+        response_text = text.strip()
+        if response_text.startswith('```json'):
+            response_text = response_text[7:]  # Remove ```json
+        if response_text.endswith('```'):
+            response_text = response_text[:-3]  # Remove ```
+        return json.loads(response_text.strip())
+
+    def _step1_decision_from_data(self, decision_data: Dict[str, Any], state: GlobalState) -> Step1Decision:
+        """Build the Step 1 decision from the LLM's JSON and record it in the state"""
+        # Check if LLM can answer immediately (an immediate answer without text is not one)
+        if decision_data.get("can_answer_immediately", False) and decision_data.get("immediate_answer"):
+            decision = Step1Decision(
+                query_type=QueryType.FOLLOW_UP,  # Skip retrieval
+                num_documents=0,
                 retrieve_full_document=False,
-                reasoning=f"Fallback decision due to error: {str(e)}",
+                reasoning=decision_data.get("reasoning") or "",
+                immediate_answer=decision_data["immediate_answer"],
+                can_answer_immediately=True
+            )
+        else:
+            # JSON mode allows nulls for every field; a new_document plan without
+            # a size or scope gets the default plan instead of failing in Step 3
+            num_documents = decision_data.get("num_documents")
+            try:
+                num_documents = min(max(int(num_documents), 1), MAX_NUM_DOCUMENTS)
+            except (TypeError, ValueError):
+                num_documents = DEFAULT_NUM_DOCUMENTS
+            decision = Step1Decision(
+                query_type=QueryType(decision_data["query_type"]),
+                num_documents=num_documents,
+                retrieve_full_document=bool(decision_data.get("retrieve_full_document")),
+                reasoning=decision_data.get("reasoning") or "",
                 immediate_answer=None,
                 can_answer_immediately=False
             )
+        
+        # Update state
+        state.decision_history.append({
+            "step": "document_retrieval_decision",
+            "decision": decision_data,
+            "timestamp": time.time()
+        })
+        state.last_query_type = decision.query_type
+        
+        if decision.can_answer_immediately:
+            logger.info(f"Step 1 Decision: Can answer immediately - {decision.immediate_answer[:50]}...")
+        else:
+            logger.info(f"Step 1 Decision: {decision.query_type.value}, {decision.num_documents} docs, full_doc: {decision.retrieve_full_document}")
+        return decision
+
+    @staticmethod
+    def _fallback_step1_decision(error: Exception) -> Step1Decision:
+        """Retrieve a few chunks when the planning call fails"""
+        return Step1Decision(
+            query_type=QueryType.NEW_DOCUMENT,
+            num_documents=DEFAULT_NUM_DOCUMENTS,
+            retrieve_full_document=False,
+            reasoning=f"Fallback decision due to error: {str(error)}",
+            immediate_answer=None,
+            can_answer_immediately=False
+        )
 
     def step2_query_generation(self, user_query: str, step1_decision: Step1Decision, state: GlobalState) -> Step2QueryGeneration:
         """
@@ -321,90 +441,175 @@ RESPOND IN PLAIN JSON FORMAT (no markdown, no code blocks):
             response = self.model.generate_content(prompt)
             logger.debug(f"\n=== STEP 2 LLM RESPONSE ===\n{response.text}\n=== END RESPONSE ===")
             
-            # Clean the response text to handle markdown formatting
-            response_text = response.text.strip()
-            if response_text.startswith('```json'):
-                response_text = response_text[7:]  # Remove ```json
-            if response_text.endswith('```'):
-                response_text = response_text[:-3]  # Remove ```
-            response_text = response_text.strip()
-            
-            generation_data = json.loads(response_text)
-            
-            # Extract bill numbers using regex as fallback if LLM didn't extract them properly
-            import re
-            bill_pattern = r'\b([HS]B\d+)\b'
-            extracted_bills = re.findall(bill_pattern, user_query.upper())
-            
-            search_terms = generation_data["search_terms"]
-            
-            # If we found bill numbers but they're not in search terms, add them
-            for bill in extracted_bills:
-                if not any(bill.lower() in term.lower() for term in search_terms):
-                    search_terms.insert(0, bill)  # Add at beginning for priority
-            
-            # If search terms contain full sentences, try to extract key terms
-            refined_terms = []
-            for term in search_terms:
-                if len(term.split()) > 3:  # If term is too long (likely a sentence)
-                    # Extract bill numbers, key words
-                    bills_in_term = re.findall(bill_pattern, term.upper())
-                    refined_terms.extend(bills_in_term)
-                    # Extract other key words (simple approach)
-                    words = term.lower().split()
-                    key_words = [w for w in words if len(w) > 3 and w not in ['what', 'does', 'about', 'tell', 'bring', 'and', 'the', 'is', 'it']]
-                    refined_terms.extend(key_words[:2])  # Take first 2 key words
-                else:
-                    refined_terms.append(term)
-            
-            # Remove duplicates and limit to 5 terms
-            final_terms = list(dict.fromkeys(refined_terms))[:5]
-            
-            query_gen = Step2QueryGeneration(
-                search_terms=final_terms,
-                retrieval_method=RetrievalMethod(generation_data["retrieval_method"]),
-                reasoning=generation_data["reasoning"] + f" (Enhanced with regex extraction: {extracted_bills})"
-            )
-            
-            # Update state
-            state.decision_history.append({
-                "step": "query_generation", 
-                "decision": generation_data,
-                "timestamp": time.time()
-            })
-            state.last_retrieval_method = query_gen.retrieval_method
-            
-            logger.info(f"Step 2 Generated: {len(query_gen.search_terms)} terms, method: {query_gen.retrieval_method.value}")
-            logger.info(f"Final search terms: {query_gen.search_terms}")
-            return query_gen
+            generation_data = self._parse_json_response(response.text)
+            return self._query_generation_from_data(user_query, generation_data, state)
             
         except Exception as e:
             logger.error(f"Error in Step 2: {e}")
-            
-            # Enhanced fallback with regex extraction
-            import re
-            bill_pattern = r'\b([HS]B\d+)\b'
-            extracted_bills = re.findall(bill_pattern, user_query.upper())
-            
-            # Extract key terms from query
-            words = user_query.lower().split()
-            key_words = [w for w in words if len(w) > 3 and w not in ['what', 'does', 'about', 'tell', 'bring', 'and', 'the', 'is', 'it', 'can', 'you']]
-            
-            # Combine extracted bills and key words
-            fallback_terms = extracted_bills + key_words[:3]  # Bills + up to 3 key words
-            
-            # If no good terms found, use the full query
-            if not fallback_terms:
-                fallback_terms = [user_query]
-            
-            # Choose method based on whether we found bill numbers
-            method = RetrievalMethod.KEYWORD_MATCHING if extracted_bills else RetrievalMethod.DENSE_ENCODER
-            
-            return Step2QueryGeneration(
-                search_terms=fallback_terms,
-                retrieval_method=method,
-                reasoning=f"Fallback generation due to error: {str(e)}. Extracted bills: {extracted_bills}"
+            return self._fallback_query_generation(user_query, e)
+
+    def _query_generation_from_data(self, user_query: str, generation_data: Dict[str, Any], state: GlobalState) -> Step2QueryGeneration:
+        """Build the Step 2 query generation from the LLM's JSON and record it in the state"""
+        # Extract bill numbers using regex as fallback if LLM didn't extract them properly
+        bill_pattern = r'\b([HS]B\d+)\b'
+        extracted_bills = re.findall(bill_pattern, user_query.upper())
+        
+        search_terms = list(generation_data["search_terms"])
+        
+        # If we found bill numbers but they're not in search terms, add them
+        for bill in extracted_bills:
+            if not any(bill.lower() in term.lower() for term in search_terms):
+                search_terms.insert(0, bill)  # Add at beginning for priority
+        
+        # If search terms contain full sentences, try to extract key terms
+        refined_terms = []
+        for term in search_terms:
+            if len(term.split()) > 3:  # If term is too long (likely a sentence)
+                # Extract bill numbers, key words
+                bills_in_term = re.findall(bill_pattern, term.upper())
+                refined_terms.extend(bills_in_term)
+                # Extract other key words (simple approach)
+                words = term.lower().split()
+                key_words = [w for w in words if len(w) > 3 and w not in ['what', 'does', 'about', 'tell', 'bring', 'and', 'the', 'is', 'it']]
+                refined_terms.extend(key_words[:2])  # Take first 2 key words
+            else:
+                refined_terms.append(term)
+        
+        # Remove duplicates and limit to 5 terms
+        final_terms = list(dict.fromkeys(refined_terms))[:5]
+        
+        query_gen = Step2QueryGeneration(
+            search_terms=final_terms,
+            retrieval_method=RetrievalMethod(generation_data["retrieval_method"]),
+            reasoning=generation_data["reasoning"] + f" (Enhanced with regex extraction: {extracted_bills})",
+            hypothetical_answer=generation_data.get("hypothetical_answer") or None
+        )
+        
+        # Update state
+        state.decision_history.append({
+            "step": "query_generation", 
+            "decision": generation_data,
+            "timestamp": time.time()
+        })
+        state.last_retrieval_method = query_gen.retrieval_method
+        
+        logger.info(f"Step 2 Generated: {len(query_gen.search_terms)} terms, method: {query_gen.retrieval_method.value}")
+        logger.info(f"Final search terms: {query_gen.search_terms}")
+        return query_gen
+
+    @staticmethod
+    def _fallback_query_generation(user_query: str, error: Exception) -> Step2QueryGeneration:
+        """Regex-based search terms when query generation fails"""
+        # Enhanced fallback with regex extraction
+        bill_pattern = r'\b([HS]B\d+)\b'
+        extracted_bills = re.findall(bill_pattern, user_query.upper())
+        
+        # Extract key terms from query
+        words = user_query.lower().split()
+        key_words = [w for w in words if len(w) > 3 and w not in ['what', 'does', 'about', 'tell', 'bring', 'and', 'the', 'is', 'it', 'can', 'you']]
+        
+        # Combine extracted bills and key words
+        fallback_terms = extracted_bills + key_words[:3]  # Bills + up to 3 key words
+        
+        # If no good terms found, use the full query
+        if not fallback_terms:
+            fallback_terms = [user_query]
+        
+        # Choose method based on whether we found bill numbers
+        method = RetrievalMethod.KEYWORD_MATCHING if extracted_bills else RetrievalMethod.DENSE_ENCODER
+        
+        return Step2QueryGeneration(
+            search_terms=fallback_terms,
+            retrieval_method=method,
+            reasoning=f"Fallback generation due to error: {str(error)}. Extracted bills: {extracted_bills}"
+        )
+
+    def plan_query(self, user_query: str, state: GlobalState) -> Tuple[Step1Decision, Optional[Step2QueryGeneration]]:
+        """
+        Steps 1 and 2 in a single LLM call: retrieval decision, search terms,
+        retrieval method and (for dense retrieval) a hypothetical answer.
+        The query generation is None when no retrieval is needed.
+        """
+        logger.info("Steps 1-2: Merged Retrieval Planning")
+        
+        context_info = self._conversation_context_info(state)
+        
+        prompt = f"""You are an intelligent document retrieval planner for a financial RAG system.
+
+SYSTEM CONTEXT:
+- The backend has references to bills that will either be in chunks or full documents
+- Available collections: {', '.join(self.collection_names)}
+- Current conversation context: {context_info}
+
+USER QUERY: "{user_query}"
+
+TASK: Plan how to answer the query, in this order:
+
+1. IMMEDIATE ANSWER CHECK:
+   - Answer immediately only if you're confident a complete, accurate answer follows from general knowledge about legislative processes, common bill structures, or standard government procedures
+   - Do NOT guess about specific bill contents, numbers, or details
+   - If you can answer immediately, provide the answer, set "can_answer_immediately": true and leave the remaining fields null
+
+2. QUERY TYPE CLASSIFICATION (if cannot answer immediately):
+   - "new_document": User is asking for new information requiring document retrieval
+   - "follow_up": User is asking follow-up questions about previously retrieved documents (leave the retrieval fields below null)
+
+3. DOCUMENT RETRIEVAL PLANNING (if new_document):
+   - "num_documents": 1-3 for simple factual questions, 4-7 for complex analysis, 8-10 for comprehensive research
+   - "retrieve_full_document": true for comprehensive analysis or when document structure matters; false for specific facts and targeted information
+
+4. SEARCH TERMS (if new_document, 3-5 terms):
+   - SHORT, SPECIFIC terms: EXACT bill numbers (HB100, SB1367, etc.), budget line items, program codes, department names, dollar amounts, fiscal years, key topics
+   - DO NOT use generic terms like "bill", "act", "purpose", "legislation" unless explicitly mentioned by user
+   - DO NOT use full sentences or long phrases
+   - Example: "SB1367 healthcare funding" → ["SB1367", "healthcare", "funding", "appropriation"]
+
+5. RETRIEVAL METHOD (if new_document, pick 1 of 4):
+   - "keyword_matching": Use for specific bill numbers, codes, exact terms
+   - "dense_encoder": Use for conceptual/semantic queries about topics
+   - "sparse_encoder": Use for statistical term frequency analysis
+   - "multi_hop_reasoning": Use for complex relationship queries
+
+6. HYPOTHETICAL ANSWER (only for "dense_encoder" or "multi_hop_reasoning"):
+   - A brief, realistic 2-3 sentence passage that would likely appear in a legislative document answering the query; it is used for semantic search
+
+RESPOND IN JSON:
+{{
+    "can_answer_immediately": <true/false>,
+    "immediate_answer": "<answer if can_answer_immediately is true, otherwise null>",
+    "query_type": "new_document" or "follow_up" or null,
+    "num_documents": <number 1-10 or null>,
+    "retrieve_full_document": <true/false or null>,
+    "search_terms": ["term1", "term2", "term3"] or null,
+    "retrieval_method": "one of the 4 methods above" or null,
+    "hypothetical_answer": "<passage>" or null,
+    "reasoning": "Explain your decisions clearly"
+}}"""
+
+        try:
+            logger.debug(f"\n=== PLANNING LLM PROMPT ===\n{prompt}\n=== END PROMPT ===")
+            response = self.model.generate_content(
+                prompt,
+                generation_config=genai.types.GenerationConfig(response_mime_type="application/json")
             )
+            logger.debug(f"\n=== PLANNING LLM RESPONSE ===\n{response.text}\n=== END RESPONSE ===")
+            plan_data = self._parse_json_response(response.text)
+            decision = self._step1_decision_from_data(plan_data, state)
+        except Exception as e:
+            # Same recovery as the separate steps: fallback decision, then Step 2 on its own
+            logger.error(f"Error in merged planning: {e}")
+            decision = self._fallback_step1_decision(e)
+            return decision, self.step2_query_generation(user_query, decision, state)
+        
+        if decision.can_answer_immediately or decision.query_type == QueryType.FOLLOW_UP:
+            return decision, None
+        
+        try:
+            query_gen = self._query_generation_from_data(user_query, plan_data, state)
+        except Exception as e:
+            logger.error(f"Planning response had no usable search terms: {e}")
+            query_gen = self._fallback_query_generation(user_query, e)
+        return decision, query_gen
 
     def step3_execute_retrieval(self, query_gen: Step2QueryGeneration, step1_decision: Step1Decision) -> RetrievalResult:
         """
@@ -419,14 +624,39 @@ RESPOND IN PLAIN JSON FORMAT (no markdown, no code blocks):
         if method == RetrievalMethod.KEYWORD_MATCHING:
             return self._keyword_matching_retrieval(search_terms, num_docs)
         elif method == RetrievalMethod.DENSE_ENCODER:
-            return self._dense_encoder_retrieval(search_terms, num_docs)
+            return self._dense_encoder_retrieval(search_terms, num_docs, query_gen.hypothetical_answer)
         elif method == RetrievalMethod.SPARSE_ENCODER:
             return self._sparse_encoder_retrieval(search_terms, num_docs)
         elif method == RetrievalMethod.MULTI_HOP_REASONING:
-            return self._multi_hop_reasoning_retrieval(search_terms, num_docs)
+            return self._multi_hop_reasoning_retrieval(search_terms, num_docs, query_gen.hypothetical_answer)
         else:
             logger.warning(f"Unknown retrieval method: {method}")
-            return self._dense_encoder_retrieval(search_terms, num_docs)
+            return self._dense_encoder_retrieval(search_terms, num_docs, query_gen.hypothetical_answer)
+
+    def _search_collections(self, searches: List[Tuple[str, str, int]]) -> List[Tuple[str, str, List[Dict[str, Any]]]]:
+        """
+        Run (collection, query, n_results) semantic searches concurrently.
+        Returns (collection, query, results) in the order given; failed or
+        unknown collections are logged and skipped.
+        """
+        searches = [search for search in searches if search[0] in self.collection_managers]
+        if not searches:
+            return []
+        
+        def run(search):
+            collection_name, query, n_results = search
+            return self.collection_managers[collection_name].search_similar_chunks(query, n_results)
+        
+        completed = []
+        max_workers = max(1, min(self.max_parallel_searches, len(searches)))
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(run, search) for search in searches]
+            for (collection_name, query, _), future in zip(searches, futures):
+                try:
+                    completed.append((collection_name, query, future.result()))
+                except Exception as e:
+                    logger.error(f"Error searching {collection_name} for '{query[:50]}': {e}")
+        return completed
 
     def _keyword_matching_retrieval(self, search_terms: List[str], num_docs: int) -> RetrievalResult:
         """Keyword matching retrieval using source_identifier and content matching"""
@@ -489,35 +719,29 @@ RESPOND IN PLAIN JSON FORMAT (no markdown, no code blocks):
             scores=[r.get('keyword_score', 0) for r in top_results]
         )
 
-    def _dense_encoder_retrieval(self, search_terms: List[str], num_docs: int) -> RetrievalResult:
+    def _dense_encoder_retrieval(self, search_terms: List[str], num_docs: int,
+                                 hypothetical_answer: Optional[str] = None) -> RetrievalResult:
         """Dense encoder retrieval using hypothetical answer approach for better semantic matching"""
         logger.info("Executing dense encoder retrieval with hypothetical answer approach")
         
-        # Generate a hypothetical answer based on the search terms
-        hypothetical_answer = self._generate_hypothetical_answer(search_terms)
-        logger.info(f"Generated hypothetical answer: {hypothetical_answer[:100]}...")
+        # The merged planning call usually supplies the hypothetical answer already
+        if not hypothetical_answer:
+            hypothetical_answer = self._generate_hypothetical_answer(search_terms)
+            logger.info(f"Generated hypothetical answer: {hypothetical_answer[:100]}...")
         
         all_results = []
         
         # Use the hypothetical answer for semantic search instead of raw search terms
         search_query = hypothetical_answer
         
-        for collection_name in self.collection_names:
-            try:
-                if collection_name in self.collection_managers:
-                    manager = self.collection_managers[collection_name]
-                    # Use existing semantic search functionality with hypothetical answer
-                    results = manager.search_similar_chunks(search_query, num_docs * 2)
-                    
-                    for result in results:
-                        result['collection'] = collection_name
-                        result['search_query'] = search_query
-                        result['hypothetical_answer'] = hypothetical_answer
-                        
-                    all_results.extend(results)
-                    
-            except Exception as e:
-                logger.error(f"Error in dense encoder retrieval for {collection_name}: {e}")
+        # Search every collection concurrently with the hypothetical answer
+        searches = [(collection_name, search_query, num_docs * 2) for collection_name in self.collection_names]
+        for collection_name, _, results in self._search_collections(searches):
+            for result in results:
+                result['collection'] = collection_name
+                result['search_query'] = search_query
+                result['hypothetical_answer'] = hypothetical_answer
+            all_results.extend(results)
         
         # Sort by similarity score and take top results
         all_results.sort(key=lambda x: x.get('score', 0), reverse=True)
@@ -573,34 +797,28 @@ Generate a hypothetical answer:"""
         
         all_results = []
         
-        for term in search_terms:
-            for collection_name in self.collection_names:
-                try:
-                    if collection_name in self.collection_managers:
-                        manager = self.collection_managers[collection_name]
-                        results = manager.search_similar_chunks(term, num_docs * 3)
-                        
-                        # Simple BM25-like scoring based on term frequency
-                        for result in results:
-                            content = result['content'].lower()
-                            term_lower = term.lower()
-                            
-                            # Calculate term frequency
-                            tf = content.count(term_lower)
-                            doc_length = len(content.split())
-                            
-                            # Simple BM25 approximation
-                            k1, b = 1.5, 0.75
-                            avgdl = 100  # Assume average document length
-                            
-                            bm25_score = tf * (k1 + 1) / (tf + k1 * (1 - b + b * doc_length / avgdl))
-                            result['bm25_score'] = bm25_score
-                            result['search_term'] = term
-                            
-                        all_results.extend(results)
-                        
-                except Exception as e:
-                    logger.error(f"Error in BM25 retrieval for {collection_name}: {e}")
+        # Candidate searches for every (term, collection) pair run concurrently
+        searches = [(collection_name, term, num_docs * 3)
+                    for term in search_terms for collection_name in self.collection_names]
+        for collection_name, term, results in self._search_collections(searches):
+            # Simple BM25-like scoring based on term frequency
+            for result in results:
+                content = result['content'].lower()
+                term_lower = term.lower()
+                
+                # Calculate term frequency
+                tf = content.count(term_lower)
+                doc_length = len(content.split())
+                
+                # Simple BM25 approximation
+                k1, b = 1.5, 0.75
+                avgdl = 100  # Assume average document length
+                
+                bm25_score = tf * (k1 + 1) / (tf + k1 * (1 - b + b * doc_length / avgdl))
+                result['bm25_score'] = bm25_score
+                result['search_term'] = term
+                
+            all_results.extend(results)
         
         # Sort by BM25 score
         all_results.sort(key=lambda x: x.get('bm25_score', 0), reverse=True)
@@ -613,7 +831,8 @@ Generate a hypothetical answer:"""
             scores=[r.get('bm25_score', 0) for r in top_results]
         )
 
-    def _multi_hop_reasoning_retrieval(self, search_terms: List[str], num_docs: int) -> RetrievalResult:
+    def _multi_hop_reasoning_retrieval(self, search_terms: List[str], num_docs: int,
+                                       hypothetical_answer: Optional[str] = None) -> RetrievalResult:
         """Multi-hop reasoning using knowledge graph"""
         logger.info("Executing multi-hop reasoning retrieval")
         
@@ -623,10 +842,10 @@ Generate a hypothetical answer:"""
                 # Initialize if not already done
                 # This would require proper setup with chunks and knowledge graph
                 logger.warning("Multi-hop reasoning not fully initialized, falling back to dense encoder")
-                return self._dense_encoder_retrieval(search_terms, num_docs)
+                return self._dense_encoder_retrieval(search_terms, num_docs, hypothetical_answer)
             
-            # Combine search terms for KG query
-            combined_query = " ".join(search_terms)
+            # Seed the graph with the hypothetical answer when planning produced one
+            combined_query = hypothetical_answer or " ".join(search_terms)
             result = self.online_retriever.retrieve(combined_query)
             
             # Convert KG2RAG result to our format
@@ -649,7 +868,7 @@ Generate a hypothetical answer:"""
         except Exception as e:
             logger.error(f"Error in multi-hop reasoning: {e}")
             # Fallback to dense encoder
-            return self._dense_encoder_retrieval(search_terms, num_docs)
+            return self._dense_encoder_retrieval(search_terms, num_docs, hypothetical_answer)
 
     def step4_document_selection(self, retrieval_result: RetrievalResult, step1_decision: Step1Decision) -> List[Dict[str, Any]]:
         """
@@ -667,23 +886,17 @@ Generate a hypothetical answer:"""
                 if source_identifier and source_identifier not in seen_source_ids:
                     seen_source_ids.add(source_identifier)
                     
-                    # Find the full document in extracted data
-                    full_doc_content = None
-                    for doc in self.extracted_data:
-                        # Match by extracting filename from URL
-                        doc_filename = doc['url'].split('/')[-1] if doc.get('url') else ''
-                        if doc_filename == source_identifier:
-                            full_doc_content = doc['text']
-                            break
+                    # Look up the full document by source_identifier
+                    full_doc = self.document_index.get(source_identifier)
                     
-                    if full_doc_content:
+                    if full_doc and full_doc['text']:
                         full_documents.append({
                             'document_id': source_identifier,
-                            'content': full_doc_content,
+                            'content': full_doc['text'],
                             'metadata': {
                                 'source_identifier': source_identifier,
-                                'url': next((doc['url'] for doc in self.extracted_data if doc['url'].split('/')[-1] == source_identifier), ''),
-                                'text_length': len(full_doc_content)
+                                'url': full_doc['url'],
+                                'text_length': len(full_doc['text'])
                             },
                             'source': 'full_document'
                         })
@@ -707,61 +920,18 @@ Generate a hypothetical answer:"""
 
     def step5_rerank_chunks(self, user_query: str, selected_content: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
-        Step 5: Rerank chunks/documents for better relevance using LLM
+        Step 5: Rerank chunks for better relevance with the configured reranker
+        (local feature scorer by default, LLM ranking when "reranker.mode" is "llm")
         """
-        logger.info("Step 5: Reranking for Relevance")
+        logger.info(f"Step 5: Reranking for Relevance ({self.reranker.name})")
         
         if not selected_content or selected_content[0].get('source') == 'full_document':
             # Skip reranking for full documents
             logger.info("Skipping reranking for full documents")
             return selected_content
         
-        # Use LLM to rerank chunks based on relevance to user query
         try:
-            # Prepare content for reranking
-            content_items = []
-            for i, item in enumerate(selected_content):
-                content_items.append(f"Item {i+1}: {item['content'][:500]}...")  # Truncate for prompt
-            
-            rerank_prompt = f"""You are a relevance ranking expert. Given a user query and a list of text chunks, rank them by relevance.
-
-USER QUERY: "{user_query}"
-
-CONTENT ITEMS:
-{chr(10).join(content_items)}
-
-TASK: Rank the items from most relevant (1) to least relevant ({len(content_items)}) based on how well they answer the user's query.
-
-RESPOND IN PLAIN JSON FORMAT (no markdown, no code blocks):
-{{
-    "rankings": [item_number_most_relevant, item_number_second_most_relevant, ...],
-    "reasoning": "Brief explanation of ranking decisions"
-}}"""
-
-            logger.debug(f"\n=== STEP 5 LLM PROMPT ===\n{rerank_prompt}\n=== END PROMPT ===")
-            response = self.model.generate_content(rerank_prompt)
-            logger.debug(f"\n=== STEP 5 LLM RESPONSE ===\n{response.text}\n=== END RESPONSE ===")
-            
-            # Clean the response text to handle markdown formatting
-            response_text = response.text.strip()
-            if response_text.startswith('```json'):
-                response_text = response_text[7:]  # Remove ```json
-            if response_text.endswith('```'):
-                response_text = response_text[:-3]  # Remove ```
-            response_text = response_text.strip()
-            
-            ranking_data = json.loads(response_text)
-            
-            # Reorder based on rankings
-            rankings = ranking_data["rankings"]
-            reranked_content = []
-            
-            for rank in rankings:
-                if 1 <= rank <= len(selected_content):
-                    item = selected_content[rank - 1].copy()
-                    item['rerank_position'] = len(reranked_content) + 1
-                    reranked_content.append(item)
-            
+            reranked_content = self.reranker.rerank(user_query, selected_content)
             logger.info(f"Reranked {len(reranked_content)} items")
             return reranked_content
             
@@ -830,8 +1000,7 @@ Generate a helpful, well-structured response:"""
             state.context_history.append(f"A: {response.text[:200]}...")  # Truncated for history
             
             # Keep history manageable
-            if len(state.context_history) > 10:
-                state.context_history = state.context_history[-10:]
+            state.context_history = state.context_history[-GlobalState.MAX_CONTEXT_HISTORY:]
             
             return {
                 "answer": response.text,
@@ -866,12 +1035,17 @@ Generate a helpful, well-structured response:"""
         original_level = logger.level
         logger.setLevel(logging.DEBUG)
         
+        state = None
         try:
             # Get or create conversation state
             state = self.get_or_create_state(conversation_id)
             
-            # Step 1: Document Retrieval Decision
-            step1_decision = self.step1_document_retrieval_decision(user_query, state)
+            # Steps 1-2: Retrieval planning (one LLM call when merged planning is on)
+            step2_query_gen = None
+            if self.merged_planning:
+                step1_decision, step2_query_gen = self.plan_query(user_query, state)
+            else:
+                step1_decision = self.step1_document_retrieval_decision(user_query, state)
             
             # Check if LLM can answer immediately
             if step1_decision.can_answer_immediately:
@@ -880,6 +1054,7 @@ Generate a helpful, well-structured response:"""
                 
                 # Restore original logging level
                 logger.setLevel(original_level)
+                self.save_state(state)
                 
                 return {
                     "answer": step1_decision.immediate_answer,
@@ -902,10 +1077,14 @@ Generate a helpful, well-structured response:"""
                 logger.info("Follow-up query detected, generating response from existing context")
                 # Generate response using existing context
                 existing_context = [{"content": ctx, "source": "history"} for ctx in state.context_history[-4:]]
-                return self.step6_generate_answer(user_query, existing_context, state)
+                result = self.step6_generate_answer(user_query, existing_context, state)
+                logger.setLevel(original_level)
+                self.save_state(state)
+                return result
             
-            # Step 2: Query Generation
-            step2_query_gen = self.step2_query_generation(user_query, step1_decision, state)
+            # Step 2: Query Generation (already done by merged planning)
+            if step2_query_gen is None:
+                step2_query_gen = self.step2_query_generation(user_query, step1_decision, state)
             
             # Step 3: Execute Retrieval
             retrieval_result = self.step3_execute_retrieval(step2_query_gen, step1_decision)
@@ -937,8 +1116,8 @@ Generate a helpful, well-structured response:"""
                 new_doc_ids = [item.get('metadata', {}).get('id', f"doc_{i}") 
                               for i, item in enumerate(selected_content)]
                 state.current_documents.extend(new_doc_ids)
-                # Keep only recent documents
-                state.current_documents = list(set(state.current_documents[-20:]))
+                # Keep only recent documents, without duplicates
+                state.current_documents = list(dict.fromkeys(state.current_documents[-GlobalState.MAX_CURRENT_DOCUMENTS:]))
                 
                 # Track source references for follow-up queries
                 for item in selected_content:
@@ -949,17 +1128,16 @@ Generate a helpful, well-structured response:"""
                         "query": user_query
                     }
                     state.source_references.append(source_ref)
-                
-                # Keep only recent source references
-                state.source_references = state.source_references[-10:]
             
             # Restore original logging level
             logger.setLevel(original_level)
+            self.save_state(state)
             
             logger.info(f"\n{'='*80}")
             logger.info(f"✅ NLP BACKEND QUERY PROCESSING COMPLETED")
             logger.info(f"Processing time: {processing_time:.2f} seconds")
-            logger.info(f"LLM calls made: Steps 1, 2, 5, 6 (4 total)")
+            logger.info(f"LLM calls made: {'planning' if self.merged_planning else 'Steps 1, 2'}, Step 6"
+                        f"{' and Step 5' if self.reranker.name == 'llm' else ''}")
             logger.info(f"{'='*80}\n")
             
             return final_result
@@ -967,6 +1145,8 @@ Generate a helpful, well-structured response:"""
         except Exception as e:
             # Restore original logging level on error
             logger.setLevel(original_level)
+            if state is not None:
+                self.save_state(state)
             
             logger.error(f"\n{'='*80}")
             logger.error(f"❌ NLP BACKEND ERROR")
@@ -984,8 +1164,8 @@ Generate a helpful, well-structured response:"""
 
     def get_conversation_state(self, conversation_id: str) -> Dict[str, Any]:
         """Get current state of a conversation"""
-        if conversation_id in self.states:
-            state = self.states[conversation_id]
+        state = self.conversation_store.get(conversation_id)
+        if state is not None:
             return {
                 "conversation_id": conversation_id,
                 "current_documents": state.current_documents,
@@ -998,8 +1178,7 @@ Generate a helpful, well-structured response:"""
 
     def reset_conversation(self, conversation_id: str) -> bool:
         """Reset conversation state"""
-        if conversation_id in self.states:
-            del self.states[conversation_id]
+        if self.conversation_store.delete(conversation_id):
             logger.info(f"Reset conversation: {conversation_id}")
             return True
         return False
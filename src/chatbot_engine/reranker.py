@@ -0,0 +1,295 @@
+"""
+Rerankers for Step 5 of the NLP Backend.
+
+Step 5 used to send every candidate to Gemini and ask for a ranking, which
+added an LLM round trip and API quota to every query. The default reranker
+is now ``FeatureReranker``. It is a CPU-only scorer that combines lexical
+and character n-gram features with the first-stage embedding similarity,
+all computed with NumPy, and takes tens of milliseconds for a few dozen
+chunks. The embedding signal is reused from retrieval rather than
+recomputed: sentence-transformers is installed and retrieval.py already
+loads a SentenceTransformer, but a cross-encoder pass over 50 chunks on CPU
+would not fit the latency budget. The LLM ranking is kept as
+``LLMReranker`` and selected with ``"mode": "llm"`` in the "reranker"
+section of config.json.
+"""
+
+import json
+import logging
+import math
+import re
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r"\w+")
+# Measure numbers (HB727, "SB 1367", Act 310) and standalone numbers such as
+# years, which must match exactly; ordinary words never join a number
+_IDENTIFIER_RE = re.compile(r"\b(?:(?:hb|sb|hr|sr|hcr|scr|act)\s?\d{1,5}|\d{2,5})\b")
+_STOPWORDS = frozenset(
+    "a an and are as at be by does do for from has have how in is it its of on or that the this "
+    "to was what when where which who why will with".split()
+)
+
+DEFAULT_FEATURE_WEIGHTS: Dict[str, float] = {
+    "bm25": 0.3,
+    "coverage": 0.15,
+    "ngram_cosine": 0.15,
+    "identifier": 0.15,
+    "dense_score": 0.15,
+    "retrieval_rank": 0.1,
+}
+
+
+def _terms(text: str) -> List[str]:
+    return [t for t in _WORD_RE.findall(text.lower()) if t not in _STOPWORDS]
+
+
+def _identifiers(text: str) -> set:
+    return {m.replace(" ", "") for m in _IDENTIFIER_RE.findall(text.lower())}
+
+
+def _first_stage_score(item: Dict[str, Any]) -> float:
+    try:
+        score = float(item.get('score') or 0.0)
+    except (TypeError, ValueError):
+        return 0.0
+    return score if math.isfinite(score) else 0.0
+
+
+class Reranker:
+    """Interface: order candidates by relevance to a query."""
+
+    name = "none"
+
+    def rerank(self, query: str, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Candidates, most relevant first; each copy carries ``rerank_position``."""
+        return self._positioned(items)
+
+    @staticmethod
+    def _positioned(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        reranked = []
+        for item in items:
+            item = item.copy()
+            item['rerank_position'] = len(reranked) + 1
+            reranked.append(item)
+        return reranked
+
+
+class FeatureReranker(Reranker):
+    """
+    Vectorized lexical + character n-gram scorer.
+
+    Only the first ``max_candidates`` items, in retrieval order, are scored.
+    They are scored in batches of ``batch_size``. If ``latency_budget_ms``
+    runs out, the remaining batches keep their retrieval order and are placed
+    after the scored ones. Features are min-max normalized within the
+    candidate set and combined with ``weights``:
+
+    - bm25: BM25 of the query terms, with IDF taken over the candidates
+    - coverage: fraction of distinct query terms present
+    - ngram_cosine: cosine of hashed character-trigram vectors, which
+      catches inflections such as appropriate/appropriation
+    - identifier: fraction of query identifiers (HB727, 2025) present in
+      the text or source_identifier
+    - dense_score: the first-stage similarity in ``item["score"]`` (the
+      embedding similarity for dense retrieval; 0 when missing)
+    - retrieval_rank: 1 / (1 + position) from the first-stage retriever
+    """
+
+    name = "feature"
+
+    def __init__(self, max_candidates: int = 50, batch_size: int = 64, latency_budget_ms: float = 50.0,
+                 max_chars: int = 4000, ngram_dimensions: int = 4096,
+                 weights: Optional[Dict[str, float]] = None, k1: float = 1.5, b: float = 0.75):
+        self.max_candidates = max_candidates
+        self.batch_size = batch_size
+        self.latency_budget_ms = latency_budget_ms
+        self.max_chars = max_chars
+        self.ngram_dimensions = ngram_dimensions
+        self.weights = dict(DEFAULT_FEATURE_WEIGHTS)
+        self.weights.update(weights or {})
+        self.k1 = k1
+        self.b = b
+
+    def _ngram_vectors(self, texts: List[str]) -> np.ndarray:
+        """L2-normalized hashed character-trigram counts, one row per text."""
+        vectors = np.zeros((len(texts), self.ngram_dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            codes = np.frombuffer(text.lower().encode('utf-8', 'ignore'), dtype=np.uint8).astype(np.uint32)
+            if len(codes) < 3:
+                continue
+            trigrams = (codes[:-2] << 16) | (codes[1:-1] << 8) | codes[2:]
+            buckets = (trigrams * np.uint32(2654435761)) % np.uint32(self.ngram_dimensions)
+            vectors[row] = np.bincount(buckets, minlength=self.ngram_dimensions)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms > 0, norms, 1.0)
+
+    def _score_batch(self, query_terms: List[str], query_identifiers: set, query_vector: np.ndarray,
+                     texts: List[str], identifier_texts: List[str], positions: np.ndarray,
+                     first_stage_scores: np.ndarray) -> Dict[str, np.ndarray]:
+        term_index = {term: i for i, term in enumerate(query_terms)}
+        tf = np.zeros((len(texts), len(query_terms)), dtype=np.float32)
+        lengths = np.zeros(len(texts), dtype=np.float32)
+        for row, text in enumerate(texts):
+            terms = _terms(text)
+            lengths[row] = len(terms)
+            for term, count in Counter(t for t in terms if t in term_index).items():
+                tf[row, term_index[term]] = count
+
+        features = {}
+        if query_terms:
+            document_frequency = (tf > 0).sum(axis=0)
+            n = len(texts)
+            idf = np.log(1 + (n - document_frequency + 0.5) / (document_frequency + 0.5))
+            average_length = max(float(lengths.mean()), 1.0)
+            denominator = tf + self.k1 * (1 - self.b + self.b * lengths[:, None] / average_length)
+            features["bm25"] = (tf * (self.k1 + 1) / np.where(denominator > 0, denominator, 1.0) * idf).sum(axis=1)
+            features["coverage"] = (tf > 0).mean(axis=1)
+        else:
+            features["bm25"] = features["coverage"] = np.zeros(len(texts), dtype=np.float32)
+
+        features["ngram_cosine"] = self._ngram_vectors(texts) @ query_vector
+        if query_identifiers:
+            features["identifier"] = np.array(
+                [len(query_identifiers & _identifiers(text)) / len(query_identifiers) for text in identifier_texts],
+                dtype=np.float32,
+            )
+        else:
+            features["identifier"] = np.zeros(len(texts), dtype=np.float32)
+        features["dense_score"] = first_stage_scores
+        features["retrieval_rank"] = 1.0 / (1.0 + positions)
+        return features
+
+    def scores(self, query: str, items: List[Dict[str, Any]]) -> np.ndarray:
+        """Combined feature score per item (NaN for items the latency budget did not reach)."""
+        started = time.perf_counter()
+        query_terms = list(dict.fromkeys(_terms(query)))
+        query_identifiers = _identifiers(query)
+        query_vector = self._ngram_vectors([query])[0]
+
+        collected: Dict[str, List[np.ndarray]] = {name: [] for name in DEFAULT_FEATURE_WEIGHTS}
+        scored = 0
+        for start in range(0, len(items), self.batch_size):
+            if scored and (time.perf_counter() - started) * 1000 > self.latency_budget_ms:
+                logger.warning(f"Rerank latency budget reached after {scored} of {len(items)} candidates")
+                break
+            batch = items[start:start + self.batch_size]
+            texts = [(item.get('content') or '')[:self.max_chars] for item in batch]
+            identifier_texts = [
+                f"{text} {item.get('metadata', {}).get('source_identifier', '')}" for text, item in zip(texts, batch)
+            ]
+            positions = np.arange(start, start + len(batch), dtype=np.float32)
+            first_stage_scores = np.array([_first_stage_score(item) for item in batch], dtype=np.float32)
+            for name, values in self._score_batch(query_terms, query_identifiers, query_vector, texts,
+                                                  identifier_texts, positions, first_stage_scores).items():
+                collected[name].append(values)
+            scored += len(batch)
+
+        combined = np.full(len(items), np.nan, dtype=np.float32)
+        if not scored:
+            return combined
+        total = np.zeros(scored, dtype=np.float32)
+        for name, parts in collected.items():
+            values = np.concatenate(parts).astype(np.float32)
+            spread = values.max() - values.min()
+            normalized = (values - values.min()) / spread if spread > 0 else np.zeros_like(values)
+            total += self.weights.get(name, 0.0) * normalized
+        combined[:scored] = total
+        return combined
+
+    def rerank(self, query: str, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        started = time.perf_counter()
+        candidates, rest = items[:self.max_candidates], items[self.max_candidates:]
+        scores = self.scores(query, candidates)
+        scored = [i for i in range(len(candidates)) if not math.isnan(scores[i])]
+        unscored = [i for i in range(len(candidates)) if math.isnan(scores[i])]
+        # Stable sort so ties keep retrieval order
+        order = sorted(scored, key=lambda i: -scores[i]) + unscored
+
+        reranked = self._positioned([candidates[i] for i in order] + rest)
+        for item, i in zip(reranked, order):
+            if not math.isnan(scores[i]):
+                item['rerank_score'] = round(float(scores[i]), 4)
+        logger.info(f"Feature reranker ordered {len(candidates)} candidates in "
+                    f"{(time.perf_counter() - started) * 1000:.1f} ms")
+        return reranked
+
+
+class LLMReranker(Reranker):
+    """Asks the LLM to rank the candidates (one extra model call per query)."""
+
+    name = "llm"
+
+    def __init__(self, model, max_candidates: int = 50):
+        self.model = model
+        self.max_candidates = max_candidates
+
+    def rerank(self, query: str, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        candidates = items[:self.max_candidates]
+        content_items = []
+        for i, item in enumerate(candidates):
+            content_items.append(f"Item {i+1}: {item['content'][:500]}...")  # Truncate for prompt
+
+        rerank_prompt = f"""You are a relevance ranking expert. Given a user query and a list of text chunks, rank them by relevance.
+
+USER QUERY: "{query}"
+
+CONTENT ITEMS:
+{chr(10).join(content_items)}
+
+TASK: Rank the items from most relevant (1) to least relevant ({len(content_items)}) based on how well they answer the user's query.
+
+RESPOND IN PLAIN JSON FORMAT (no markdown, no code blocks):
+{{
+    "rankings": [item_number_most_relevant, item_number_second_most_relevant, ...],
+    "reasoning": "Brief explanation of ranking decisions"
+}}"""
+
+        logger.debug(f"\n=== STEP 5 LLM PROMPT ===\n{rerank_prompt}\n=== END PROMPT ===")
+        response = self.model.generate_content(rerank_prompt)
+        logger.debug(f"\n=== STEP 5 LLM RESPONSE ===\n{response.text}\n=== END RESPONSE ===")
+
+        # Clean the response text to handle markdown formatting
+        response_text = response.text.strip()
+        if response_text.startswith('```json'):
+            response_text = response_text[7:]  # Remove ```json
+        if response_text.endswith('```'):
+            response_text = response_text[:-3]  # Remove ```
+        ranking_data = json.loads(response_text.strip())
+
+        ranked = []
+        for rank in ranking_data["rankings"]:
+            if 1 <= rank <= len(candidates):
+                ranked.append(candidates[rank - 1])
+        return self._positioned(ranked + items[self.max_candidates:])
+
+
+def create_reranker(config: Dict[str, Any], model=None) -> Reranker:
+    """
+    Build the reranker described by the "reranker" section of config.json.
+
+    ``mode`` is "feature" (default), "llm" or "none"; "llm" falls back to
+    "feature" when no model is given.
+    """
+    reranker_config = config.get("reranker", {})
+    mode = reranker_config.get("mode", "feature")
+    max_candidates = reranker_config.get("max_candidates", 50)
+
+    if mode == "none":
+        return Reranker()
+    if mode == "llm":
+        if model is not None:
+            return LLMReranker(model, max_candidates=max_candidates)
+        logger.warning("LLM reranker requested without a model; using the feature reranker")
+
+    return FeatureReranker(
+        max_candidates=max_candidates,
+        batch_size=reranker_config.get("batch_size", 64),
+        latency_budget_ms=reranker_config.get("latency_budget_ms", 50.0),
+        weights=reranker_config.get("weights"),
+    )
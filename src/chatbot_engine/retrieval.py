@@ -6,21 +6,24 @@ Handles semantic retrieval and knowledge graph-guided expansion
 import numpy as np
 import logging
 from typing import List, Dict, Set, Tuple, Optional
-from collections import defaultdict, deque
 from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
-import networkx as nx
 
 try:
     from .schemas import (
         Chunk, KnowledgeGraph, Triplet, SemanticScore, 
         GraphEdge, KG2RAGConfig, RetrievalResult
     )
+    from .embedding_store import ChunkEmbeddingStore, normalize_rows
+    from .graph_index import CompactGraph
+    from .kg_artifact import load_kg_artifact
 except ImportError:
     from schemas import (
         Chunk, KnowledgeGraph, Triplet, SemanticScore, 
         GraphEdge, KG2RAGConfig, RetrievalResult
     )
+    from embedding_store import ChunkEmbeddingStore, normalize_rows
+    from graph_index import CompactGraph
+    from kg_artifact import load_kg_artifact
 
 logger = logging.getLogger(__name__)
 
@@ -30,136 +33,113 @@ class SemanticRetriever:
     def __init__(self, config: KG2RAGConfig):
         self.config = config
         self.model = SentenceTransformer(config.embedding_model)
-        self.chunk_embeddings = None
+        self.chunk_embeddings = None  # L2-normalized float32, one row per chunk
         self.chunks = None
+        # Embeddings persist across index builds when a cache directory is configured
+        self.embedding_store = None
+        if config.embedding_cache_dir:
+            self.embedding_store = ChunkEmbeddingStore(config.embedding_cache_dir, config.embedding_model)
+            self.embedding_store.load()
+    
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        return normalize_rows(self.model.encode(texts, show_progress_bar=len(texts) > 256))
     
     def index_chunks(self, chunks: List[Chunk]) -> None:
-        """Create embeddings for all chunks"""
-        logger.info(f"Creating embeddings for {len(chunks)} chunks...")
+        """Create embeddings for all chunks (only unseen chunks are encoded when a store is configured)"""
+        logger.info(f"Indexing embeddings for {len(chunks)} chunks...")
         
         self.chunks = chunks
         chunk_texts = [chunk.content for chunk in chunks]
-        self.chunk_embeddings = self.model.encode(chunk_texts, show_progress_bar=True)
+        if self.embedding_store is not None:
+            self.chunk_embeddings = self.embedding_store.embeddings_for(chunk_texts, self._encode)
+        else:
+            self.chunk_embeddings = self._encode(chunk_texts)
         
         logger.info("Chunk indexing complete")
     
+    def set_embeddings(self, chunks: List[Chunk], embeddings: np.ndarray) -> None:
+        """Use precomputed normalized embeddings (one row per chunk) instead of encoding"""
+        if len(chunks) != len(embeddings):
+            raise ValueError(f"{len(chunks)} chunks but {len(embeddings)} embeddings")
+        self.chunks = chunks
+        self.chunk_embeddings = embeddings
+    
     def retrieve_semantic(self, query: str) -> List[SemanticScore]:
-        """Retrieve chunks based on semantic similarity"""
+        """Retrieve the top-k chunks by cosine similarity"""
         if self.chunk_embeddings is None:
             raise ValueError("Chunks not indexed. Call index_chunks() first.")
+        if len(self.chunks) == 0:
+            return []
         
-        # Encode query
-        query_embedding = self.model.encode([query])
-        
-        # Compute similarities
-        similarities = cosine_similarity(query_embedding, self.chunk_embeddings)[0]
+        # Rows are unit length, so a dot product is the cosine similarity
+        query_embedding = self._encode([query])[0]
+        similarities = self.chunk_embeddings @ query_embedding
         
-        # Create semantic scores
-        scores = []
-        for i, similarity in enumerate(similarities):
-            score = SemanticScore(
-                chunk_id=self.chunks[i].id,
-                score=float(similarity)
-            )
-            scores.append(score)
+        # Partial selection of the k best, then sort only those
+        k = min(self.config.semantic_top_k, len(similarities))
+        top = np.argpartition(-similarities, k - 1)[:k]
+        top = top[np.argsort(-similarities[top], kind='stable')]
         
-        # Sort by similarity and return top-k
-        scores.sort(key=lambda x: x.score, reverse=True)
-        return scores[:self.config.semantic_top_k]
+        return [SemanticScore(chunk_id=self.chunks[i].id, score=float(similarities[i])) for i in top]
 
 class GraphExpander:
     """Handles knowledge graph-guided expansion"""
     
     def __init__(self, config: KG2RAGConfig):
         self.config = config
-        self.kg = None
-        self.chunk_to_triplets = defaultdict(list)
-        self.entity_to_triplets = defaultdict(list)
+        self.graph: Optional[CompactGraph] = None
+        # Every indexed chunk by id, so expansion can return chunks beyond the seeds
+        self.chunk_store: Dict[str, Chunk] = {}
     
-    def index_knowledge_graph(self, kg: KnowledgeGraph) -> None:
+    def index_knowledge_graph(self, kg: KnowledgeGraph, chunk_store: Optional[Dict[str, Chunk]] = None) -> None:
         """Index knowledge graph for efficient traversal"""
         logger.info(f"Indexing knowledge graph with {len(kg.triplets)} triplets...")
-        
-        self.kg = kg
-        
-        # Build indexes
-        for triplet in kg.triplets:
-            self.chunk_to_triplets[triplet.chunk_id].append(triplet)
-            self.entity_to_triplets[triplet.head].append(triplet)
-            self.entity_to_triplets[triplet.tail].append(triplet)
-        
-        logger.info("Knowledge graph indexing complete")
+        self.index_graph(CompactGraph.from_triplets(kg.triplets, list(chunk_store or ())), chunk_store)
+    
+    def index_graph(self, graph: CompactGraph, chunk_store: Optional[Dict[str, Chunk]] = None) -> None:
+        """Use an already built compact graph"""
+        self.graph = graph
+        if chunk_store is not None:
+            self.chunk_store = chunk_store
+        logger.info(f"Knowledge graph indexing complete: {len(graph.entities)} entities, "
+                    f"{len(graph)} triplets, {len(graph.chunk_ids)} chunks")
     
     def expand_with_graph(self, seed_chunks: List[Chunk], 
                          semantic_scores: List[SemanticScore]) -> Tuple[List[Chunk], Set[Triplet]]:
-        """Expand seed chunks using knowledge graph traversal"""
-        if self.kg is None:
+        """
+        Expand seed chunks using bounded knowledge graph traversal.
+        Returns the seeds followed by up to ``max_expanded_chunks`` new chunks
+        (best graph score first) and the triplets that led to them.
+        """
+        if self.graph is None:
             raise ValueError("Knowledge graph not indexed. Call index_knowledge_graph() first.")
         
-        # Get initial subgraph from seed chunks
-        seed_chunk_ids = {chunk.id for chunk in seed_chunks}
-        initial_triplets = set()
-        
-        for chunk_id in seed_chunk_ids:
-            initial_triplets.update(self.chunk_to_triplets[chunk_id])
-        
-        # Extract entities from initial triplets
-        seed_entities = set()
-        for triplet in initial_triplets:
-            seed_entities.add(triplet.head)
-            seed_entities.add(triplet.tail)
-        
-        # Perform m-hop expansion
-        expanded_triplets = self._traverse_graph(seed_entities, self.config.max_hops)
-        
-        # Get all chunks referenced by expanded triplets
-        expanded_chunk_ids = {triplet.chunk_id for triplet in expanded_triplets}
-        
-        # Create chunk lookup
-        chunk_lookup = {chunk.id: chunk for chunk in seed_chunks}
-        # Add any missing chunks (this would require access to all chunks)
-        # For now, we'll work with what we have
+        seed_scores = {score.chunk_id: score.score for score in semantic_scores}
+        for chunk in seed_chunks:
+            seed_scores.setdefault(chunk.id, 0.0)
+        
+        reached, triplet_ids = self.graph.expand(
+            seed_scores,
+            max_hops=self.config.max_hops,
+            beam_width=self.config.expansion_beam_width,
+            max_triplets=self.config.max_expanded_triplets,
+            hop_decay=self.config.hop_decay,
+            max_degree=self.config.max_entity_degree
+        )
         
-        expanded_chunks = [chunk_lookup[chunk_id] for chunk_id in expanded_chunk_ids 
-                          if chunk_id in chunk_lookup]
+        seed_ids = {chunk.id for chunk in seed_chunks}
+        new_chunk_ids = sorted((chunk_id for chunk_id in reached
+                                if chunk_id not in seed_ids and chunk_id in self.chunk_store),
+                               key=lambda chunk_id: -reached[chunk_id])
+        expanded_chunks = list(seed_chunks) + [
+            self.chunk_store[chunk_id] for chunk_id in new_chunk_ids[:self.config.max_expanded_chunks]
+        ]
+        expanded_triplets = {Triplet(*self.graph.triplet(i)) for i in triplet_ids}
         
         logger.info(f"Expanded from {len(seed_chunks)} to {len(expanded_chunks)} chunks "
                    f"using {len(expanded_triplets)} triplets")
         
         return expanded_chunks, expanded_triplets
-    
-    def _traverse_graph(self, seed_entities: Set[str], max_hops: int) -> Set[Triplet]:
-        """Traverse knowledge graph using BFS for m hops"""
-        visited_entities = set()
-        current_entities = seed_entities.copy()
-        all_triplets = set()
-        
-        for hop in range(max_hops):
-            next_entities = set()
-            
-            for entity in current_entities:
-                if entity in visited_entities:
-                    continue
-                
-                visited_entities.add(entity)
-                
-                # Get all triplets involving this entity
-                entity_triplets = self.entity_to_triplets[entity]
-                all_triplets.update(entity_triplets)
-                
-                # Add connected entities for next hop
-                for triplet in entity_triplets:
-                    if triplet.head not in visited_entities:
-                        next_entities.add(triplet.head)
-                    if triplet.tail not in visited_entities:
-                        next_entities.add(triplet.tail)
-            
-            current_entities = next_entities
-            
-            if not current_entities:  # No more entities to explore
-                break
-        
-        return all_triplets
 
 class OnlineRetriever:
     """Main class for online retrieval pipeline"""
@@ -174,7 +154,17 @@ class OnlineRetriever:
         """Index chunks and knowledge graph for retrieval"""
         self.all_chunks = {chunk.id: chunk for chunk in chunks}
         self.semantic_retriever.index_chunks(chunks)
-        self.graph_expander.index_knowledge_graph(kg)
+        self.graph_expander.index_knowledge_graph(kg, self.all_chunks)
+    
+    def index_artifact(self, path: str) -> None:
+        """Index chunks, embeddings and graph from an offline build artifact (see kg_builder.py)"""
+        artifact = load_kg_artifact(path)
+        if artifact.embedding_model != self.config.embedding_model:
+            raise ValueError(f"Artifact {path} was embedded with {artifact.embedding_model}, "
+                             f"but the retriever uses {self.config.embedding_model}")
+        self.all_chunks = {chunk.id: chunk for chunk in artifact.chunks}
+        self.semantic_retriever.set_embeddings(artifact.chunks, artifact.embeddings)
+        self.graph_expander.index_graph(artifact.graph, self.all_chunks)
     
     def retrieve(self, query: str) -> RetrievalResult:
         """Perform complete retrieval pipeline"""
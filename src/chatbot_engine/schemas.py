@@ -83,9 +83,15 @@ class KG2RAGConfig:
     # Semantic retrieval parameters
     semantic_top_k: int = 5 # Should test with 10, 20, 30, 40, 50
     embedding_model: str = "sentence-transformers/all-MiniLM-L6-v2"
+    embedding_cache_dir: Optional[str] = None # Persist chunk embeddings here (memory-mapped, keyed by chunk hash)
     
     # Graph expansion parameters
     max_hops: int = 2 # Should test with 1, 2, 3, 4, 5
+    expansion_beam_width: int = 50 # Best new entities kept per hop
+    max_expanded_triplets: int = 200
+    max_expanded_chunks: int = 20 # New chunks added beyond the seeds
+    hop_decay: float = 0.8 # Score multiplier per hop
+    max_entity_degree: int = 100 # Triplets followed per entity per hop (most confident first)
     
     # Context organization parameters
     max_context_chunks: int = 10 # Should test with 5, 10, 15, 20, 25
@@ -163,6 +169,8 @@ def validate_config(config: KG2RAGConfig) -> bool:
         raise ValueError("semantic_top_k must be positive")
     if config.max_hops < 1:
         raise ValueError("max_hops must be at least 1")
+    if config.expansion_beam_width <= 0:
+        raise ValueError("expansion_beam_width must be positive")
     if config.max_context_chunks <= 0:
         raise ValueError("max_context_chunks must be positive")
     if not (0 <= config.temperature <= 2):
@@ -0,0 +1,188 @@
+"""
+Token-budgeted context packing for agent prompts.
+
+Search results and primary documents used to be pasted into prompts as-is
+(up to 50 raw results per prompt, or a fixed head/tail character slice of
+the document). The packer here instead:
+
+- estimates the token cost of each candidate passage,
+- drops passages that are near-duplicates of one already packed, using
+  MinHash signatures over word shingles,
+- and fills a per-call token budget with the highest-value passages.
+
+Token counts are estimates (about four characters per token for Gemini
+models), so budgets should keep some headroom below the model's limit.
+"""
+
+import re
+import zlib
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+CHARS_PER_TOKEN = 4
+DEFAULT_NEAR_DUPLICATE_THRESHOLD = 0.8
+DEFAULT_SHINGLE_SIZE = 5
+DEFAULT_NUM_PERMUTATIONS = 64
+# Defaults for agent.context_packing.token_budgets in config.json
+DEFAULT_TOKEN_BUDGETS: Dict[str, int] = {
+    "decompose_query_document": 4000,
+    "hypothetical_answer_document": 2000,
+    "subquestion_document": 3000,
+    "subquestion_results": 6000,
+    "synthesis_document": 4000,
+    "synthesis_results": 6000,
+    "answer_results": 24000,
+}
+
+_MERSENNE_PRIME = (1 << 31) - 1
+_WORD_RE = re.compile(r"\w+")
+_TRUNCATION_MARKER = "\n\n[... CONTENT OMITTED FOR CONTEXT LIMITS ...]\n\n"
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count of ``text``."""
+    if not text:
+        return 0
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def split_passages(text: str, max_tokens: int = 400) -> List[str]:
+    """Split a document into paragraph-aligned passages of at most about ``max_tokens``."""
+    passages = []
+    current = []
+    current_tokens = 0
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        tokens = estimate_tokens(paragraph)
+        if tokens > max_tokens:
+            # Oversized paragraphs are cut at character boundaries
+            step = max_tokens * CHARS_PER_TOKEN
+            pieces = [paragraph[i:i + step] for i in range(0, len(paragraph), step)]
+        else:
+            pieces = [paragraph]
+        for piece in pieces:
+            piece_tokens = estimate_tokens(piece)
+            if current and current_tokens + piece_tokens > max_tokens:
+                passages.append("\n\n".join(current))
+                current, current_tokens = [], 0
+            current.append(piece)
+            current_tokens += piece_tokens
+    if current:
+        passages.append("\n\n".join(current))
+    return passages
+
+
+class ContextPacker:
+    """Dedupes and packs passages into token budgets."""
+
+    def __init__(self, near_duplicate_threshold: float = DEFAULT_NEAR_DUPLICATE_THRESHOLD,
+                 shingle_size: int = DEFAULT_SHINGLE_SIZE,
+                 num_permutations: int = DEFAULT_NUM_PERMUTATIONS,
+                 token_budgets: Optional[Dict[str, int]] = None, seed: int = 1):
+        self.near_duplicate_threshold = near_duplicate_threshold
+        self.shingle_size = shingle_size
+        self.token_budgets = dict(DEFAULT_TOKEN_BUDGETS)
+        self.token_budgets.update(token_budgets or {})
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _MERSENNE_PRIME, size=num_permutations, dtype=np.int64)
+        self._b = rng.integers(0, _MERSENNE_PRIME, size=num_permutations, dtype=np.int64)
+
+    @classmethod
+    def from_config(cls, config: Dict) -> "ContextPacker":
+        """Build from the "context_packing" block of the config.json "agent" section."""
+        packing_config = config.get("agent", {}).get("context_packing", {})
+        return cls(
+            near_duplicate_threshold=packing_config.get("near_duplicate_threshold", DEFAULT_NEAR_DUPLICATE_THRESHOLD),
+            shingle_size=packing_config.get("shingle_size", DEFAULT_SHINGLE_SIZE),
+            token_budgets=packing_config.get("token_budgets"),
+        )
+
+    def budget(self, name: str) -> int:
+        return self.token_budgets.get(name, 0)
+
+    def signature(self, text: str) -> np.ndarray:
+        """MinHash signature of the word shingles of ``text``."""
+        words = _WORD_RE.findall(text.lower())
+        if len(words) <= self.shingle_size:
+            shingles = [" ".join(words)]
+        else:
+            shingles = [" ".join(words[i:i + self.shingle_size])
+                        for i in range(len(words) - self.shingle_size + 1)]
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in set(shingles)),
+                             dtype=np.int64) % _MERSENNE_PRIME
+        return ((np.outer(self._a, hashes) + self._b[:, None]) % _MERSENNE_PRIME).min(axis=1)
+
+    def pack(self, passages: Sequence[str], token_budget: int) -> List[int]:
+        """
+        Indices of the passages to keep, in input order.
+
+        ``passages`` must be ordered by value, best first. Each passage is
+        kept if it is not a near-duplicate of a kept passage and still fits
+        in the remaining budget; passages that do not fit are skipped so
+        smaller ones further down can still use the space.
+        """
+        kept: List[int] = []
+        signatures: List[np.ndarray] = []
+        remaining = token_budget
+        for index, passage in enumerate(passages):
+            if not passage:
+                continue
+            tokens = estimate_tokens(passage)
+            if tokens > remaining:
+                continue
+            signature = self.signature(passage)
+            if signatures:
+                similarity = (np.vstack(signatures) == signature).mean(axis=1).max()
+                if similarity >= self.near_duplicate_threshold:
+                    continue
+            kept.append(index)
+            signatures.append(signature)
+            remaining -= tokens
+        return kept
+
+    def dedupe(self, passages: Sequence[str]) -> List[str]:
+        """``passages`` without near-duplicates, order preserved."""
+        return [passages[i] for i in self.pack(passages, token_budget=sum(estimate_tokens(p) for p in passages))]
+
+    def fit_document(self, text: str, token_budget: int, query: str = "",
+                     passages: Optional[Sequence[str]] = None) -> str:
+        """
+        The document itself if it fits in ``token_budget``, otherwise its
+        most relevant passages in document order.
+
+        ``passages`` are the document's own chunks when known; otherwise it
+        is split on paragraphs. The opening passage is always kept (titles,
+        bill summaries); the rest are ranked by word overlap with ``query``.
+        Gaps are marked; the markers are not counted against the budget.
+        """
+        if not text or estimate_tokens(text) <= token_budget:
+            return text or ""
+        if passages is None:
+            passages = split_passages(text, max_tokens=max(50, token_budget // 8))
+        query_words = set(_WORD_RE.findall(query.lower()))
+
+        def relevance(index: int) -> float:
+            if index == 0:
+                return float("inf")
+            words = _WORD_RE.findall(passages[index].lower())
+            if not words or not query_words:
+                return 0.0
+            return sum(1 for word in words if word in query_words) / len(words) ** 0.5
+
+        ranked = sorted(range(len(passages)), key=relevance, reverse=True)
+        kept = self.pack([passages[i] for i in ranked], token_budget)
+        selected = sorted(ranked[i] for i in kept)
+
+        parts = []
+        previous = -1
+        for index in selected:
+            if index != previous + 1:
+                parts.append(_TRUNCATION_MARKER.strip())
+            parts.append(passages[index])
+            previous = index
+        if previous != len(passages) - 1:
+            parts.append(_TRUNCATION_MARKER.strip())
+        return "\n\n".join(parts)
@@ -1,37 +1,120 @@
 import os
-from sqlalchemy import create_engine
+import json
+from pathlib import Path
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy.pool import StaticPool
-from contextlib import contextmanager
-from typing import Generator
+from sqlalchemy.pool import StaticPool, QueuePool
+from contextlib import contextmanager, asynccontextmanager
+from typing import Any, AsyncGenerator, Dict, Generator, Optional
 import logging
 
 from .models import Base
 
 logger = logging.getLogger(__name__)
 
+# Defaults for the "database" section of config.json
+DEFAULT_DATABASE_CONFIG: Dict[str, Any] = {
+    "pool_size": 10,
+    "max_overflow": 20,
+    "pool_timeout": 30,
+    "pool_recycle": 1800,
+    "sqlite_busy_timeout_ms": 5000,
+    "sqlite_synchronous": "NORMAL",
+}
+
+# Async drivers substituted into DATABASE_URL for the async session mode
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+def load_database_config() -> Dict[str, Any]:
+    """Load the "database" section of config.json, falling back to defaults"""
+    config = dict(DEFAULT_DATABASE_CONFIG)
+    config_path = Path(__file__).parent.parent / "config.json"
+    try:
+        with open(config_path, 'r') as f:
+            config.update(json.load(f).get("database", {}))
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not read database config from {config_path}: {e}")
+    return config
+
 class DatabaseManager:
-    def __init__(self, database_url: str = None):
+    """
+    Owns the SQLAlchemy engine and session factories.
+
+    ``DATABASE_URL`` selects the backend (defaults to the SQLite file next to
+    this module). Server databases such as Postgres get a sized QueuePool.
+    File-backed SQLite runs in WAL mode with a busy timeout so readers never
+    block on the writer, and each session checks out its own connection from
+    a pool rather than sharing a single one. An async engine for
+    ``get_async_db`` is created on first use.
+    """
+
+    def __init__(self, database_url: str = None, config: Optional[Dict[str, Any]] = None):
+        if database_url is None:
+            database_url = os.getenv("DATABASE_URL")
         if database_url is None:
             # Default to SQLite database in the src/database directory
             db_path = os.path.join(os.path.dirname(__file__), 'users.db')
             database_url = f"sqlite:///{db_path}"
-        
+
         self.database_url = database_url
-        
-        # SQLite specific configuration
-        self.engine = create_engine(
-            database_url,
-            poolclass=StaticPool,
-            connect_args={
-                "check_same_thread": False,  # Allow SQLite to be used across threads
-                "timeout": 20  # 20 second timeout for database locks
-            },
-            echo=False  # Set to True for SQL query logging
-        )
-        
+        self.config = config if config is not None else load_database_config()
+        self.url = make_url(database_url)
+        self.is_sqlite = self.url.get_backend_name() == "sqlite"
+
+        self.engine = create_engine(database_url, **self._engine_options(), echo=False)
+        if self.is_sqlite:
+            event.listen(self.engine, "connect", self._configure_sqlite_connection)
+
         self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
-        
+        self._async_engine = None
+        self._async_session_factory = None
+
+    def _is_memory_sqlite(self) -> bool:
+        return self.is_sqlite and self.url.database in (None, "", ":memory:")
+
+    def _engine_options(self) -> Dict[str, Any]:
+        if self._is_memory_sqlite():
+            # An in-memory database only exists on its one connection
+            return {
+                "poolclass": StaticPool,
+                "connect_args": {"check_same_thread": False},
+            }
+
+        options = {
+            "pool_size": self.config["pool_size"],
+            "max_overflow": self.config["max_overflow"],
+            "pool_timeout": self.config["pool_timeout"],
+            "pool_pre_ping": True,
+        }
+        if self.is_sqlite:
+            # Sessions may be opened on a threadpool thread and used on the
+            # event loop thread, so connections are pooled per checkout rather
+            # than pinned to threads
+            options.update({
+                "poolclass": QueuePool,
+                "connect_args": {
+                    "check_same_thread": False,
+                    "timeout": self.config["sqlite_busy_timeout_ms"] / 1000,
+                },
+            })
+        else:
+            options["pool_recycle"] = self.config["pool_recycle"]
+        return options
+
+    def _configure_sqlite_connection(self, dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            if not self._is_memory_sqlite():
+                cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute(f"PRAGMA synchronous={self.config['sqlite_synchronous']}")
+            cursor.execute(f"PRAGMA busy_timeout={int(self.config['sqlite_busy_timeout_ms'])}")
+        finally:
+            cursor.close()
+
     def create_tables(self):
         """Create all tables in the database"""
         try:
@@ -40,7 +123,7 @@ class DatabaseManager:
         except Exception as e:
             logger.error(f"Error creating database tables: {e}")
             raise
-    
+
     def drop_tables(self):
         """Drop all tables in the database (use with caution!)"""
         try:
@@ -49,7 +132,7 @@ class DatabaseManager:
         except Exception as e:
             logger.error(f"Error dropping database tables: {e}")
             raise
-    
+
     @contextmanager
     def get_session(self) -> Generator[Session, None, None]:
         """Get a database session with automatic cleanup"""
@@ -63,11 +146,52 @@ class DatabaseManager:
             raise
         finally:
             session.close()
-    
+
     def get_session_sync(self) -> Session:
         """Get a database session (manual cleanup required)"""
         return self.SessionLocal()
 
+    @property
+    def async_session_factory(self):
+        """Async session factory, creating the async engine on first use"""
+        if self._async_session_factory is None:
+            from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+            backend = self.url.get_backend_name()
+            if backend not in ASYNC_DRIVERS:
+                raise RuntimeError(f"No async driver configured for database backend '{backend}'")
+            async_url = self.url.set(drivername=ASYNC_DRIVERS[backend])
+            options = self._engine_options()
+            options.pop("poolclass", None)
+            if self.is_sqlite:
+                options = {"connect_args": {"timeout": self.config["sqlite_busy_timeout_ms"] / 1000}}
+
+            self._async_engine = create_async_engine(async_url, **options, echo=False)
+            if self.is_sqlite:
+                event.listen(self._async_engine.sync_engine, "connect", self._configure_sqlite_connection)
+            self._async_session_factory = async_sessionmaker(
+                self._async_engine, autoflush=False, expire_on_commit=False
+            )
+        return self._async_session_factory
+
+    @asynccontextmanager
+    async def get_async_session(self):
+        """Get an async database session with automatic cleanup"""
+        async with self.async_session_factory() as session:
+            try:
+                yield session
+                await session.commit()
+            except Exception as e:
+                await session.rollback()
+                logger.error(f"Database session error: {e}")
+                raise
+
+    async def dispose(self):
+        """Close pooled connections (checkpoints the SQLite WAL)"""
+        if self._async_engine is not None:
+            await self._async_engine.dispose()
+        self.engine.dispose()
+
 # Global database manager instance
 db_manager = DatabaseManager()
 
@@ -76,3 +200,8 @@ def get_db() -> Generator[Session, None, None]:
     """FastAPI dependency to get database session"""
     with db_manager.get_session() as session:
         yield session
+
+async def get_async_db() -> AsyncGenerator[Any, None]:
+    """FastAPI dependency to get an async database session (needs aiosqlite or asyncpg)"""
+    async with db_manager.get_async_session() as session:
+        yield session
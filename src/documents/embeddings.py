@@ -6,7 +6,10 @@ Integrates ChromaDB with Google AI embeddings for document storage and retrieval
 import os
 import time
 import json
-from typing import List, Dict, Any, Optional, Tuple
+import threading
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from typing import List, Dict, Any, Iterable, Optional, Tuple
 import chromadb
 from chromadb.config import Settings
 import google.generativeai as genai
@@ -23,9 +26,114 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Process-wide ChromaDB client and embedding function shared by every manager,
+# so opening a collection never re-creates the client or re-configures genai
+_shared_client = None
+_shared_embedding_function = None
+_shared_lock = threading.Lock()
+
+def _set_http_timeout(client, timeout: float) -> bool:
+    """
+    Bound requests on the client's keep-alive HTTP session so a stalled server
+    cannot hang API workers. chromadb has no public setting for this, so the
+    session is only touched when it is the httpx client this was written
+    against; returns False when the timeout could not be applied.
+    """
+    server = client._server if hasattr(client, "_server") else None
+    session = server._session if server is not None and hasattr(server, "_session") else None
+    try:
+        import httpx
+    except ImportError:
+        return False
+    if not isinstance(session, httpx.Client):
+        return False
+    session.timeout = httpx.Timeout(timeout)
+    return True
+
+def _create_http_client():
+    """Create a client for a shared Chroma server (chroma_mode = "http")."""
+    host = os.getenv("CHROMA_HOST", getattr(settings, "chroma_host", "localhost"))
+    port = int(os.getenv("CHROMA_PORT", getattr(settings, "chroma_port", 8000)))
+    ssl = getattr(settings, "chroma_ssl", False)
+    timeout = getattr(settings, "chroma_timeout_seconds", 30)
+    headers = {}
+    token = os.getenv("CHROMA_AUTH_TOKEN")
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    
+    client = chromadb.HttpClient(
+        host=host,
+        port=port,
+        ssl=ssl,
+        headers=headers,
+        settings=Settings(anonymized_telemetry=False, allow_reset=True)
+    )
+    
+    if not _set_http_timeout(client, timeout):
+        logger.warning("This chromadb version does not expose a session timeout; "
+                       "requests to the Chroma server use the client's default timeout")
+    
+    logger.info(f"ChromaDB HTTP client connected to {'https' if ssl else 'http'}://{host}:{port}")
+    return client
+
+# Loaded HNSW segments are what actually holds memory in the embedded client;
+# closing a collection wrapper does not unload them, Chroma's LRU cache does
+DEFAULT_CHROMA_MEMORY_LIMIT_BYTES = 2 * 1024 ** 3
+
+def _persistent_client_settings() -> Dict[str, Any]:
+    """Settings for the embedded client; a limit of 0 disables segment eviction."""
+    client_settings = {"anonymized_telemetry": False, "allow_reset": True}
+    memory_limit = getattr(settings, "chroma_memory_limit_bytes", DEFAULT_CHROMA_MEMORY_LIMIT_BYTES)
+    if memory_limit:
+        # Let Chroma unload least recently used HNSW segments past the limit
+        client_settings["chroma_segment_cache_policy"] = "LRU"
+        client_settings["chroma_memory_limit_bytes"] = int(memory_limit)
+    return client_settings
+
+def _create_persistent_client():
+    """Create an embedded client on the local chroma_db_path (the default)."""
+    client = chromadb.PersistentClient(
+        path=str(settings.chroma_db_path),
+        settings=Settings(**_persistent_client_settings())
+    )
+    logger.info(f"ChromaDB persistent client initialized at: {settings.chroma_db_path}")
+    return client
+
+def get_chroma_client():
+    """
+    Get the process-wide ChromaDB client, creating it on first use.
+
+    ``chroma_mode`` in config.json (or the CHROMA_MODE environment variable)
+    selects "embedded" (default) or "http". In http mode every API worker
+    talks to one Chroma server instead of loading its own copy of each index.
+    """
+    global _shared_client
+    with _shared_lock:
+        if _shared_client is None:
+            mode = os.getenv("CHROMA_MODE", getattr(settings, "chroma_mode", "embedded"))
+            if mode == "http":
+                _shared_client = _create_http_client()
+            else:
+                _shared_client = _create_persistent_client()
+        return _shared_client
+
+def get_embedding_function() -> "GoogleEmbeddingFunction":
+    """Get the process-wide Google embedding function, creating it on first use."""
+    global _shared_embedding_function
+    with _shared_lock:
+        if _shared_embedding_function is None:
+            _shared_embedding_function = GoogleEmbeddingFunction(
+                api_key=settings.google_api_key,
+                model_name=settings.embedding_model
+            )
+        return _shared_embedding_function
+
 class GoogleEmbeddingFunction:
     """Custom embedding function for Google AI embeddings."""
     
+    # Texts per embed_content request
+    batch_size = 100
+    
     def __init__(self, api_key: str, model_name: str = "text-embedding-004"):
         """Initialize Google embedding function.
         
@@ -43,7 +151,7 @@ class GoogleEmbeddingFunction:
         return f"google_{self.model_name}"
     
     def __call__(self, input: List[str]) -> List[List[float]]:
-        """Generate embeddings for input texts.
+        """Generate embeddings for input texts, one request per batch.
         
         Args:
             input: List of texts to embed
@@ -53,23 +161,25 @@ class GoogleEmbeddingFunction:
         """
         embeddings = []
         
-        for text in input:
+        for start in range(0, len(input), self.batch_size):
+            batch = [text or " " for text in input[start:start + self.batch_size]]
             try:
-                # Generate embedding using Google AI
+                # Generate embeddings using Google AI
                 result = genai.embed_content(
                     model=f"models/{self.model_name}",
-                    content=text,
+                    content=batch,
                     task_type="retrieval_document"
                 )
-                embeddings.append(result['embedding'])
+                embeddings.extend(result['embedding'])
                 
-                # Add small delay to respect rate limits
-                time.sleep(0.1)
+                # Add small delay between batches to respect rate limits
+                if start + self.batch_size < len(input):
+                    time.sleep(0.1)
                 
             except Exception as e:
-                logger.error(f"Error generating embedding for text: {str(e)}")
-                # Return zero vector as fallback
-                embeddings.append([0.0] * 768)  # Default dimension for Google embeddings
+                logger.error(f"Error generating embeddings for batch of {len(batch)} texts: {str(e)}")
+                # Return zero vectors as fallback
+                embeddings.extend([[0.0] * 768 for _ in batch])  # Default dimension for Google embeddings
         
         return embeddings
 
@@ -91,16 +201,7 @@ class ChromaDBManager:
     def _initialize_client(self):
         """Initialize ChromaDB client."""
         try:
-            # Create ChromaDB client with persistent storage (embedded mode only)
-            self.client = chromadb.PersistentClient(
-                path=str(settings.chroma_db_path),
-                settings=Settings(
-                    anonymized_telemetry=False,
-                    allow_reset=True
-                )
-            )
-            logger.info(f"ChromaDB persistent client initialized at: {settings.chroma_db_path}")
-            
+            self.client = get_chroma_client()
         except Exception as e:
             logger.error(f"Failed to initialize ChromaDB client: {str(e)}")
             raise
@@ -108,12 +209,7 @@ class ChromaDBManager:
     def _initialize_embedding_function(self):
         """Initialize Google embedding function."""
         try:
-            self.embedding_function = GoogleEmbeddingFunction(
-                api_key=settings.google_api_key,
-                model_name=settings.embedding_model
-            )
-            logger.info("Google embedding function initialized")
-            
+            self.embedding_function = get_embedding_function()
         except Exception as e:
             logger.error(f"Failed to initialize embedding function: {str(e)}")
             raise
@@ -427,46 +523,54 @@ class DynamicChromeManager(ChromaDBManager):
             )
             print(f"✅ Created new collection: {collection_name}")
     
+    def _prepare_document(self, document: dict, ingestion_config: dict) -> Optional[Tuple[str, Dict[str, Any], str]]:
+        """Build (content, metadata, id) for a document, or None if it has nothing to embed"""
+        # Extract content fields specified in ingestion config
+        contents_to_embed = ingestion_config.get("contents_to_embed", [])
+        
+        # Combine all specified content fields
+        content_parts = []
+        for field in contents_to_embed:
+            if field in document and document[field]:
+                content_parts.append(str(document[field]))
+        
+        if not content_parts:
+            print(f"No content found in fields {contents_to_embed} for document")
+            return None
+        
+        # Join all content with newlines
+        combined_content = "\n\n".join(content_parts)
+        
+        # Generate unique ID
+        import uuid
+        doc_id = f"{self.collection_name}_{uuid.uuid4().hex[:8]}_{int(time.time())}"
+        
+        # Use entire document as metadata, ensuring all values are JSON-serializable
+        metadata = {}
+        for key, value in document.items():
+            if value is not None:
+                if isinstance(value, (str, int, float, bool)):
+                    metadata[key] = value
+                else:
+                    metadata[key] = str(value)
+            else:
+                metadata[key] = ""
+        
+        # Add system metadata
+        metadata["id"] = doc_id
+        metadata["collection"] = self.collection_name
+        metadata["embedded_fields"] = json.dumps(contents_to_embed)  # Convert list to JSON string
+        
+        return combined_content, metadata, doc_id
+    
     def add_document(self, document: dict, ingestion_config: dict) -> bool:
         """Add a document to the collection using specified contents_to_embed"""
         try:
-            # Extract content fields specified in ingestion config
-            contents_to_embed = ingestion_config.get("contents_to_embed", [])
-            
-            # Combine all specified content fields
-            content_parts = []
-            for field in contents_to_embed:
-                if field in document and document[field]:
-                    content_parts.append(str(document[field]))
-            
-            if not content_parts:
-                print(f"No content found in fields {contents_to_embed} for document")
+            prepared = self._prepare_document(document, ingestion_config)
+            if prepared is None:
                 return False
             
-            # Join all content with newlines
-            combined_content = "\n\n".join(content_parts)
-            
-            # Generate unique ID
-            import time
-            import uuid
-            doc_id = f"{self.collection_name}_{uuid.uuid4().hex[:8]}_{int(time.time())}"
-            
-            # Use entire document as metadata, ensuring all values are JSON-serializable
-            metadata = {}
-            for key, value in document.items():
-                if value is not None:
-                    if isinstance(value, (str, int, float, bool)):
-                        metadata[key] = value
-                    else:
-                        metadata[key] = str(value)
-                else:
-                    metadata[key] = ""
-            
-            # Add system metadata
-            metadata["id"] = doc_id
-            metadata["collection"] = self.collection_name
-            metadata["embedded_fields"] = json.dumps(contents_to_embed)  # Convert list to JSON string
-            
+            combined_content, metadata, doc_id = prepared
             self.collection.add(
                 documents=[combined_content],
                 metadatas=[metadata],
@@ -478,6 +582,37 @@ class DynamicChromeManager(ChromaDBManager):
             print(f"Error adding document to {self.collection_name}: {e}")
             return False
     
+    def add_documents_batch(self, documents: List[dict], ingestion_config: dict,
+                            batch_size: int = 100) -> Tuple[int, List[str]]:
+        """
+        Add documents in batches of ``batch_size``: one embedding request and
+        one collection write per batch instead of per document.
+        
+        Returns:
+            (number of documents added, list of error messages)
+        """
+        added = 0
+        errors = []
+        for start in range(0, len(documents), batch_size):
+            contents, metadatas, ids = [], [], []
+            for i, document in enumerate(documents[start:start + batch_size], start=start):
+                prepared = self._prepare_document(document, ingestion_config)
+                if prepared is None:
+                    errors.append(f"Document {i}: Failed to add to collection")
+                    continue
+                contents.append(prepared[0])
+                metadatas.append(prepared[1])
+                ids.append(prepared[2])
+            if not contents:
+                continue
+            try:
+                self.collection.add(documents=contents, metadatas=metadatas, ids=ids)
+                added += len(contents)
+            except Exception as e:
+                print(f"Error adding batch to {self.collection_name}: {e}")
+                errors.append(f"Documents {start}-{start + batch_size - 1}: {str(e)}")
+        return added, errors
+    
     def search_similar_chunks(self, query: str, num_results: int = 50) -> List[Dict[str, Any]]:
         """Search for similar chunks in the collection"""
         try:
@@ -498,6 +633,7 @@ class DynamicChromeManager(ChromaDBManager):
             if results["documents"] and results["documents"][0]:
                 for i, doc in enumerate(results["documents"][0]):
                     result = {
+                        "id": results["ids"][0][i] if results.get("ids") else None,
                         "content": doc,
                         "metadata": results["metadatas"][0][i] if results["metadatas"] else {},
                         "score": 1.0 - results["distances"][0][i] if results["distances"] else 1.0
@@ -545,6 +681,91 @@ class DynamicChromeManager(ChromaDBManager):
             print(f"Error searching in {self.collection_name}: {e}")
             return []
 
+class CollectionRegistry(MutableMapping):
+    """
+    Name -> DynamicChromeManager mapping with bounded session collections.
+
+    Configured collections are pinned and stay open. Collections opened on
+    demand (chat-with-PDF sessions) are kept in LRU order and closed when
+    more than ``max_open`` are open or when idle longer than
+    ``idle_seconds``. Closing only drops the wrapper; the HNSW segments it
+    loaded are unloaded by the client's LRU segment cache once
+    ``chroma_memory_limit_bytes`` is exceeded. Behaves like the plain dict it replaces,
+    so the query engines can keep holding a reference to it.
+    """
+    
+    def __init__(self, pinned: Iterable[str] = (), max_open: int = 32, idle_seconds: float = 1800):
+        self.pinned = set(pinned)
+        self.max_open = max_open
+        self.idle_seconds = idle_seconds
+        self._managers: "OrderedDict[str, DynamicChromeManager]" = OrderedDict()
+        self._last_used: Dict[str, float] = {}
+        self._lock = threading.RLock()
+    
+    def __getitem__(self, name: str) -> "DynamicChromeManager":
+        with self._lock:
+            manager = self._managers[name]
+            self._touch(name)
+            return manager
+    
+    def __setitem__(self, name: str, manager: "DynamicChromeManager") -> None:
+        with self._lock:
+            self._managers[name] = manager
+            self._touch(name)
+            self._evict()
+    
+    def __delitem__(self, name: str) -> None:
+        with self._lock:
+            del self._managers[name]
+            self._last_used.pop(name, None)
+    
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._managers))
+    
+    def __len__(self) -> int:
+        return len(self._managers)
+    
+    def __contains__(self, name) -> bool:
+        return name in self._managers
+    
+    def _touch(self, name: str) -> None:
+        self._managers.move_to_end(name)
+        self._last_used[name] = time.monotonic()
+    
+    def _evict(self) -> None:
+        now = time.monotonic()
+        sessions = [name for name in self._managers if name not in self.pinned]
+        for name in sessions:
+            over_limit = len(self._managers) - len(self.pinned & self._managers.keys()) > self.max_open
+            idle = now - self._last_used.get(name, now) > self.idle_seconds
+            if not (over_limit or idle):
+                continue
+            del self._managers[name]
+            self._last_used.pop(name, None)
+            logger.info(f"Closed idle session collection: {name}")
+    
+    def open(self, name: str) -> "DynamicChromeManager":
+        """Get the manager for ``name``, opening the collection if needed."""
+        with self._lock:
+            if name in self._managers:
+                return self[name]
+        # Opening a collection is slow; don't hold the lock (and block lookups
+        # of other collections) while it loads
+        manager = DynamicChromeManager(name)
+        with self._lock:
+            if name in self._managers:
+                # Another caller opened it first; keep theirs
+                return self[name]
+            self[name] = manager
+            print(f"📥 Loaded collection into memory: {name}")
+            return manager
+    
+    def sweep(self) -> None:
+        """Close session collections that have been idle too long."""
+        with self._lock:
+            self._evict()
+
 # Global instance
 _chroma_manager = None
 
@@ -0,0 +1,195 @@
+"""
+Cache of chat-with-PDF primary documents.
+
+A session collection's document is stored as chunk files under
+``documents/chunked_text/<collection>``. Loading it means listing that
+directory and parsing every chunk file, and this used to happen on every
+question. This cache keeps each loaded document: the joined text, a chunk
+offsets table and token counts. Entries are keyed by the directory mtime, so
+follow-up questions in a session reuse the document after a single stat().
+Least recently used documents are evicted past ``max_documents``.
+
+Rewriting a chunk file in place does not change the directory mtime, so code
+that does that must call ``invalidate``.
+"""
+
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    from ..context_packing import estimate_tokens
+except ImportError:
+    from context_packing import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNKED_TEXT_ROOT = os.path.join("documents", "chunked_text")
+DEFAULT_MAX_DOCUMENTS = 32
+# Collections whose emptiness/existence is remembered for validation
+MAX_REMEMBERED_LISTINGS = 1024
+
+
+class PrimaryDocument:
+    """A collection's chunks joined into one text, with per-chunk offsets and token counts."""
+
+    def __init__(self, collection: str, chunks: List[str], mtime_ns: int, file_count: int):
+        self.collection = collection
+        self.mtime_ns = mtime_ns
+        self.file_count = file_count
+        self.text = "\n\n".join(chunks)
+        # (start, end) character offsets of each chunk in ``text``
+        self.offsets: List[Tuple[int, int]] = []
+        position = 0
+        for chunk in chunks:
+            self.offsets.append((position, position + len(chunk)))
+            position += len(chunk) + 2
+        self.token_counts = [estimate_tokens(chunk) for chunk in chunks]
+        self.total_tokens = sum(self.token_counts)
+
+    @property
+    def chunks(self) -> List[str]:
+        return [self.text[start:end] for start, end in self.offsets]
+
+
+class PrimaryDocumentCache:
+    """LRU cache of PrimaryDocument by collection, revalidated by directory mtime."""
+
+    def __init__(self, root: str = DEFAULT_CHUNKED_TEXT_ROOT, max_documents: int = DEFAULT_MAX_DOCUMENTS,
+                 dedupe: Optional[Callable[[List[str]], List[str]]] = None):
+        self.root = root
+        self.max_documents = max_documents
+        # Applied to the chunk texts once per load (e.g. to drop overlapping windows)
+        self.dedupe = dedupe
+        self._documents: "OrderedDict[str, PrimaryDocument]" = OrderedDict()
+        # collection -> (directory mtime, has chunk files)
+        self._listings: "OrderedDict[str, Tuple[int, bool]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, collection: str) -> Optional[str]:
+        # Collection names come from requests; never let them leave the root
+        if not collection or collection in (".", "..") or os.path.basename(collection) != collection:
+            return None
+        return os.path.join(self.root, collection)
+
+    def _mtime_ns(self, collection: str) -> Optional[int]:
+        path = self._path(collection)
+        if path is None:
+            return None
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns
+
+    @staticmethod
+    def _chunk_files(path: str) -> List[str]:
+        return sorted(f for f in os.listdir(path) if f.endswith('.json') and not f.endswith('_metadata.json'))
+
+    def has_chunks(self, collection: str) -> bool:
+        """Whether the collection has chunk files; one stat() when the answer is cached."""
+        mtime_ns = self._mtime_ns(collection)
+        if mtime_ns is None:
+            return False
+        with self._lock:
+            document = self._documents.get(collection)
+            if document is not None and document.mtime_ns == mtime_ns:
+                return True
+            listing = self._listings.get(collection)
+            if listing is not None and listing[0] == mtime_ns:
+                self._listings.move_to_end(collection)
+                return listing[1]
+        try:
+            has_files = bool(self._chunk_files(self._path(collection)))
+        except OSError:
+            return False
+        with self._lock:
+            self._listings[collection] = (mtime_ns, has_files)
+            self._listings.move_to_end(collection)
+            while len(self._listings) > MAX_REMEMBERED_LISTINGS:
+                self._listings.popitem(last=False)
+        return has_files
+
+    def get(self, collection: str) -> Optional[PrimaryDocument]:
+        """The collection's document, loading it if missing or stale; None if it has no text."""
+        mtime_ns = self._mtime_ns(collection)
+        if mtime_ns is None:
+            logger.warning(f"Primary collection path not found: {collection}")
+            return None
+        with self._lock:
+            document = self._documents.get(collection)
+            if document is not None and document.mtime_ns == mtime_ns:
+                self._documents.move_to_end(collection)
+                self.hits += 1
+                return document
+            self.misses += 1
+
+        document = self._load(collection, mtime_ns)
+        if document is None:
+            return None
+        with self._lock:
+            self._documents[collection] = document
+            self._documents.move_to_end(collection)
+            while len(self._documents) > self.max_documents:
+                self._documents.popitem(last=False)
+        return document
+
+    def _load(self, collection: str, mtime_ns: int) -> Optional[PrimaryDocument]:
+        path = self._path(collection)
+        try:
+            json_files = self._chunk_files(path)
+        except OSError as e:
+            logger.warning(f"Could not list primary collection {collection}: {e}")
+            return None
+        if not json_files:
+            logger.warning(f"No document files found in primary collection: {collection}")
+            return None
+
+        chunks = []
+        for json_file in json_files:
+            try:
+                with open(os.path.join(path, json_file), 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.error(f"Error reading file {json_file}: {e}")
+                continue
+            # Extract text from chunks
+            if isinstance(data, list):
+                chunks.extend(chunk['text'] for chunk in data if isinstance(chunk, dict) and 'text' in chunk)
+            elif isinstance(data, dict) and 'text' in data:
+                chunks.append(data['text'])
+
+        if not chunks:
+            logger.warning(f"No text content found in primary collection: {collection}")
+            return None
+        if self.dedupe is not None:
+            chunks = self.dedupe(chunks)
+
+        document = PrimaryDocument(collection, chunks, mtime_ns, len(json_files))
+        logger.info(f"Loaded primary document {collection}: {len(document.text)} characters, "
+                    f"{len(chunks)} chunks from {len(json_files)} files")
+        return document
+
+    def invalidate(self, collection: Optional[str] = None) -> None:
+        """Drop one collection's cached document, or all of them."""
+        with self._lock:
+            if collection is None:
+                self._documents.clear()
+                self._listings.clear()
+            else:
+                self._documents.pop(collection, None)
+                self._listings.pop(collection, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "documents": len(self._documents),
+                "max_documents": self.max_documents,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
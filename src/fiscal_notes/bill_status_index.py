@@ -0,0 +1,135 @@
+"""
+Cached bill status listing for the fiscal note generation directories.
+
+Replaces the per-request directory walk behind ``/get_fiscal_note_files``:
+which bills exist on disk and whether they have generated fiscal notes is
+kept in memory, updated by the job runner on state transitions, and rescanned
+only when the directory changes. "Generating" flags are supplied by the
+caller (one pipelined Redis call), and the serialized listing is cached with
+an ETag so polling clients can revalidate cheaply.
+"""
+
+import os
+import time
+import json
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+class BillStatusIndex:
+    """In-memory index of bill directories and whether their fiscal notes are ready."""
+
+    def __init__(self, root: Path, exclude: Iterable[str] = (), rescan_seconds: float = 30.0):
+        self.root = Path(root)
+        self.exclude = set(exclude)
+        # Safety net for changes made outside the job runner (scripts, other hosts)
+        self.rescan_seconds = rescan_seconds
+        self.version = 0
+        self._has_notes: Dict[str, bool] = {}
+        self._root_mtime: Optional[int] = None
+        self._last_scan = 0.0
+        self._listing_cache: Optional[Tuple[Tuple[int, frozenset], str, str]] = None
+        self._lock = threading.Lock()
+
+    def _is_bill_dir(self, name: str) -> bool:
+        return not name.startswith('.') and not name.startswith("__") and name not in self.exclude
+
+    def _has_fiscal_notes(self, name: str) -> bool:
+        notes_dir = self.root / name / "fiscal_notes"
+        try:
+            with os.scandir(notes_dir) as entries:
+                return any(True for _ in entries)
+        except OSError:
+            return False
+
+    def _root_mtime_ns(self) -> Optional[int]:
+        try:
+            return os.stat(self.root).st_mtime_ns
+        except OSError:
+            return None
+
+    def _scan(self) -> None:
+        has_notes = {}
+        try:
+            with os.scandir(self.root) as entries:
+                for entry in entries:
+                    if entry.is_dir() and self._is_bill_dir(entry.name):
+                        has_notes[entry.name] = self._has_fiscal_notes(entry.name)
+        except OSError:
+            pass
+
+        self._root_mtime = self._root_mtime_ns()
+        self._last_scan = time.monotonic()
+        if has_notes != self._has_notes:
+            self._has_notes = has_notes
+            self.version += 1
+
+    def refresh_if_stale(self) -> None:
+        """Rescan if the directory changed or the rescan interval has passed."""
+        with self._lock:
+            stale = (
+                self._root_mtime is None
+                or self._root_mtime_ns() != self._root_mtime
+                or time.monotonic() - self._last_scan > self.rescan_seconds
+            )
+            if stale:
+                self._scan()
+
+    def _touch_root(self) -> None:
+        # Bumping the directory mtime tells other workers' indexes to rescan
+        try:
+            os.utime(self.root)
+        except OSError:
+            pass
+
+    def mark(self, name: str) -> None:
+        """Re-check one bill after a job state transition."""
+        with self._lock:
+            if (self.root / name).is_dir():
+                self._has_notes[name] = self._has_fiscal_notes(name)
+            else:
+                self._has_notes.pop(name, None)
+            self.version += 1
+            self._touch_root()
+            self._root_mtime = self._root_mtime_ns()
+
+    def remove(self, name: str) -> None:
+        """Forget a bill whose directory was deleted."""
+        self.mark(name)
+
+    def bill_names(self) -> List[str]:
+        self.refresh_if_stale()
+        with self._lock:
+            return list(self._has_notes)
+
+    def listing(self, generating: Set[str]) -> Tuple[str, str]:
+        """
+        Serialized listing and its ETag. Bills with an active job are
+        "generating"; otherwise "ready" if fiscal notes exist, else "error".
+        """
+        self.refresh_if_stale()
+        # mark() runs on other threads; serialize from a snapshot taken under the lock
+        with self._lock:
+            key = (self.version, frozenset(generating))
+            cached = self._listing_cache
+            if cached is not None and cached[0] == key:
+                return cached[1], cached[2]
+            entries = list(self._has_notes.items())
+
+        dirs = []
+        for name, has_notes in entries:
+            if name in generating:
+                status = "generating"
+            else:
+                status = "ready" if has_notes else "error"
+            dirs.append({"name": name, "status": status})
+
+        body = json.dumps(dirs)
+        etag = '"' + hashlib.sha1(body.encode('utf-8')).hexdigest() + '"'
+        with self._lock:
+            # Don't overwrite a listing of a newer version built meanwhile
+            if self.version == key[0]:
+                self._listing_cache = (key, body, etag)
+        return body, etag
@@ -2,11 +2,15 @@ from fastapi import FastAPI, HTTPException, Query, Form, File, UploadFile, Reque
 import asyncio
 from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, StreamingResponse, FileResponse, HTMLResponse, PlainTextResponse
-from typing import List, Dict, Any, Optional, Union
+from fastapi.responses import JSONResponse, StreamingResponse, FileResponse, HTMLResponse, PlainTextResponse, Response
+from typing import List, Dict, Any, Optional, Union, AsyncGenerator
 import os
+import re
+import time
+from collections import OrderedDict
 from pathlib import Path
 import json
+import uuid
 from datetime import datetime
 import google.generativeai as genai
 from document_type_classifier import classify_document_type, get_document_type_description, get_document_type_icon
@@ -23,6 +27,7 @@ from fiscal_notes.generation.step4_get_numbers import extract_number_context
 from fiscal_notes.generation.step5_fiscal_note_gen import generate_fiscal_notes
 from fiscal_notes.generation.step6_enhance_numbers import enhance_numbers_for_bill
 from fiscal_notes.generation.step7_track_chronological import track_chronological_changes
+from fiscal_notes.bill_status_index import BillStatusIndex
 
 import shutil
 from enum import Enum
@@ -43,12 +48,15 @@ from documents.step0_document_upload.web_scraper import scrape_bill_page_links
 
 
 from settings import Settings, settings
-from documents.embeddings import DynamicChromeManager
+from documents.embeddings import DynamicChromeManager, CollectionRegistry, get_embedding_function
+from answer_cache import SemanticAnswerCache
 from query_processor import QueryProcessor
 from langgraph_agent import LangGraphRAGAgent
-from chatbot_engine.nlp_backend import NLPBackend
+from chatbot_engine.nlp_backend import NLPBackend, GlobalState
+from chatbot_engine.conversation_store import create_conversation_store
 
 from bill_data.bill_similarity_search import BillSimilaritySearcher
+from bill_data.similar_bill_index import SimilarBillIndex, build_from_searcher
 
 # User permissions system imports
 from api.users import router as users_router
@@ -58,6 +66,8 @@ from api.routes.auth_routes import router as auth_router
 from refbot.routes import router as refbot_router
 from database.connection import db_manager
 from database.init_db import init_permissions, init_admin_user
+from auth.token_validator import get_token_validator
+from auth.audit_sink import audit_sink
 
 # ============================================================================
 # FEATURE FLAGS - Fiscal Note Generation Pipeline
@@ -110,11 +120,32 @@ async def lifespan(app: FastAPI):
         # The app can still run, but user management features may not work
         print("⚠️  Continuing startup without user management features...")
     
+    # Audit entries are written in batches off the request path
+    audit_sink.start()
+    
+    # Start the background JWKS refresher so the first authenticated request finds keys ready
+    try:
+        get_token_validator()
+    except ValueError as e:
+        print(f"⚠️  Auth0 token validator not configured: {e}")
+    
+    # Start this worker's cross-worker WebSocket listener before accepting connections
+    await manager.start()
+    
+    # Heavy components load in the background; /ready flips once they are done
+    startup_task = asyncio.create_task(initialize_components())
+    
     # Yield control to the application
     yield
     
-    # Shutdown (cleanup code can go here if needed)
+    # Shutdown
     print("🔄 Application shutting down...")
+    await manager.stop()
+    if not startup_task.done():
+        startup_task.cancel()
+    # Flush queued audit entries before the engine goes away
+    await asyncio.to_thread(audit_sink.stop)
+    await db_manager.dispose()
 
 # Initialize FastAPI app with config and lifespan handler
 app = FastAPI(
@@ -138,6 +169,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-After-Id"],  # Cursor for paging /api/admin/users
 )
 
 # Include user permissions system routers
@@ -147,43 +179,153 @@ app.include_router(tools_router)
 app.include_router(auth_router)
 app.include_router(refbot_router)
 
-# Initialize BillSimilaritySearcher
-bill_similarity_searcher = BillSimilaritySearcher("./bill_data/introduction_document_vectors.json")
-bill_similarity_searcher.load_data()
+# Heavy components (bill vectors, Chroma collections, query engines) are built
+# in the background by initialize_components() once the lifespan hook runs, so
+# workers accept connections immediately. Until a component is ready the
+# endpoints that need it answer 503, and /ready reports overall readiness.
+startup_state: Dict[str, str] = {
+    "bill_similarity": "pending",
+    "collections": "pending",
+    "query_engines": "pending",
+}
+components_ready = asyncio.Event()
+
+bill_similarity_searcher: Optional[BillSimilaritySearcher] = None
+
+# Precomputed neighbour table so /get_similar_bills is a lookup, not a similarity scan.
+# Built offline by `python -m bill_data.similar_bill_index`; built at startup only if missing.
+similar_bill_index = SimilarBillIndex("./bill_data/similar_bills_index.npz")
 
 model = genai.GenerativeModel('gemini-2.5-pro')
 
-# Create collection managers dynamically from config
+# Collection managers are created from config during startup; session
+# collections opened by chat-with-PDF are evicted when idle or over the bound
 collection_names = config["collections"]
-collection_managers: Dict[str, DynamicChromeManager] = {}
-
-for collection_name in collection_names:
-    collection_managers[collection_name] = DynamicChromeManager(collection_name)
+collection_managers = CollectionRegistry(
+    pinned=collection_names,
+    max_open=getattr(settings, "chroma_max_open_session_collections", 32),
+    idle_seconds=getattr(settings, "chroma_session_idle_seconds", 1800)
+)
 
-# Initialize query processor with collection managers and config
-query_processor = QueryProcessor(collection_managers, config)
+query_processor: Optional[QueryProcessor] = None
+nlp_backend: Optional[NLPBackend] = None
+USE_NLP_BACKEND = False
+langgraph_agent: Optional[LangGraphRAGAgent] = None
+USE_LANGGRAPH = False
+
+def ensure_component_ready(*components: str):
+    """Raise 503 if any of the named startup components is not ready yet"""
+    for component in components:
+        state = startup_state.get(component)
+        if state != "ready":
+            raise HTTPException(
+                status_code=503,
+                detail=f"Service is starting: {component} is {state}",
+                headers={"Retry-After": "5"}
+            )
 
-# Initialize NLP Backend
-try:
-    nlp_backend = NLPBackend(collection_managers, config)
-    print("✅ NLP Backend initialized successfully")
-    USE_NLP_BACKEND = True
-except Exception as e:
-    print(f"⚠️  NLP Backend initialization failed: {e}")
-    print("🔄 Falling back to traditional QueryProcessor")
-    nlp_backend = None
-    USE_NLP_BACKEND = False
+def ensure_langgraph_agent_ready():
+    """503 while query engines load, and when the LangGraph agent failed to initialize"""
+    ensure_component_ready("query_engines")
+    if langgraph_agent is None:
+        raise HTTPException(status_code=503, detail="Document chat is unavailable: the LangGraph agent failed to initialize")
+
+def load_bill_similarity():
+    """Load bill vectors, preferring the incremental vector store over the legacy JSON file"""
+    global bill_similarity_searcher, similar_bill_index
+    bill_vectors_path = "./bill_data/vectors"
+    if not os.path.isdir(bill_vectors_path):
+        bill_vectors_path = "./bill_data/introduction_document_vectors.json"
+    
+    # The neighbour table alone serves the endpoints; the raw vectors are only
+    # needed to build it when it is missing
+    if similar_bill_index.load():
+        return
+    searcher = BillSimilaritySearcher(bill_vectors_path)
+    searcher.load_data()
+    bill_similarity_searcher = searcher
+    if searcher.data is not None:
+        try:
+            similar_bill_index = build_from_searcher(searcher, similar_bill_index.index_file)
+        except Exception as e:
+            print(f"⚠️  Could not build similar-bill index: {e}")
+
+def build_query_engines():
+    """Build the query processor, NLP backend and LangGraph agent in parallel threads"""
+    global query_processor, nlp_backend, USE_NLP_BACKEND, langgraph_agent, USE_LANGGRAPH
+    from concurrent.futures import ThreadPoolExecutor
+    
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        query_processor_future = executor.submit(QueryProcessor, collection_managers, config)
+        # Conversations are shared through Redis when configured and available
+        conversation_store = create_conversation_store(
+            config,
+            redis_client=redis_client if USE_REDIS else None,
+            to_dict=GlobalState.to_dict,
+            from_dict=GlobalState.from_dict
+        )
+        nlp_backend_future = executor.submit(NLPBackend, collection_managers, config, conversation_store)
+        langgraph_future = executor.submit(LangGraphRAGAgent, collection_managers, config)
+    
+    query_processor = query_processor_future.result()
+    
+    # Initialize NLP Backend
+    try:
+        nlp_backend = nlp_backend_future.result()
+        print("✅ NLP Backend initialized successfully")
+        USE_NLP_BACKEND = True
+    except Exception as e:
+        print(f"⚠️  NLP Backend initialization failed: {e}")
+        print("🔄 Falling back to traditional QueryProcessor")
+        nlp_backend = None
+        USE_NLP_BACKEND = False
+    
+    # Initialize LangGraph RAG Agent
+    try:
+        langgraph_agent = langgraph_future.result()
+        print("✅ LangGraph RAG Agent initialized successfully")
+        USE_LANGGRAPH = True
+    except Exception as e:
+        print(f"⚠️  LangGraph Agent initialization failed: {e}")
+        print("🔄 Falling back to traditional QueryProcessor")
+        langgraph_agent = None
+        USE_LANGGRAPH = False
+
+async def run_startup_step(component: str, func, *args):
+    """Run a blocking startup step in a worker thread and record its outcome"""
+    startup_state[component] = "loading"
+    started = datetime.now()
+    try:
+        await asyncio.to_thread(func, *args)
+        startup_state[component] = "ready"
+        print(f"✅ {component} ready in {(datetime.now() - started).total_seconds():.1f}s")
+    except Exception as e:
+        startup_state[component] = f"failed: {e}"
+        print(f"❌ {component} failed to initialize: {e}")
 
-# Initialize LangGraph RAG Agent
-try:
-    langgraph_agent = LangGraphRAGAgent(collection_managers, config)
-    print("✅ LangGraph RAG Agent initialized successfully")
-    USE_LANGGRAPH = True
-except Exception as e:
-    print(f"⚠️  LangGraph Agent initialization failed: {e}")
-    print("🔄 Falling back to traditional QueryProcessor")
-    langgraph_agent = None
-    USE_LANGGRAPH = False
+async def initialize_components():
+    """Build the heavy application components concurrently"""
+    async def load_collections_and_engines():
+        async def add_manager(collection_name: str):
+            collection_managers[collection_name] = await asyncio.to_thread(DynamicChromeManager, collection_name)
+        
+        startup_state["collections"] = "loading"
+        try:
+            await asyncio.gather(*(add_manager(name) for name in collection_names))
+            startup_state["collections"] = "ready"
+        except Exception as e:
+            startup_state["collections"] = f"failed: {e}"
+            startup_state["query_engines"] = "failed: collections unavailable"
+            print(f"❌ collections failed to initialize: {e}")
+            return
+        await run_startup_step("query_engines", build_query_engines)
+    
+    await asyncio.gather(
+        run_startup_step("bill_similarity", load_bill_similarity),
+        load_collections_and_engines(),
+    )
+    components_ready.set()
+    print(f"🎉 Startup components initialized: {startup_state}")
 
 def send_error_to_slack(error_message):
     slack_webhook = os.getenv("SLACK_WEBHOOK")
@@ -208,6 +350,7 @@ def send_success_msg_to_slack(success_message):
 # Helper functions for collection management
 def get_collection_manager(collection_name: str) -> DynamicChromeManager:
     """Get collection manager by name"""
+    ensure_component_ready("collections")
     if collection_name not in collection_managers:
         raise HTTPException(status_code=404, detail=f"Collection '{collection_name}' not found")
     
@@ -274,22 +417,12 @@ def ingest_from_source_file(collection_name: str, source_file: str, ingestion_co
         documents = data
         manager = get_collection_manager(collection_name)
         
-        # Ingest documents
-        ingested_count = 0
-        errors = []
-        
         print(f"📥 Ingesting {len(documents)} documents from '{source_file}' into '{collection_name}'...")
         print(f"🎯 Embedding fields: {ingestion_config.get('contents_to_embed', [])}")
         
-        for i, doc in enumerate(tqdm(documents, desc=f"Processing {source_file}")):
-            try:
-                if manager.add_document(doc, ingestion_config):
-                    ingested_count += 1
-                else:
-                    errors.append(f"Document {i}: Failed to add to collection")
-            except Exception as e:
-                errors.append(f"Document {i}: {str(e)}")
-                continue
+        # Batched adds: one embedding request and one collection write per batch
+        ingested_count, errors = manager.add_documents_batch(documents, ingestion_config)
+        answer_cache.invalidate_collection(collection_name)
         
         return {
             "success": True,
@@ -495,6 +628,20 @@ async def root():
         ] if USE_LANGGRAPH else None
     }
 
+@app.get("/health")
+async def liveness_check():
+    """Liveness probe: the process is up and serving requests"""
+    return {"status": "ok"}
+
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe: 200 once startup components are loaded, 503 before"""
+    ready = components_ready.is_set() and startup_state["collections"] == "ready"
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "starting", "components": startup_state}
+    )
+
 @app.post("/health")
 async def health_check():
     slack_webhook = os.getenv("SLACK_WEBHOOK")
@@ -571,6 +718,8 @@ async def get_collections_statistics():
     Returns:
         CollectionsStatsResponse: Statistics for all collections including document counts
     """
+    ensure_component_ready("collections")
+    
     # Gather stats for all collections
     collections_stats = []
     total_documents = 0
@@ -591,6 +740,7 @@ async def get_collections_statistics():
 @app.post("/search")
 async def search_documents(request: SearchRequest):
     """Search documents across specified collections"""
+    ensure_component_ready("collections")
     num_results = get_search_params(request.num_results)
     search_collections = request.collections or collection_names
     
@@ -629,9 +779,34 @@ async def search_documents(request: SearchRequest):
 @app.post("/query")
 async def query_documents(request: QueryRequest):
     """Advanced query processing with agentic LangGraph workflow or multi-step reasoning fallback"""
+    ensure_component_ready("collections", "query_engines")
     try:
         # Use conversation ID from request or generate one
-        conversation_id = request.conversation_id or f"api_session_{hash(request.query) % 10000}"
+        # New conversations get a unique id; clients send it back to continue them
+        conversation_id = request.conversation_id or f"api_session_{uuid.uuid4().hex}"
+        
+        # Only questions that start a conversation are answered from the cache;
+        # follow-ups depend on the conversation history
+        if USE_NLP_BACKEND and nlp_backend is not None:
+            cache_namespace, cache_params = "query:nlp-backend", None
+        elif USE_LANGGRAPH and langgraph_agent is not None:
+            cache_namespace, cache_params = "query:langgraph", {"threshold": request.threshold}
+        else:
+            cache_namespace, cache_params = "query:multi-step", {"threshold": request.threshold}
+        use_cache = request.conversation_id is None
+        if use_cache:
+            cached = await asyncio.to_thread(
+                answer_cache.lookup, request.query, cache_namespace, collection_names, cache_params
+            )
+            if cached is not None:
+                print(f"⚡ Answer cache hit for query: '{request.query}'")
+                cached["query"] = request.query
+                if "conversation_id" in cached:
+                    cached["conversation_id"] = conversation_id
+                if cache_namespace == "query:nlp-backend":
+                    # Record the cached turn so follow-ups on the new conversation have its context
+                    await asyncio.to_thread(nlp_backend.record_cached_turn, conversation_id, request.query, cached)
+                return cached
         
         if USE_NLP_BACKEND and nlp_backend is not None:
             # Use Advanced NLP Backend (6-step pipeline)
@@ -666,6 +841,12 @@ async def query_documents(request: QueryRequest):
             result["processing_method"] = "multi-step-reasoning"
             result["threshold_used"] = request.threshold
         
+        failed = result.get("error") or (isinstance(result.get("reasoning"), dict) and result["reasoning"].get("error"))
+        if use_cache and not failed:
+            await asyncio.to_thread(
+                answer_cache.store, request.query, cache_namespace, collection_names, result, cache_params
+            )
+        result["cache"] = {"hit": False}
         return result
                             
     except Exception as e:
@@ -676,6 +857,7 @@ async def query_documents(request: QueryRequest):
 @app.get("/conversation/{conversation_id}")
 async def get_conversation_state(conversation_id: str):
     """Get the current state of a conversation (NLP Backend only)"""
+    ensure_component_ready("query_engines")
     if not USE_NLP_BACKEND or nlp_backend is None:
         raise HTTPException(status_code=404, detail="NLP Backend not available")
     
@@ -688,6 +870,7 @@ async def get_conversation_state(conversation_id: str):
 @app.delete("/conversation/{conversation_id}")
 async def reset_conversation(conversation_id: str):
     """Reset a conversation state (NLP Backend only)"""
+    ensure_component_ready("query_engines")
     if not USE_NLP_BACKEND or nlp_backend is None:
         raise HTTPException(status_code=404, detail="NLP Backend not available")
     
@@ -777,6 +960,11 @@ async def step2_chunking(payload: ChunkingRequest):
             print(f"❌ {error_msg}")
             errors.append(error_msg)
     
+    # Chunk files may have been rewritten in place, which the directory mtime does not reflect
+    if langgraph_agent is not None:
+        langgraph_agent.primary_documents.invalidate(payload.collection_name)
+    answer_cache.invalidate_collection(payload.collection_name)
+    
     if not processed_files:
         raise HTTPException(status_code=500, detail=f"Failed to chunk any files in collection '{payload.collection_name}'. Errors: {'; '.join(errors)}")
     
@@ -801,15 +989,15 @@ async def chat_with_pdf(payload: ChatWithPDFRequest):
     Args:
         payload: ChatWithPDFRequest containing query, session_collection, context_collections, and threshold
     """
+    ensure_langgraph_agent_ready()
     try:
         # Combine session collection with context collections
         all_collections = [payload.session_collection] + payload.context_collections
         
-        # Filter out any collections that don't exist
+        # Filter out any collections that don't exist (cached, so follow-ups cost one stat each)
         valid_collections = []
         for collection_name in all_collections:
-            collection_path = os.path.join("documents", "chunked_text", collection_name)
-            if os.path.exists(collection_path) and os.listdir(collection_path):
+            if langgraph_agent.primary_documents.has_chunks(collection_name):
                 valid_collections.append(collection_name)
             else:
                 logging.warning(f"Collection '{collection_name}' not found or empty, skipping")
@@ -822,6 +1010,15 @@ async def chat_with_pdf(payload: ChatWithPDFRequest):
         
         logging.info(f"Processing chat query with collections: {valid_collections}")
         
+        cache_params = {"primary": payload.session_collection, "threshold": payload.threshold}
+        cached = await asyncio.to_thread(
+            answer_cache.lookup, payload.query, "chat-with-pdf", valid_collections, cache_params
+        )
+        if cached is not None:
+            print(f"⚡ Answer cache hit for chat-with-pdf query: '{payload.query}'")
+            cached["query"] = payload.query
+            return cached
+        
         # Use the specialized single PDF method with primary collection and context collections
         response = langgraph_agent.process_query_with_single_pdf(
             query=payload.query,
@@ -830,7 +1027,7 @@ async def chat_with_pdf(payload: ChatWithPDFRequest):
             threshold=payload.threshold
         )
         
-        return {
+        result = {
             "response": response.get("response", "No response generated"),
             "rest_of_response": response,
             "sources": response.get("sources", []),
@@ -839,12 +1036,19 @@ async def chat_with_pdf(payload: ChatWithPDFRequest):
             "valid_collections_used": valid_collections,
             "query": payload.query
         }
+        await asyncio.to_thread(
+            answer_cache.store, payload.query, "chat-with-pdf", valid_collections, result, cache_params
+        )
+        result["cache"] = {"hit": False}
+        return result
         
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"Error in chat-with-pdf: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error processing chat query: {str(e)}")
 
-def generate_stream(request: ChatWithPDFRequest) -> Generator[str, None, None]:
+async def generate_stream(request: ChatWithPDFRequest) -> AsyncGenerator[str, None]:
     try:
         print(f"📡 Starting stream generation...")
         
@@ -856,15 +1060,16 @@ def generate_stream(request: ChatWithPDFRequest) -> Generator[str, None, None]:
             collection_path = os.path.join("documents", "storage_documents", collection_name)
             return os.path.exists(collection_path) and os.path.isdir(collection_path)
         
+        # Close session collections left idle by earlier chats
+        collection_managers.sweep()
+        
         # Check session collection
         if request.session_collection:
             if collection_exists_on_disk(request.session_collection):
                 valid_collections.append(request.session_collection)
                 print(f"✅ Valid session collection: {request.session_collection}")
                 # Load into memory if not already loaded
-                if request.session_collection not in collection_managers:
-                    collection_managers[request.session_collection] = DynamicChromeManager(request.session_collection)
-                    print(f"📥 Loaded session collection into memory: {request.session_collection}")
+                await asyncio.to_thread(collection_managers.open, request.session_collection)
             else:
                 print(f"❌ Invalid session collection (not found on disk): {request.session_collection}")
         
@@ -875,9 +1080,7 @@ def generate_stream(request: ChatWithPDFRequest) -> Generator[str, None, None]:
                     valid_collections.append(collection)
                     print(f"✅ Valid context collection: {collection}")
                     # Load into memory if not already loaded
-                    if collection not in collection_managers:
-                        collection_managers[collection] = DynamicChromeManager(collection)
-                        print(f"📥 Loaded context collection into memory: {collection}")
+                    await asyncio.to_thread(collection_managers.open, collection)
                 else:
                     print(f"❌ Invalid context collection (not found on disk): {collection}")
         
@@ -887,6 +1090,16 @@ def generate_stream(request: ChatWithPDFRequest) -> Generator[str, None, None]:
             yield error_msg
             return
         
+        # Repeated questions are answered from the cache as a single completed event
+        cache_params = {"primary": request.session_collection, "threshold": request.threshold}
+        cached = await asyncio.to_thread(
+            answer_cache.lookup, request.query, "chat-with-pdf-stream", valid_collections, cache_params
+        )
+        if cached is not None:
+            print(f"⚡ Answer cache hit for streaming chat-with-pdf query: '{request.query}'")
+            yield f"data: {json.dumps({'type': 'completed', 'response': cached, 'processing_time': 0, 'cache': cached['cache'], 'timestamp': datetime.now().isoformat()})}\n\n"
+            return
+        
         # Send initial status
         initial_status = f"data: {json.dumps({'type': 'status', 'message': 'Starting analysis...', 'timestamp': datetime.now().isoformat()})}\n\n"
         print(f"📤 Sending initial status: {initial_status.strip()}")
@@ -899,12 +1112,18 @@ def generate_stream(request: ChatWithPDFRequest) -> Generator[str, None, None]:
         
         # Create a streaming version of the LangGraph agent
         print(f"🔄 Starting streaming agent with collections: {valid_collections}")
-        for update in langgraph_agent.process_query_with_single_pdf_stream(
+        async for update in langgraph_agent.process_query_with_single_pdf_stream(
             query=request.query,
             primary_collection=request.session_collection,
             context_collections=request.context_collections,
             threshold=request.threshold
         ):
+            if update.get("type") == "completed":
+                await asyncio.to_thread(
+                    answer_cache.store, request.query, "chat-with-pdf-stream", valid_collections,
+                    update["response"], cache_params
+                )
+                update["cache"] = {"hit": False}
             stream_data = f"data: {json.dumps(update)}\n\n"
             print(f"📤 Streaming update: {update.get('type', 'unknown')} - {update.get('message', '')[:100]}...")
             yield stream_data
@@ -916,6 +1135,7 @@ def generate_stream(request: ChatWithPDFRequest) -> Generator[str, None, None]:
 @app.post("/chat-with-pdf-stream")
 async def chat_with_pdf_stream(request: ChatWithPDFRequest):
     """Streaming version of chat-with-pdf that provides real-time updates"""
+    ensure_langgraph_agent_ready()
     
     print(f"🚀 STREAMING ENDPOINT CALLED: query='{request.query[:50]}...', session_collection='{request.session_collection}'")
     
@@ -1151,6 +1371,7 @@ async def reset_collections(collections: Optional[List[str]] = None):
             if collection_name in collection_managers:
                 manager = collection_managers[collection_name]
                 manager.reset_collection()
+                answer_cache.invalidate_collection(collection_name)
                 reset_results[collection_name] = "success"
                 print(f"✅ Reset collection: {collection_name}")
             else:
@@ -1245,10 +1466,14 @@ async def debug_managers():
 try:
     import redis
     import os
+    import redis.asyncio as aioredis
     
     # Use Redis URL from environment or fallback to localhost
     redis_url = os.environ.get('REDIS_URL', 'redis://localhost:6379')
-    redis_client = redis.from_url(redis_url, decode_responses=True)
+    # Bounded connect timeout so a missing Redis cannot stall worker startup
+    redis_client = redis.from_url(redis_url, decode_responses=True, socket_connect_timeout=2)
+    # asyncio-native client for pub/sub and publishing from the event loop
+    async_redis_client = aioredis.from_url(redis_url, decode_responses=True)
     
     # Test connection
     redis_client.ping()
@@ -1262,6 +1487,17 @@ except Exception as e:
 fiscal_notes_dir = Path(__file__).parent /"fiscal_notes" / "generation"
 fiscal_notes_dir_september = Path(__file__).parent /"fiscal_notes" /"generation" / "september_archive"
 
+# Cached bill listings so status polling doesn't walk the archive on every request
+fiscal_note_status_index = BillStatusIndex(fiscal_notes_dir, exclude={"september_archive"})
+fiscal_note_status_index_september = BillStatusIndex(fiscal_notes_dir_september)
+
+# Answers to repeated questions; generations are shared through Redis when available
+answer_cache = SemanticAnswerCache.from_config(
+    config,
+    embed=lambda texts: get_embedding_function()(texts),
+    redis_client=redis_client if USE_REDIS else None
+)
+
 # Job management functions that work with both Redis and in-memory
 def set_job_status(job_id: str, status: bool):
     """Set job status - works with Redis or in-memory"""
@@ -1280,6 +1516,16 @@ def get_job_status(job_id: str) -> bool:
     else:
         return job_id in jobs
 
+def get_job_statuses(job_ids: List[str]) -> Dict[str, bool]:
+    """Get status for many jobs in one round trip - works with Redis or in-memory"""
+    if USE_REDIS:
+        pipe = redis_client.pipeline(transaction=False)
+        for job_id in job_ids:
+            pipe.exists(f"job:{job_id}")
+        return {job_id: bool(exists) for job_id, exists in zip(job_ids, pipe.execute())}
+    else:
+        return {job_id: job_id in jobs for job_id in job_ids}
+
 def cleanup_job(job_id: str):
     """Clean up job status"""
     if USE_REDIS:
@@ -1332,75 +1578,301 @@ def cleanup_selenium_temp_files():
         # Don't raise - this is non-critical
 
 # WebSocket connection manager
+WS_CHANNEL = 'fiscal_note_updates'
+WS_SEND_TIMEOUT_SECONDS = 5.0  # Per-connection send timeout before a client is dropped
+WS_SEND_QUEUE_SIZE = 100  # Pending messages per connection before a client is dropped
+WS_COALESCE_SECONDS = 0.5  # Progress updates for the same job within this window are merged
+# Latest event per job, replayed on subscribe. Each job has its own Redis key
+# (ws:job_state:job:<job_id>) with its own TTL, and each bill a set of its job ids.
+WS_JOB_STATE_PREFIX = 'ws:job_state:'
+WS_JOB_STATE_TTL_SECONDS = 24 * 3600
+WS_TERMINAL_STATE_TTL_SECONDS = 300  # Finished jobs stay replayable just long enough for reconnects
+WS_MAX_LOCAL_JOB_STATES = 1000  # Bound on the in-process replay cache (least recently updated evicted)
+WS_TERMINAL_EVENT_TYPES = ('job_completed', 'job_error')
+WS_ALL_TOPICS = '*'  # Subscribes to every job, e.g. for admin dashboards
+_JOB_ID_RE = re.compile(r"^([A-Za-z]+)_([A-Za-z0-9]+)(?:_|$)")
+
+def job_topic(job_id: str) -> str:
+    return f"job:{job_id}"
+
+def bill_topic(job_id: str) -> Optional[str]:
+    """Topic shared by every job for a bill, e.g. HB_727_2025 -> bill:HB_727 (None if not a bill job id)"""
+    match = _JOB_ID_RE.match(job_id)
+    if match is None:
+        return None
+    return f"bill:{match.group(1).upper()}_{match.group(2)}"
+
+def job_topics(job_id: str) -> List[str]:
+    topic = bill_topic(job_id)
+    return [job_topic(job_id)] + ([topic] if topic else [])
+
 class ConnectionManager:
     def __init__(self):
-        self.active_connections: List[WebSocket] = []
-        self._redis_listener_started = False
-        if USE_REDIS:
-            # Subscribe to Redis for cross-worker broadcasts
-            self.pubsub = redis_client.pubsub()
-            self.pubsub.subscribe('fiscal_note_updates')
-            # Redis listener will be started when first connection is made
+        # Each connection gets a bounded outbox drained by its own sender task,
+        # so one slow client never holds up delivery to the others
+        self.active_connections: Dict[WebSocket, asyncio.Queue] = {}
+        self._sender_tasks: Dict[WebSocket, asyncio.Task] = {}
+        self._redis_listener_task: Optional[asyncio.Task] = None
+        # Lets the listener skip messages this worker published itself
+        self.worker_id = uuid.uuid4().hex
+        # topic -> subscribed sockets, and the reverse for cleanup on disconnect
+        self.subscribers: Dict[str, set] = {}
+        self.client_topics: Dict[WebSocket, set] = {}
+        # job_id -> (expiry time, latest serialized event), replayed to new subscribers
+        self.latest_job_state: "OrderedDict[str, tuple]" = OrderedDict()
+        # Progress events waiting for the coalescing window to close
+        self._pending_progress: Dict[str, Dict[str, Any]] = {}
+        self._flush_tasks: Dict[str, asyncio.Task] = {}
+
+    async def start(self):
+        """Start the cross-worker Redis listener (called from the lifespan hook)"""
+        if USE_REDIS and self._redis_listener_task is None:
+            self._redis_listener_task = asyncio.create_task(self._redis_listener())
+
+    async def stop(self):
+        """Flush pending progress, then stop the Redis listener and all sender tasks"""
+        for job_id in list(self._pending_progress):
+            await self._flush_progress(job_id, delay=0)
+        tasks = list(self._sender_tasks.values()) + list(self._flush_tasks.values())
+        self._flush_tasks.clear()
+        if self._redis_listener_task is not None:
+            tasks.append(self._redis_listener_task)
+            self._redis_listener_task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.active_connections.clear()
+        self._sender_tasks.clear()
+        self.subscribers.clear()
+        self.client_topics.clear()
 
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
-        self.active_connections.append(websocket)
-        
-        # Start Redis listener if not already started
-        if USE_REDIS and not self._redis_listener_started:
-            self._redis_listener_started = True
-            asyncio.create_task(self._redis_listener())
+        queue: asyncio.Queue = asyncio.Queue(maxsize=WS_SEND_QUEUE_SIZE)
+        self.active_connections[websocket] = queue
+        self.client_topics[websocket] = set()
+        self._sender_tasks[websocket] = asyncio.create_task(self._sender(websocket, queue))
 
     def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
+        self.active_connections.pop(websocket, None)
+        for topic in self.client_topics.pop(websocket, set()):
+            sockets = self.subscribers.get(topic)
+            if sockets is not None:
+                sockets.discard(websocket)
+                if not sockets:
+                    del self.subscribers[topic]
+        task = self._sender_tasks.pop(websocket, None)
+        if task is not None and task is not asyncio.current_task():
+            task.cancel()
+
+    async def subscribe(self, websocket: WebSocket, topics: List[str]) -> List[str]:
+        """Subscribe a socket to topics and replay the latest state of matching jobs"""
+        client_topics = self.client_topics.get(websocket)
+        if client_topics is None:
+            return []
+        new_topics = [topic for topic in topics if topic not in client_topics]
+        for topic in new_topics:
+            client_topics.add(topic)
+            self.subscribers.setdefault(topic, set()).add(websocket)
+
+        if new_topics:
+            for message in await self._latest_states_for(new_topics):
+                await self.send_personal_message(message, websocket)
+        return new_topics
+
+    def unsubscribe(self, websocket: WebSocket, topics: List[str]):
+        client_topics = self.client_topics.get(websocket, set())
+        for topic in topics:
+            client_topics.discard(topic)
+            sockets = self.subscribers.get(topic)
+            if sockets is not None:
+                sockets.discard(websocket)
+                if not sockets:
+                    del self.subscribers[topic]
+
+    def _remember_job_state(self, job_id: str, message: str, terminal: bool):
+        ttl = WS_TERMINAL_STATE_TTL_SECONDS if terminal else WS_JOB_STATE_TTL_SECONDS
+        self.latest_job_state[job_id] = (time.monotonic() + ttl, message)
+        self.latest_job_state.move_to_end(job_id)
+        while len(self.latest_job_state) > WS_MAX_LOCAL_JOB_STATES:
+            self.latest_job_state.popitem(last=False)
+
+    def _local_job_states(self) -> Dict[str, str]:
+        now = time.monotonic()
+        for job_id in [job_id for job_id, (expires, _) in self.latest_job_state.items() if expires <= now]:
+            del self.latest_job_state[job_id]
+        return {job_id: message for job_id, (_, message) in self.latest_job_state.items()}
+
+    async def _redis_job_states(self, topics: List[str]) -> Dict[str, str]:
+        """Replay state stored in Redis for jobs matching the topics"""
+        if WS_ALL_TOPICS in topics:
+            keys = [key async for key in async_redis_client.scan_iter(match=f"{WS_JOB_STATE_PREFIX}job:*", count=500)]
+            job_ids = [key[len(WS_JOB_STATE_PREFIX) + len("job:"):] for key in keys]
+        else:
+            job_ids = [topic[len("job:"):] for topic in topics if topic.startswith("job:")]
+            for topic in topics:
+                if topic.startswith("bill:"):
+                    job_ids += await async_redis_client.smembers(WS_JOB_STATE_PREFIX + topic)
+            job_ids = list(dict.fromkeys(job_ids))
+        if not job_ids:
+            return {}
+        messages = await async_redis_client.mget([WS_JOB_STATE_PREFIX + job_topic(job_id) for job_id in job_ids])
+        return {job_id: message for job_id, message in zip(job_ids, messages) if message is not None}
+
+    async def _latest_states_for(self, topics: List[str]) -> List[str]:
+        """Latest event of every job matching the topics, from Redis when available"""
+        states = self._local_job_states()
+        if USE_REDIS:
+            try:
+                states.update(await self._redis_job_states(topics))
+            except Exception as e:
+                print(f"Error reading job states from Redis: {e}")
 
-    async def send_personal_message(self, message: str, websocket: WebSocket):
+        wanted = set(topics)
+        return [
+            message for job_id, message in states.items()
+            if WS_ALL_TOPICS in wanted or wanted.intersection(job_topics(job_id))
+        ]
+
+    async def _drop(self, websocket: WebSocket, reason: str):
+        """Disconnect a client that cannot keep up and close its socket"""
+        print(f"⚠️  Dropping WebSocket client {websocket.client}: {reason}")
+        self.disconnect(websocket)
+        try:
+            await asyncio.wait_for(websocket.close(code=1013), timeout=WS_SEND_TIMEOUT_SECONDS)
+        except Exception:
+            pass
+
+    async def _sender(self, websocket: WebSocket, queue: asyncio.Queue):
+        """Drain one connection's outbox with a per-send timeout"""
         try:
-            await websocket.send_text(message)
+            while True:
+                message = await queue.get()
+                await asyncio.wait_for(websocket.send_text(message), timeout=WS_SEND_TIMEOUT_SECONDS)
+        except asyncio.CancelledError:
+            raise
+        except asyncio.TimeoutError:
+            await self._drop(websocket, "send timed out")
         except Exception as e:
-            print(f"Error sending personal message: {e}")
+            print(f"Error sending to connection: {e}")
             self.disconnect(websocket)
 
-    async def broadcast(self, message: str):
-        # Broadcast to local connections
-        await self._local_broadcast(message)
-        
-        # If using Redis, also publish to other workers
+    async def send_personal_message(self, message: str, websocket: WebSocket):
+        queue = self.active_connections.get(websocket)
+        if queue is None:
+            return
+        try:
+            queue.put_nowait(message)
+        except asyncio.QueueFull:
+            await self._drop(websocket, "send queue full")
+
+    async def publish_job_event(self, event: Dict[str, Any]):
+        """
+        Route a job event to subscribers of its job and bill on every worker.
+        Progress events are coalesced per job; terminal events go out immediately
+        and supersede any progress still waiting.
+        """
+        job_id = event["job_id"]
+        if event.get("type") == "job_progress":
+            self._pending_progress[job_id] = event
+            if job_id not in self._flush_tasks:
+                self._flush_tasks[job_id] = asyncio.create_task(self._flush_progress(job_id))
+            return
+
+        self._pending_progress.pop(job_id, None)
+        task = self._flush_tasks.pop(job_id, None)
+        if task is not None:
+            task.cancel()
+        await self._publish(job_id, event)
+
+    async def _flush_progress(self, job_id: str, delay: float = WS_COALESCE_SECONDS):
+        if delay:
+            await asyncio.sleep(delay)
+        if asyncio.current_task() is self._flush_tasks.get(job_id):
+            self._flush_tasks.pop(job_id, None)
+        event = self._pending_progress.pop(job_id, None)
+        if event is not None:
+            await self._publish(job_id, event)
+
+    async def _publish(self, job_id: str, event: Dict[str, Any]):
+        # Serialize once per event, not once per recipient
+        message = json.dumps(event)
+        topics = job_topics(job_id)
+        terminal = event.get("type") in WS_TERMINAL_EVENT_TYPES
+        self._remember_job_state(job_id, message, terminal)
+        self._route_local(topics, message)
+        
+        # If using Redis, record the state for replay and publish to other workers
         if USE_REDIS:
             try:
-                redis_client.publish('fiscal_note_updates', message)
+                ttl = WS_TERMINAL_STATE_TTL_SECONDS if terminal else WS_JOB_STATE_TTL_SECONDS
+                async with async_redis_client.pipeline(transaction=False) as pipe:
+                    pipe.set(WS_JOB_STATE_PREFIX + job_topic(job_id), message, ex=ttl)
+                    for topic in topics[1:]:
+                        # Bill index of running jobs; ids whose state expired just miss in MGET
+                        if terminal:
+                            pipe.srem(WS_JOB_STATE_PREFIX + topic, job_id)
+                        else:
+                            pipe.sadd(WS_JOB_STATE_PREFIX + topic, job_id)
+                            pipe.expire(WS_JOB_STATE_PREFIX + topic, WS_JOB_STATE_TTL_SECONDS)
+                    await pipe.execute()
+                envelope = json.dumps({"origin": self.worker_id, "job_id": job_id, "topics": topics,
+                                       "terminal": terminal, "message": message})
+                await async_redis_client.publish(WS_CHANNEL, envelope)
             except Exception as e:
                 print(f"Error publishing to Redis: {e}")
 
-    async def _local_broadcast(self, message: str):
-        """Broadcast to connections on this worker only"""
-        disconnected = []
-        for connection in self.active_connections:
+    def _route_local(self, topics: List[str], message: str):
+        """Deliver to sockets on this worker subscribed to any of the topics"""
+        recipients = set(self.subscribers.get(WS_ALL_TOPICS, ()))
+        for topic in topics:
+            recipients.update(self.subscribers.get(topic, ()))
+
+        slow_clients = []
+        for connection in recipients:
+            queue = self.active_connections.get(connection)
+            if queue is None:
+                continue
             try:
-                await connection.send_text(message)
-            except Exception as e:
-                print(f"Error broadcasting to connection: {e}")
-                disconnected.append(connection)
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                slow_clients.append(connection)
         
-        # Remove disconnected connections
-        for connection in disconnected:
-            self.disconnect(connection)
+        # Drop clients whose outbox is full instead of buffering without bound
+        for connection in slow_clients:
+            asyncio.create_task(self._drop(connection, "send queue full"))
 
     async def _redis_listener(self):
         """Listen for Redis messages from other workers"""
         if not USE_REDIS:
             return
-            
-        try:
-            while True:
-                message = self.pubsub.get_message(timeout=1.0)
-                if message and message['type'] == 'message':
-                    # Broadcast Redis message to local connections
-                    await self._local_broadcast(message['data'])
-                await asyncio.sleep(0.1)
-        except Exception as e:
-            print(f"Redis listener error: {e}")
+        
+        while True:
+            pubsub = async_redis_client.pubsub()
+            try:
+                await pubsub.subscribe(WS_CHANNEL)
+                async for message in pubsub.listen():
+                    if message['type'] != 'message':
+                        continue
+                    try:
+                        envelope = json.loads(message['data'])
+                    except (TypeError, ValueError):
+                        continue
+                    if envelope.get("origin") == self.worker_id:
+                        continue
+                    # Route the Redis message to local subscribers
+                    self._remember_job_state(envelope["job_id"], envelope["message"], envelope.get("terminal", False))
+                    self._route_local(envelope["topics"], envelope["message"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Redis listener error: {e}; reconnecting in 1s")
+                await asyncio.sleep(1.0)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
 
 manager = ConnectionManager()
 
@@ -1423,6 +1895,7 @@ async def delete_fiscal_note(request: Request, bill_type: Bill_type_options, bil
         print(f"Fiscal notes path: {fiscal_notes_path}")
         shutil.rmtree(fiscal_notes_path)
         cleanup_job(job_id)
+        fiscal_note_status_index.remove(os.path.basename(fiscal_notes_path))
         return {
             "message": "Fiscal note generation deleted"
         }
@@ -1431,45 +1904,27 @@ async def delete_fiscal_note(request: Request, bill_type: Bill_type_options, bil
             "message": "Fiscal note generation not found"
         }
 
+def bill_status_listing(index: BillStatusIndex):
+    """(body, etag) of the listing; may rescan the directory and queries Redis, so run it in a thread"""
+    names = index.bill_names()
+    generating = {name for name, active in get_job_statuses(names).items() if active}
+    return index.listing(generating)
+
+async def bill_status_listing_response(request: Request, index: BillStatusIndex) -> Response:
+    """Listing from the status index with an ETag; 304 if the client's copy is current"""
+    body, etag = await asyncio.to_thread(bill_status_listing, index)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
 @app.get("/get_fiscal_note_files_september")
-async def get_fiscal_note_files_september():
-    files = os.listdir(fiscal_notes_dir_september)
-    dirs = []
-    for file in files:
-        if os.path.isdir(os.path.join(fiscal_notes_dir_september, file)) and not file.startswith('.') and not file.startswith("__"):
-            print(f"Directory: {file}")
-            # Check if this directory name matches any active job_id
-            is_generating = get_job_status(file)
-            print(f"Is generating: {is_generating} for {file}")
-            if is_generating:
-                dirs.append({"name": file, "status": "generating"})
-            else:
-                if os.path.exists(os.path.join(fiscal_notes_dir_september, file, "fiscal_notes")) and len(os.listdir(os.path.join(fiscal_notes_dir_september, file, "fiscal_notes"))) > 0:
-                    dirs.append({"name": file, "status": "ready"})
-                else:
-                    dirs.append({"name": file, "status": "error"})
-    return dirs
+async def get_fiscal_note_files_september(request: Request):
+    return await bill_status_listing_response(request, fiscal_note_status_index_september)
 
 @app.get("/get_fiscal_note_files")
-async def get_fiscal_note_files():
-    files = os.listdir(fiscal_notes_dir)
-    dirs = []
-    for file in files:
-        if os.path.isdir(os.path.join(fiscal_notes_dir, file)) and not file.startswith('.') and not file.startswith("__"):
-            print(f"Directory: {file}")
-            if file == "september_archive":
-                continue
-            # Check if this directory name matches any active job_id
-            is_generating = get_job_status(file)
-            print(f"Is generating: {is_generating} for {file}")
-            if is_generating:
-                dirs.append({"name": file, "status": "generating"})
-            else:
-                if os.path.exists(os.path.join(fiscal_notes_dir, file, "fiscal_notes")) and len(os.listdir(os.path.join(fiscal_notes_dir, file, "fiscal_notes"))) > 0:
-                    dirs.append({"name": file, "status": "ready"})
-                else:
-                    dirs.append({"name": file, "status": "error"})
-    return dirs
+async def get_fiscal_note_files(request: Request):
+    return await bill_status_listing_response(request, fiscal_note_status_index)
 
 # Middleware to handle /api/ prefix stripping for non-auth routes only
 @app.middleware("http")
@@ -2593,56 +3048,56 @@ async def create_fiscal_note_job(bill_type: Bill_type_options, bill_number: str,
         measure_url = f"{base_url}?billtype={bill_type.value}&billnumber={bill_number}&year={year}"
         
         # Send progress update
-        await manager.broadcast(json.dumps({
+        await manager.publish_job_event({
             "type": "job_progress",
             "job_id": job_id,
             "status": "fetching_documents",
             "message": "Fetching documents from Hawaii Capitol website..."
-        }))
+        })
         print("Entering fetch_documents")
         
         saved_path = await asyncio.to_thread(fetch_documents, measure_url)
 
         print("Exiting fetch_documents")
 
-        await manager.broadcast(json.dumps({
+        await manager.publish_job_event({
             "type": "job_progress",
             "job_id": job_id,
             "status": "reordering_documents",
             "message": "Reordering documents chronologically..."
-        }))
+        })
         
         chronological_path = await asyncio.to_thread(reorder_documents, saved_path)
         documents_path = await asyncio.to_thread(retrieve_documents, chronological_path)
         
-        await manager.broadcast(json.dumps({
+        await manager.publish_job_event({
             "type": "job_progress",
             "job_id": job_id,
             "status": "extracting_numbers",
             "message": "Extracting financial numbers and context..."
-        }))
+        })
         
         base_dir = os.path.dirname(documents_path)
         numbers_file_path = os.path.join(base_dir, f"{bill_type.value}_{bill_number}_{year}_numbers.json")
         await asyncio.to_thread(extract_number_context, documents_path, numbers_file_path)
         
-        await manager.broadcast(json.dumps({
+        await manager.publish_job_event({
             "type": "job_progress",
             "job_id": job_id,
             "status": "generating_fiscal_notes",
             "message": "Generating fiscal note content..."
-        }))
+        })
         
         fiscal_notes_path = await asyncio.to_thread(generate_fiscal_notes, documents_path, numbers_file_path)
         
         # Step 6: Enhance numbers with RAG agent (optional, non-blocking)
         if ENABLE_STEP6_ENHANCE_NUMBERS:
-            await manager.broadcast(json.dumps({
+            await manager.publish_job_event({
                 "type": "job_progress",
                 "job_id": job_id,
                 "status": "enhancing_numbers",
                 "message": "Enhancing numbers with RAG agent..."
-            }))
+            })
             
             try:
                 enhanced_numbers_path = await asyncio.to_thread(enhance_numbers_for_bill, base_dir)
@@ -2657,12 +3112,12 @@ async def create_fiscal_note_job(bill_type: Bill_type_options, bill_number: str,
         
         # Step 7: Track chronological changes (optional, non-blocking)
         if ENABLE_STEP7_TRACK_CHRONOLOGICAL:
-            await manager.broadcast(json.dumps({
+            await manager.publish_job_event({
                 "type": "job_progress",
                 "job_id": job_id,
                 "status": "tracking_changes",
                 "message": "Tracking chronological number changes..."
-            }))
+            })
             
             try:
                 tracking_result = await asyncio.to_thread(track_chronological_changes, base_dir)
@@ -2678,12 +3133,12 @@ async def create_fiscal_note_job(bill_type: Bill_type_options, bill_number: str,
             print(f"⏭️  Step 7 (Track Chronological Changes) is disabled - skipping")
         
         # Send completion notification
-        await manager.broadcast(json.dumps({
+        await manager.publish_job_event({
             "type": "job_completed",
             "job_id": job_id,
             "status": "ready",
             "message": f"Fiscal note for {job_id} has been generated successfully!"
-        }))
+        })
         
         print(f"Fiscal note generation completed for {job_id}")
         send_success_msg_to_slack(f"Fiscal note for {job_id} has been generated successfully!")
@@ -2702,18 +3157,19 @@ async def create_fiscal_note_job(bill_type: Bill_type_options, bill_number: str,
         send_error_to_slack(error_msg)
 
         # Send error notification
-        await manager.broadcast(json.dumps({
+        await manager.publish_job_event({
             "type": "job_error",
             "job_id": job_id,
             "status": "error",
             "message": f"Failed to generate fiscal note for {job_id}: {str(e)}"
-        }))
+        })
         
         # Re-raise the exception to ensure it's properly logged
         raise
     finally:
         # Ensure cleanup happens regardless (defensive programming)
         cleanup_job(job_id)
+        fiscal_note_status_index.mark(job_id)
         print(f"🧹 Final cleanup for job: {job_id}")
 
 @app.post("/generate-fiscal-note")
@@ -2780,9 +3236,10 @@ async def bill_search_query(request: Request, bill_type: Bill_type_options, bill
     year = year
     bill_name = f"{bill_type.value}{bill_number}_"
 
-    tfidf_results, vector_results = bill_similarity_searcher.search_similar_bills(bill_name)
-    print(tfidf_results)
-    print(vector_results)
+    ensure_component_ready("bill_similarity")
+    # A refreshed table is reloaded with np.load; keep that off the event loop
+    await asyncio.to_thread(similar_bill_index.reload_if_changed)
+    tfidf_results, vector_results, _ = similar_bill_index.lookup(bill_name)
     return {
         "tfidf_results": tfidf_results,
         "vector_results": vector_results
@@ -2796,10 +3253,10 @@ async def get_bill_summary(request: Request, bill_type: Bill_type_options, bill_
     year = year
     bill_name = f"{bill_type.value}{bill_number}_"
 
-    tfidf_results, vector_results, search_bill = bill_similarity_searcher.search_similar_bills(bill_name)
-    print(tfidf_results)
-    print(vector_results)
-    print(search_bill)
+    ensure_component_ready("bill_similarity")
+    # A refreshed table is reloaded with np.load; keep that off the event loop
+    await asyncio.to_thread(similar_bill_index.reload_if_changed)
+    tfidf_results, vector_results, search_bill = similar_bill_index.lookup(bill_name)
     return {
         "tfidf_results": tfidf_results,
         "vector_results": vector_results,
@@ -3400,19 +3857,36 @@ async def get_hrs_index():
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
+    """
+    Job progress updates. Clients choose what they receive by sending
+    {"type": "subscribe", "job_ids": [...], "bills": ["HB_727"]} (or "topics": ["*"]
+    for everything); the latest state of matching jobs is replayed on subscribe.
+    """
     print(f"🔌 WebSocket connection attempt from {websocket.client}")
     await manager.connect(websocket)
     print(f"✅ WebSocket connected. Total connections: {len(manager.active_connections)}")
     try:
         while True:
-            # Keep the connection alive and handle any incoming messages
             data = await websocket.receive_text()
-            print(f"📨 Received WebSocket message: {data}")
-            # You can handle client messages here if needed
+            try:
+                request = json.loads(data)
+            except ValueError:
+                continue
+            if not isinstance(request, dict) or request.get("type") not in ("subscribe", "unsubscribe"):
+                continue
+
+            topics = list(request.get("topics", []))
+            topics += [job_topic(job_id) for job_id in request.get("job_ids", [])]
+            topics += [f"bill:{bill.upper()}" for bill in request.get("bills", [])]
+
+            if request["type"] == "subscribe":
+                await manager.subscribe(websocket, topics)
+                await manager.send_personal_message(json.dumps({"type": "subscribed", "topics": topics}), websocket)
+            else:
+                manager.unsubscribe(websocket, topics)
     except WebSocketDisconnect:
         print(f"🔌 WebSocket disconnected from {websocket.client}")
         manager.disconnect(websocket)
     except Exception as e:
         print(f"❌ WebSocket error: {e}")
         manager.disconnect(websocket)
-
@@ -0,0 +1,42 @@
+from src.answer_cache import SemanticAnswerCache, normalize_query
+
+
+def _embed(texts):
+    # Bag of words over a tiny vocabulary; paraphrases share most words
+    vocabulary = ["appropriate", "appropriation", "does", "hb727", "hb728", "what", "how", "much", "budget"]
+    return [[float(word in text.split()) for word in vocabulary] for text in texts]
+
+
+def test_exact_and_semantic_hits_respect_scope_and_identifiers():
+    cache = SemanticAnswerCache(_embed, similarity_threshold=0.8)
+    cache.store("What does HB727 appropriate?", "query", ["bills"], {"answer": "HB727 answer"})
+
+    exact = cache.lookup("what does hb727 appropriate", "query", ["bills"])
+    assert exact["answer"] == "HB727 answer"
+    assert exact["cache"]["hit"] and exact["cache"]["similarity"] == 1.0
+
+    similar = cache.lookup("What does HB727 appropriate budget", "query", ["bills"])
+    assert similar["answer"] == "HB727 answer"
+    assert 0.8 <= similar["cache"]["similarity"] < 1.0
+
+    # A different bill number, collection set or pipeline never matches
+    assert cache.lookup("What does HB728 appropriate?", "query", ["bills"]) is None
+    assert cache.lookup("What does HB727 appropriate?", "query", ["bills", "budget"]) is None
+    assert cache.lookup("What does HB727 appropriate?", "chat-with-pdf", ["bills"]) is None
+
+    # Hits are copies
+    exact["answer"] = "changed"
+    assert cache.lookup("What does HB727 appropriate?", "query", ["bills"])["answer"] == "HB727 answer"
+
+
+def test_ttl_and_reingest_invalidation():
+    cache = SemanticAnswerCache(_embed, ttl_seconds=0)
+    cache.store("What does HB727 appropriate?", "query", ["bills"], {"answer": "a"})
+    assert cache.lookup("What does HB727 appropriate?", "query", ["bills"]) is None
+
+    cache = SemanticAnswerCache(_embed)
+    cache.store("What does HB727 appropriate?", "query", ["bills", "budget"], {"answer": "a"})
+    cache.invalidate_collection("budget")
+    assert cache.lookup("What does HB727 appropriate?", "query", ["bills", "budget"]) is None
+    assert cache.metrics()["entries"] == 0
+    assert normalize_query("  What   does HB-727?  ") == "what does hb 727"
@@ -0,0 +1,52 @@
+from sqlalchemy import text
+
+from database.connection import DatabaseManager
+from database.models import AuditLog
+import auth.audit_sink as audit_sink_module
+from auth.audit_sink import AuditLogSink
+
+
+def _memory_db(monkeypatch):
+    manager = DatabaseManager("sqlite://")
+    manager.create_tables()
+    monkeypatch.setattr(audit_sink_module, "db_manager", manager)
+    return manager
+
+
+def _actions(manager):
+    with manager.get_session() as session:
+        return [row.action for row in session.query(AuditLog).order_by(AuditLog.id)]
+
+
+def test_background_writer_batches_and_flushes_on_stop(monkeypatch):
+    manager = _memory_db(monkeypatch)
+    sink = AuditLogSink(batch_size=50, flush_interval_seconds=0.05)
+    sink.start()
+    for i in range(120):
+        sink.add(sink.make_entry(user_id=None, action=f"access_granted_{i}", resource="tool"))
+    sink.stop()
+
+    assert _actions(manager) == [f"access_granted_{i}" for i in range(120)]
+    metrics = sink.metrics()
+    assert metrics["written"] == 120
+    assert metrics["dropped"] == 0 and metrics["failed"] == 0
+    assert metrics["batches"] < 120
+    assert not metrics["running"]
+
+
+def test_session_entries_follow_the_transaction(monkeypatch):
+    manager = _memory_db(monkeypatch)
+    other = DatabaseManager("sqlite://")
+    entry = audit_sink_module.audit_sink.make_entry
+
+    session = other.get_session_sync()
+    session.execute(text("SELECT 1"))
+    audit_sink_module.audit_sink.add(entry(user_id=1, action="permission_revoked"), session=session)
+    session.rollback()
+    session.execute(text("SELECT 1"))
+    audit_sink_module.audit_sink.add(entry(user_id=1, action="permission_granted"), session=session)
+    assert _actions(manager) == []
+    session.commit()
+    session.close()
+
+    assert _actions(manager) == ["permission_granted"]
@@ -0,0 +1,71 @@
+import json
+
+from src.fiscal_notes.bill_status_index import BillStatusIndex
+
+
+def _make_bill(root, name, with_notes):
+    notes_dir = root / name / "fiscal_notes"
+    notes_dir.mkdir(parents=True)
+    if with_notes:
+        (notes_dir / "note.json").write_text("{}")
+
+
+def test_listing_statuses_and_etag(tmp_path):
+    _make_bill(tmp_path, "HB_1_2025", with_notes=True)
+    _make_bill(tmp_path, "HB_2_2025", with_notes=False)
+    (tmp_path / "september_archive").mkdir()
+    (tmp_path / "__pycache__").mkdir()
+
+    index = BillStatusIndex(tmp_path, exclude={"september_archive"})
+    body, etag = index.listing(generating={"HB_2_2025"})
+    statuses = {entry["name"]: entry["status"] for entry in json.loads(body)}
+    assert statuses == {"HB_1_2025": "ready", "HB_2_2025": "generating"}
+
+    # Same state -> same ETag; job finishing -> new ETag
+    assert index.listing(generating={"HB_2_2025"})[1] == etag
+    body, new_etag = index.listing(generating=set())
+    assert new_etag != etag
+    assert {entry["name"]: entry["status"] for entry in json.loads(body)}["HB_2_2025"] == "error"
+
+
+def test_mark_picks_up_job_transitions(tmp_path):
+    _make_bill(tmp_path, "SB_5_2025", with_notes=False)
+    index = BillStatusIndex(tmp_path, rescan_seconds=3600)
+    assert json.loads(index.listing(set())[0]) == [{"name": "SB_5_2025", "status": "error"}]
+
+    (tmp_path / "SB_5_2025" / "fiscal_notes" / "note.json").write_text("{}")
+    index.mark("SB_5_2025")
+    assert json.loads(index.listing(set())[0]) == [{"name": "SB_5_2025", "status": "ready"}]
+
+
+def test_listing_while_bills_are_marked_from_another_thread(tmp_path):
+    import sys
+    import threading
+
+    index = BillStatusIndex(tmp_path)
+    index.listing(generating=set())
+    errors, done = [], threading.Event()
+
+    def list_repeatedly():
+        while not done.is_set():
+            try:
+                index.listing(generating=set(index.bill_names()[:1]))
+            except Exception as e:
+                errors.append(e)
+                return
+
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # Interleave the threads as often as possible
+    try:
+        reader = threading.Thread(target=list_repeatedly)
+        reader.start()
+        for i in range(300):
+            _make_bill(tmp_path, f"HB_{i}_2025", with_notes=bool(i % 2))
+            index.mark(f"HB_{i}_2025")
+        done.set()
+        reader.join()
+    finally:
+        sys.setswitchinterval(switch_interval)
+
+    assert errors == []
+    assert len(json.loads(index.listing(generating=set())[0])) == 300
@@ -0,0 +1,52 @@
+import importlib
+
+import pytest
+
+pytest.importorskip("chromadb")
+pytest.importorskip("google.generativeai")
+
+
+@pytest.fixture
+def embeddings(tmp_path, monkeypatch):
+    # settings creates chroma_db_path (relative to the working directory) on import
+    (tmp_path / "chroma_db").mkdir()
+    monkeypatch.chdir(tmp_path)
+    return importlib.import_module("src.documents.embeddings")
+
+
+def test_session_collections_are_bounded(embeddings):
+    registry = embeddings.CollectionRegistry(pinned=["bills"], max_open=2, idle_seconds=3600)
+    registry["bills"] = object()
+    for i in range(5):
+        registry[f"session_{i}"] = object()
+
+    assert list(registry) == ["bills", "session_3", "session_4"]
+
+
+def test_embedded_client_bounds_loaded_segments_by_default(embeddings, monkeypatch):
+    client_settings = embeddings._persistent_client_settings()
+    assert client_settings["chroma_segment_cache_policy"] == "LRU"
+    assert client_settings["chroma_memory_limit_bytes"] > 0
+
+    monkeypatch.setattr(embeddings.settings, "chroma_memory_limit_bytes", 0, raising=False)
+    assert "chroma_segment_cache_policy" not in embeddings._persistent_client_settings()
+
+
+def test_lookups_are_not_blocked_while_a_collection_opens(embeddings, monkeypatch):
+    import threading
+
+    registry = embeddings.CollectionRegistry(pinned=["bills"], max_open=2, idle_seconds=3600)
+    bills = registry["bills"] = object()
+    seen = []
+
+    def slow_open(name):
+        reader = threading.Thread(target=lambda: seen.append(registry["bills"]))
+        reader.start()
+        reader.join(timeout=5)
+        return object()
+
+    monkeypatch.setattr(embeddings, "DynamicChromeManager", slow_open)
+    manager = registry.open("session_1")
+
+    assert seen == [bills]
+    assert registry.open("session_1") is manager
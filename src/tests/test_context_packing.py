@@ -0,0 +1,36 @@
+from src.context_packing import ContextPacker, estimate_tokens
+
+
+def _passage(topic, words=80):
+    return " ".join(f"{topic}{i}" for i in range(words))
+
+
+def test_pack_drops_near_duplicates_and_respects_budget():
+    packer = ContextPacker()
+    original = _passage("budget")
+    near_copy = original + " appropriation"
+    other = _passage("fiscal")
+    oversized = _passage("education", words=2000)
+
+    kept = packer.pack([original, near_copy, oversized, other], token_budget=600)
+
+    # The near copy is a duplicate and the oversized passage does not fit
+    assert kept == [0, 3]
+    assert sum(estimate_tokens(p) for p in (original, other)) <= 600
+
+
+def test_fit_document_keeps_opening_and_relevant_passages():
+    packer = ContextPacker()
+    paragraphs = ["HB 727 RELATING TO TAXATION. " + _passage("intro", 40)]
+    paragraphs += [_passage(f"filler{i}x", 60) for i in range(30)]
+    paragraphs.insert(20, "The general excise tax exemption for geothermal energy is repealed. " * 5)
+    document = "\n\n".join(paragraphs)
+
+    fitted = packer.fit_document(document, token_budget=400, query="geothermal excise tax")
+
+    assert estimate_tokens(fitted) < estimate_tokens(document)
+    assert fitted.startswith("HB 727 RELATING TO TAXATION.")
+    assert "geothermal energy is repealed" in fitted
+    assert "CONTENT OMITTED" in fitted
+    # Documents within budget are returned unchanged
+    assert packer.fit_document("short text", token_budget=400) == "short text"
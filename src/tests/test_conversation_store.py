@@ -0,0 +1,92 @@
+import json
+from dataclasses import dataclass, asdict, field
+from typing import List
+
+import pytest
+
+from src.chatbot_engine.conversation_store import (
+    ConversationStore,
+    InMemoryConversationStore,
+    RedisConversationStore,
+    create_conversation_store,
+)
+
+
+@dataclass
+class _State:
+    conversation_id: str
+    context_history: List[str] = field(default_factory=list)
+
+
+class _FakeRedis:
+    def __init__(self):
+        self.values = {}
+        self.expiries = {}
+
+    def pipeline(self, transaction=True):
+        redis = self
+
+        class _Pipeline:
+            def __init__(self):
+                self.calls = []
+
+            def get(self, key):
+                self.calls.append(lambda: redis.values.get(key))
+
+            def expire(self, key, seconds):
+                self.calls.append(lambda: redis.expiries.__setitem__(key, seconds))
+
+            def execute(self):
+                return [call() for call in self.calls]
+
+        return _Pipeline()
+
+    def set(self, key, value, ex=None):
+        self.values[key] = value
+        self.expiries[key] = ex
+
+    def delete(self, key):
+        return 1 if self.values.pop(key, None) is not None else 0
+
+
+def test_memory_store_evicts_least_recently_used():
+    store = InMemoryConversationStore(max_conversations=2, idle_ttl_seconds=60)
+    for conversation_id in ("a", "b"):
+        store.put(_State(conversation_id))
+    assert store.get("a") is not None  # "b" is now least recently used
+    store.put(_State("c"))
+
+    assert store.get("b") is None
+    assert store.get("a") is not None and store.get("c") is not None
+    assert len(store) == 2
+
+
+def test_memory_store_expires_idle_conversations():
+    store = InMemoryConversationStore(max_conversations=10, idle_ttl_seconds=0)
+    store.put(_State("a"))
+    assert store.get("a") is None
+    assert store.delete("a") is False
+
+
+def test_redis_store_round_trips_with_expiry():
+    redis = _FakeRedis()
+    store = RedisConversationStore(redis, asdict, lambda data: _State(**data), idle_ttl_seconds=120)
+    store.put(_State("a", ["Q: hi"]))
+
+    assert json.loads(redis.values["nlp:conversation:a"])["context_history"] == ["Q: hi"]
+    assert store.get("a") == _State("a", ["Q: hi"])
+    assert redis.expiries["nlp:conversation:a"] == 120
+    assert store.delete("a") is True
+    assert store.get("a") is None
+
+
+def test_redis_backend_falls_back_to_memory_without_client():
+    config = {"conversation_store": {"backend": "redis", "max_conversations": 5}}
+    store = create_conversation_store(config, redis_client=None)
+    assert isinstance(store, InMemoryConversationStore)
+    assert store.max_conversations == 5
+
+
+def test_store_interface_is_abstract():
+    with pytest.raises(TypeError):
+        ConversationStore()
@@ -0,0 +1,53 @@
+import json
+import os
+
+from src.chatbot_engine.document_index import SourceDocumentIndex
+
+
+def _write_corpus(path, documents):
+    path.write_text(json.dumps(documents))
+
+
+def test_lookup_by_source_identifier(tmp_path):
+    corpus = tmp_path / "filtered_documents.json"
+    _write_corpus(corpus, [
+        {"url": "https://capitol.hawaii.gov/bills/HB727_.HTM", "text": "Relating to taxation. ☀"},
+        {"url": "https://capitol.hawaii.gov/bills/SB1_.HTM", "text": "Relating to budget."},
+        {"url": "https://capitol.hawaii.gov/other/HB727_.HTM", "text": "Duplicate identifier"},
+    ])
+
+    index = SourceDocumentIndex(str(corpus))
+    assert index.load()
+    assert len(index) == 2
+    assert index.get("HB727_.HTM") == {
+        "url": "https://capitol.hawaii.gov/bills/HB727_.HTM",
+        "text": "Relating to taxation. ☀",
+    }
+    assert index.get("SB1_.HTM")["text"] == "Relating to budget."
+    assert index.get("missing") is None
+
+    # A second instance reuses the sidecars instead of parsing the corpus
+    os.utime(corpus, (0, 0))
+    reloaded = SourceDocumentIndex(str(corpus))
+    assert reloaded.load()
+    assert reloaded.get("SB1_.HTM")["url"].endswith("SB1_.HTM")
+
+
+def test_sidecars_rebuilt_when_corpus_changes(tmp_path):
+    corpus = tmp_path / "filtered_documents.json"
+    _write_corpus(corpus, [{"url": "a/HB1.HTM", "text": "old"}])
+    SourceDocumentIndex(str(corpus)).load()
+
+    _write_corpus(corpus, [{"url": "a/HB1.HTM", "text": "new text"}])
+    future = os.stat(corpus).st_mtime + 10
+    os.utime(corpus, (future, future))
+
+    index = SourceDocumentIndex(str(corpus))
+    assert index.load()
+    assert index.get("HB1.HTM")["text"] == "new text"
+
+
+def test_missing_corpus(tmp_path):
+    index = SourceDocumentIndex(str(tmp_path / "missing.json"))
+    assert not index.load()
+    assert index.get("anything") is None
@@ -0,0 +1,49 @@
+import numpy as np
+
+from src.chatbot_engine.embedding_store import ChunkEmbeddingStore, chunk_hash
+
+
+def _encoder(calls):
+    def encode(texts):
+        calls.extend(texts)
+        return np.array([[len(text), text.count("a"), 1.0] for text in texts], dtype=np.float32)
+    return encode
+
+
+def test_only_unseen_chunks_are_encoded_and_rows_persist(tmp_path):
+    calls = []
+    store = ChunkEmbeddingStore(str(tmp_path), "test/model")
+    first = store.embeddings_for(["alpha", "beta", "alpha"], _encoder(calls))
+    assert calls == ["alpha", "beta"]
+    assert first.shape == (3, 3)
+    assert np.allclose(np.linalg.norm(first, axis=1), 1.0)
+    assert np.array_equal(first[0], first[2])
+
+    reopened = ChunkEmbeddingStore(str(tmp_path), "test/model")
+    assert reopened.load() and len(reopened) == 2
+    calls.clear()
+    second = reopened.embeddings_for(["beta", "gamma"], _encoder(calls))
+    assert calls == ["gamma"]
+    assert np.array_equal(second[0], first[1])
+    assert isinstance(reopened.embeddings_for(["alpha", "beta", "gamma"], _encoder(calls)), np.memmap)
+
+    # A store built with another model is not reused
+    assert not ChunkEmbeddingStore(str(tmp_path), "other/model").load()
+    assert chunk_hash("alpha") in reopened
+
+
+def test_keys_are_written_once_per_call(tmp_path, monkeypatch):
+    store = ChunkEmbeddingStore(str(tmp_path), "test/model")
+    assert store.rows([]).shape == (0, 0)
+
+    writes = []
+    write_keys = store._write_keys
+    monkeypatch.setattr(store, "_write_keys", lambda: writes.append(1) or write_keys())
+    texts = [f"chunk {i}" for i in range(10)]
+    store.embeddings_for(texts, _encoder([]), batch_size=3)
+    assert len(writes) == 1
+
+    reopened = ChunkEmbeddingStore(str(tmp_path), "test/model")
+    assert reopened.load() and len(reopened) == 10
+    assert reopened.rows([]).shape == (0, 3)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["test_model.f32", "test_model.keys.json"]
@@ -0,0 +1,34 @@
+from src.chatbot_engine.graph_index import CompactGraph
+from src.chatbot_engine.schemas import Triplet
+
+
+def _graph():
+    return CompactGraph.from_triplets([
+        Triplet("HB727", "appropriates", "water grants", "c1"),
+        Triplet("water grants", "administered by", "DLNR", "c2"),
+        Triplet("DLNR", "reports to", "legislature", "c3", confidence=0.5),
+        Triplet("legislature", "convenes", "january", "c4"),
+        Triplet("HB900", "amends", "tax code", "c5"),
+    ])
+
+
+def test_expansion_reaches_new_chunks_within_hops():
+    graph = _graph()
+    assert len(graph) == 5 and len(graph.entities) == 7
+
+    reached, triplet_ids = graph.expand({"c1": 1.0}, max_hops=1, hop_decay=0.5)
+    assert set(reached) == {"c1", "c2"}
+    assert reached["c1"] == 1.0 and reached["c2"] == 0.5
+    assert graph.triplet(triplet_ids[0])[:3] == ("HB727", "appropriates", "water grants")
+
+    reached, _ = graph.expand({"c1": 1.0}, max_hops=3, hop_decay=0.5)
+    assert set(reached) == {"c1", "c2", "c3", "c4"}
+    assert reached["c3"] < reached["c2"]
+
+
+def test_expansion_is_bounded():
+    graph = _graph()
+    reached, triplet_ids = graph.expand({"c1": 1.0}, max_hops=3, max_triplets=2)
+    assert len(triplet_ids) == 2 and set(reached) == {"c1", "c2"}
+    reached, triplet_ids = graph.expand({"unknown": 1.0}, max_hops=2)
+    assert reached == {} and len(triplet_ids) == 0
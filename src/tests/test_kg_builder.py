@@ -0,0 +1,82 @@
+import json
+
+import numpy as np
+import pytest
+
+from src.chatbot_engine.kg_artifact import load_kg_artifact, save_kg_artifact
+from src.chatbot_engine.kg_builder import _parse_triplets, build_graph, build_kg_artifact
+from src.chatbot_engine.schemas import Triplet
+
+
+def _write_corpus(path, texts):
+    path.write_text(json.dumps([
+        {"source_identifier": f"HB{i}", "chunk_id": 0, "chunking_method": "fixed", "text": text}
+        for i, text in enumerate(texts)
+    ]))
+
+
+def _extractor(calls, fail=()):
+    def extract(chunk):
+        calls.append(chunk.id)
+        if chunk.id in fail:
+            raise RuntimeError("quota")
+        return [Triplet(chunk.document_id, "funds", chunk.content.split()[0], chunk.id, 0.9)]
+    return extract
+
+
+def _embed(chunks):
+    return np.eye(len(chunks), 4, dtype=np.float32)
+
+
+def test_build_is_resumable_and_artifact_round_trips(tmp_path):
+    corpus, output = tmp_path / "chunks.json", str(tmp_path / "kg.bin")
+    _write_corpus(corpus, ["Water grants", "water projects", "Tax credits"])
+
+    calls = []
+    build_kg_artifact(str(corpus), output, extract=_extractor(calls, fail={"HB2:0"}), embed=_embed,
+                      embedding_model="test-model", max_workers=2)
+    assert sorted(calls) == ["HB0:0", "HB1:0", "HB2:0"]
+
+    # Only the failed chunk is extracted again
+    calls.clear()
+    build_kg_artifact(str(corpus), output, extract=_extractor(calls), embed=_embed, embedding_model="test-model")
+    assert calls == ["HB2:0"]
+
+    artifact = load_kg_artifact(output)
+    assert artifact.embedding_model == "test-model"
+    assert [chunk.id for chunk in artifact.chunks] == ["HB0:0", "HB1:0", "HB2:0"]
+    assert artifact.chunks[1].content == "water projects"
+    assert artifact.chunks[1].metadata["source_identifier"] == "HB1"
+    assert np.array_equal(artifact.embeddings, _embed(artifact.chunks))
+    # "Water" and "water" are one entity, so HB0's chunk reaches HB1's
+    assert len(artifact.graph) == 3 and len(artifact.graph.entities) == 5
+    reached, _ = artifact.graph.expand({"HB0:0": 1.0}, max_hops=1)
+    assert set(reached) == {"HB0:0", "HB1:0"}
+
+
+def test_malformed_triplets_are_skipped_not_fatal():
+    data = {"triplets": [
+        {"head": "HB727", "relation": "funds", "tail": "water grants", "confidence": "high"},
+        "HB727 funds water grants",
+        {"head": "HB727", "relation": "amends", "tail": None},
+        {"head": "DLNR", "relation": "administers", "tail": "grants", "confidence": 1.5},
+    ]}
+    triplets = _parse_triplets(data, "HB727:0", max_triplets=20)
+    assert [(t.head, t.relation, t.tail, t.confidence) for t in triplets] == [
+        ("HB727", "funds", "water grants", 1.0),
+        ("DLNR", "administers", "grants", 1.0),
+    ]
+    assert _parse_triplets(["not", "an", "object"], "HB727:0", max_triplets=20) == []
+    assert _parse_triplets({"triplets": {"head": "HB727"}}, "HB727:0", max_triplets=20) == []
+
+
+def test_empty_artifacts_load_and_empty_builds_are_refused(tmp_path):
+    output = str(tmp_path / "kg.bin")
+    save_kg_artifact(output, [], build_graph([], {}), np.zeros((0, 4), dtype=np.float32), "test-model")
+    artifact = load_kg_artifact(output)
+    assert artifact.chunks == [] and len(artifact.graph) == 0 and artifact.embeddings.shape == (0, 4)
+
+    corpus = tmp_path / "chunks.json"
+    _write_corpus(corpus, [])
+    with pytest.raises(ValueError):
+        build_kg_artifact(str(corpus), output, extract=_extractor([]), embed=_embed)
@@ -0,0 +1,47 @@
+import json
+import os
+
+from src.documents.primary_document_cache import PrimaryDocumentCache
+
+
+def _write_chunks(directory, name, texts):
+    (directory / name).write_text(json.dumps([{"text": text} for text in texts]))
+
+
+def test_document_is_cached_until_directory_changes(tmp_path, monkeypatch):
+    collection = tmp_path / "session_abc"
+    collection.mkdir()
+    _write_chunks(collection, "a.json", ["First chunk.", "Second chunk."])
+    (collection / "a_metadata.json").write_text("{}")
+
+    cache = PrimaryDocumentCache(root=str(tmp_path), max_documents=1)
+    document = cache.get("session_abc")
+    assert document.text == "First chunk.\n\nSecond chunk."
+    assert document.chunks == ["First chunk.", "Second chunk."]
+    assert document.file_count == 1
+
+    # Follow-up lookups do not read the chunk files again
+    opened = []
+    real_open = open
+    monkeypatch.setattr("builtins.open", lambda *a, **k: opened.append(a[0]) or real_open(*a, **k))
+    assert cache.get("session_abc") is document
+    assert cache.has_chunks("session_abc")
+    assert opened == []
+    monkeypatch.undo()
+
+    # A new chunk file changes the directory mtime and triggers a reload
+    _write_chunks(collection, "b.json", ["Third chunk."])
+    stat = os.stat(collection)
+    os.utime(collection, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert cache.get("session_abc").chunks[-1] == "Third chunk."
+    assert cache.stats()["misses"] == 2
+
+
+def test_missing_empty_and_unsafe_collections(tmp_path):
+    (tmp_path / "empty").mkdir()
+    cache = PrimaryDocumentCache(root=str(tmp_path))
+
+    assert not cache.has_chunks("missing")
+    assert not cache.has_chunks("empty")
+    assert not cache.has_chunks("../empty")
+    assert cache.get("empty") is None
@@ -0,0 +1,129 @@
+import importlib
+import json
+
+import pytest
+
+pytest.importorskip("google.generativeai")
+
+
+class StubModel:
+    """Returns queued responses (or raises queued exceptions) in call order."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = 0
+        self.prompts = []
+
+    def generate_content(self, prompt, generation_config=None):
+        self.calls += 1
+        self.prompts.append(prompt)
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return type("Response", (), {"text": json.dumps(response)})()
+
+
+@pytest.fixture
+def nlp_backend(tmp_path, monkeypatch):
+    # settings creates chroma_db_path (relative to the working directory) on import
+    (tmp_path / "chroma_db").mkdir()
+    monkeypatch.chdir(tmp_path)
+    return importlib.import_module("src.chatbot_engine.nlp_backend")
+
+
+def _backend(module, *responses):
+    backend = module.NLPBackend.__new__(module.NLPBackend)
+    backend.model = StubModel(*responses)
+    backend.collection_names = ["bills"]
+    return backend
+
+
+def _state(module):
+    return module.GlobalState(conversation_id="c1", context_history=[], current_documents=[], decision_history=[])
+
+
+def _plan(**overrides):
+    plan = {
+        "can_answer_immediately": False,
+        "immediate_answer": None,
+        "query_type": "new_document",
+        "num_documents": 5,
+        "retrieve_full_document": True,
+        "search_terms": ["water", "infrastructure", "grants"],
+        "retrieval_method": "dense_encoder",
+        "hypothetical_answer": "The bill appropriates funds for county water infrastructure grants.",
+        "reasoning": "Topic question",
+    }
+    plan.update(overrides)
+    return plan
+
+
+def test_full_plan_in_one_call(nlp_backend):
+    backend = _backend(nlp_backend, _plan())
+    decision, query_gen = backend.plan_query("How much does HB727 give for water grants?", _state(nlp_backend))
+
+    assert backend.model.calls == 1
+    assert (decision.num_documents, decision.retrieve_full_document) == (5, True)
+    assert query_gen.retrieval_method == nlp_backend.RetrievalMethod.DENSE_ENCODER
+    assert query_gen.search_terms[0] == "HB727"
+    assert query_gen.hypothetical_answer.startswith("The bill appropriates")
+
+
+def test_immediate_answer_and_follow_up_skip_query_generation(nlp_backend):
+    backend = _backend(nlp_backend, _plan(can_answer_immediately=True, immediate_answer="Bills need three readings.",
+                                          query_type=None, num_documents=None, search_terms=None))
+    decision, query_gen = backend.plan_query("How many readings does a bill need?", _state(nlp_backend))
+    assert decision.can_answer_immediately and decision.immediate_answer == "Bills need three readings."
+    assert query_gen is None
+
+    backend = _backend(nlp_backend, _plan(query_type="follow_up", num_documents=None, retrieve_full_document=None,
+                                          search_terms=None, retrieval_method=None))
+    decision, query_gen = backend.plan_query("And what about the second one?", _state(nlp_backend))
+    assert decision.query_type == nlp_backend.QueryType.FOLLOW_UP
+    assert query_gen is None
+
+
+def test_incomplete_plan_gets_defaults(nlp_backend):
+    backend = _backend(nlp_backend, _plan(num_documents=None, retrieve_full_document=None, search_terms=None))
+    decision, query_gen = backend.plan_query("What does HB727 fund?", _state(nlp_backend))
+
+    assert (decision.num_documents, decision.retrieve_full_document) == (nlp_backend.DEFAULT_NUM_DOCUMENTS, False)
+    # No search terms in the plan: regex fallback terms, no second model call
+    assert backend.model.calls == 1
+    assert "HB727" in query_gen.search_terms
+
+
+def test_planning_error_falls_back_to_step2(nlp_backend):
+    step2 = {"search_terms": ["SB1367", "healthcare"], "retrieval_method": "keyword_matching", "reasoning": "Bill number"}
+    backend = _backend(nlp_backend, RuntimeError("quota exceeded"), step2)
+    decision, query_gen = backend.plan_query("SB1367 healthcare funding", _state(nlp_backend))
+
+    assert backend.model.calls == 2
+    assert decision.reasoning.startswith("Fallback decision")
+    assert decision.num_documents == nlp_backend.DEFAULT_NUM_DOCUMENTS
+    assert query_gen.retrieval_method == nlp_backend.RetrievalMethod.KEYWORD_MATCHING
+    assert query_gen.search_terms == ["SB1367", "healthcare"]
+
+
+def test_follow_up_after_cache_hit_sees_first_turn(nlp_backend):
+    store_module = importlib.import_module("src.chatbot_engine.conversation_store")
+    cached = {
+        "answer": "HB727 appropriates $5 million for county water infrastructure grants.",
+        "sources": [{"content": "Section 2. There is appropriated ...",
+                     "metadata": {"id": "HB727_chunk_3", "source_identifier": "HB727"}}],
+    }
+    backend = _backend(nlp_backend, _plan(query_type="follow_up", num_documents=None, retrieve_full_document=None,
+                                          search_terms=None, retrieval_method=None),
+                       "The grants are administered by the counties.")
+    backend.merged_planning = True
+    backend.conversation_store = store_module.InMemoryConversationStore()
+
+    backend.record_cached_turn("api_session_new", "How much does HB727 give for water grants?", cached)
+    state = backend.conversation_store.get("api_session_new")
+    assert state.current_documents == ["HB727_chunk_3"]
+    assert state.source_references[0]["source_identifier"] == "HB727"
+
+    backend.process_query("Who administers them?", conversation_id="api_session_new")
+    answer_prompt = backend.model.prompts[-1]
+    assert "Q: How much does HB727 give for water grants?" in answer_prompt
+    assert "A: HB727 appropriates $5 million" in answer_prompt
@@ -0,0 +1,59 @@
+from src.chatbot_engine.reranker import FeatureReranker, LLMReranker, Reranker, _identifiers, create_reranker
+
+
+def _chunk(content, identifier="", score=None):
+    chunk = {"content": content, "metadata": {"source_identifier": identifier}, "source": "chunk"}
+    if score is not None:
+        chunk["score"] = score
+    return chunk
+
+
+def test_feature_reranker_orders_by_query_relevance():
+    items = [
+        _chunk("The committee met to discuss parking rules at the capitol."),
+        _chunk("Relating to water infrastructure grants for counties.", "HB728"),
+        _chunk("Appropriates $5,000,000 for water infrastructure grants.", "HB727"),
+    ]
+    reranked = FeatureReranker().rerank("How much does HB727 appropriate for water infrastructure?", items)
+
+    assert reranked[0]["metadata"]["source_identifier"] == "HB727"
+    assert reranked[-1]["content"].startswith("The committee")
+    assert [item["rerank_position"] for item in reranked] == [1, 2, 3]
+    assert "rerank_position" not in items[0]
+
+
+def test_identifiers_and_dense_score():
+    assert _identifiers("Does HB 727 take effect in 2025, like Act 310 and SB1367?") == {
+        "hb727", "2025", "act310", "sb1367"
+    }
+    assert _identifiers("section 5 of part 12") == {"12"}
+
+    # Lexically identical candidates are ordered by their first-stage similarity
+    items = [_chunk("water grants", score=0.2), _chunk("water grants", score=0.9)]
+    reranked = FeatureReranker().rerank("water grants", items)
+    assert [item["score"] for item in reranked] == [0.9, 0.2]
+
+
+def test_candidates_beyond_limits_keep_retrieval_order():
+    items = [_chunk(f"filler text {i}") for i in range(5)] + [_chunk("water grants")]
+    reranked = FeatureReranker(max_candidates=3).rerank("water grants", items)
+    assert [item["content"] for item in reranked[3:]] == ["filler text 3", "filler text 4", "water grants"]
+
+    # An exhausted latency budget still scores the first batch
+    reranked = FeatureReranker(batch_size=2, latency_budget_ms=0).rerank("water grants", items)
+    assert "rerank_score" in reranked[0] and "rerank_score" not in reranked[-1]
+    assert len(reranked) == len(items)
+
+
+def test_create_reranker_modes():
+    class Model:
+        def generate_content(self, prompt):
+            return type("Response", (), {"text": '```json\n{"rankings": [2, 1]}\n```'})()
+
+    assert isinstance(create_reranker({}), FeatureReranker)
+    assert type(create_reranker({"reranker": {"mode": "none"}})) is Reranker
+    assert isinstance(create_reranker({"reranker": {"mode": "llm"}}), FeatureReranker)
+
+    llm = create_reranker({"reranker": {"mode": "llm"}}, Model())
+    assert isinstance(llm, LLMReranker)
+    assert [item["content"] for item in llm.rerank("q", [_chunk("a"), _chunk("b")])] == ["b", "a"]
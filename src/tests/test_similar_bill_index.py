@@ -0,0 +1,68 @@
+import numpy as np
+
+from src.bill_data import similar_bill_index
+from src.bill_data.similar_bill_index import SimilarBillIndex, resolve_bill_name
+
+
+def _corpus(n, dims=16, seed=0):
+    rng = np.random.default_rng(seed)
+    names = [f"HB{i}_" for i in range(n)]
+    summaries = [f"summary {i}" for i in range(n)]
+    return names, summaries, rng.random((n, dims)), rng.random((n, dims))
+
+
+def test_resolve_bill_name_is_deterministic():
+    name_to_index = {"HB72_": 0, "HB727_": 1, "HB1727_": 2}
+    assert resolve_bill_name("hb727_", name_to_index) == 1
+    # Partial match prefers prefix matches, then the shortest name
+    assert resolve_bill_name("HB72", name_to_index) == 0
+    assert resolve_bill_name("727", name_to_index) == 1
+    assert resolve_bill_name("SB1", name_to_index) == -1
+
+
+def test_lookup_excludes_self_and_sorts_scores(tmp_path):
+    names, summaries, tfidf, embeddings = _corpus(30)
+    index = SimilarBillIndex(str(tmp_path / "index.npz"), top_n=5)
+    index.build(names, summaries, tfidf, embeddings)
+
+    tfidf_results, vector_results, search_bill = index.lookup("HB3_")
+    assert search_bill["bill_name"] == "HB3_"
+    assert len(tfidf_results) == 5
+    assert "HB3_" not in [r["bill_name"] for r in tfidf_results + vector_results]
+    scores = [r["score"] for r in tfidf_results]
+    assert scores == sorted(scores, reverse=True)
+    assert index.lookup("SB999_") == (None, None, None)
+
+
+def test_incremental_refresh_matches_full_build(tmp_path):
+    names, summaries, tfidf, embeddings = _corpus(40, seed=1)
+    index_file = str(tmp_path / "index.npz")
+
+    index = SimilarBillIndex(index_file, top_n=4)
+    index.build(names[:25], summaries[:25], tfidf[:25], embeddings[:25])
+    index.save()
+
+    refreshed = SimilarBillIndex(index_file, top_n=4)
+    assert refreshed.load()
+    assert refreshed.refresh(names, summaries, tfidf, embeddings) == 15
+
+    full = SimilarBillIndex(index_file, top_n=4)
+    full.build(names, summaries, tfidf, embeddings)
+
+    np.testing.assert_array_equal(refreshed.tfidf_neighbors, full.tfidf_neighbors)
+    np.testing.assert_array_equal(refreshed.embedding_neighbors, full.embedding_neighbors)
+    np.testing.assert_allclose(refreshed.tfidf_scores, full.tfidf_scores, rtol=1e-5)
+
+
+def test_partial_name_memo_is_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(similar_bill_index, "MAX_RESOLVED_NAMES", 3)
+    names, summaries, tfidf, embeddings = _corpus(30)
+    index = SimilarBillIndex(str(tmp_path / "index.npz"), top_n=5)
+    index.build(names, summaries, tfidf, embeddings)
+
+    for query in ["SB1", "HB2", "SB2", "SB3"]:
+        index.resolve(query)
+    assert list(index._resolved) == ["HB2", "SB2", "SB3"]
+    assert index.resolve("hb2") == index.name_to_index["HB2_"]
+    index.resolve("SB4")
+    assert list(index._resolved) == ["SB3", "HB2", "SB4"]
@@ -0,0 +1,85 @@
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from src.auth.token_cache import VerifiedTokenCache
+from database.models import Base, User
+
+
+def _session_factory():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    return engine, sessionmaker(bind=engine)
+
+
+def _claims(**overrides):
+    claims = {
+        "auth0_user_id": "auth0|123",
+        "email": "staff@example.com",
+        "email_verified": True,
+        "display_name": "Staff",
+        "exp": time.time() + 3600,
+    }
+    claims.update(overrides)
+    return claims
+
+
+def test_claims_expire_at_token_exp():
+    cache = VerifiedTokenCache()
+    cache.put_claims("token-a", _claims())
+    assert cache.get_claims("token-a")["email"] == "staff@example.com"
+    assert cache.get_claims("token-b") is None
+
+    cache.put_claims("expired", _claims(exp=time.time() - 1))
+    assert cache.get_claims("expired") is None
+
+
+def test_cached_user_is_attached_without_queries():
+    engine, Session = _session_factory()
+    with Session() as session:
+        user = User(auth0_user_id="auth0|123", email="staff@example.com", email_verified=True)
+        session.add(user)
+        session.commit()
+        cache = VerifiedTokenCache()
+        cache.put_user(_claims(), user, ["fiscal-note-generation"])
+        user_id = user.id
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    with Session() as session:
+        cached = cache.get_user(_claims(), session)
+        assert cached.id == user_id
+        assert cached.email == "staff@example.com"
+        assert cached in session
+    assert statements == []
+    assert cache.get_permissions(user_id) == frozenset({"fiscal-note-generation"})
+
+
+def test_changed_claims_and_invalidation_force_resync():
+    engine, Session = _session_factory()
+    with Session() as session:
+        user = User(auth0_user_id="auth0|123", email="staff@example.com")
+        session.add(user)
+        session.commit()
+        cache = VerifiedTokenCache()
+        cache.put_user(_claims(), user, [])
+
+        assert cache.get_user(_claims(email_verified=False), session) is None
+
+        cache.put_user(_claims(), user, [])
+        cache.invalidate_user(user.id)
+        assert cache.get_user(_claims(), session) is None
+        assert cache.get_permissions(user.id) is None
+
+
+def test_user_id_index_is_bounded():
+    cache = VerifiedTokenCache(max_entries=2)
+    for user_id in range(1, 6):
+        user = User(id=user_id, auth0_user_id=f"auth0|{user_id}", email=f"user{user_id}@example.com")
+        cache.put_user(_claims(auth0_user_id=f"auth0|{user_id}"), user, ["fiscal-note-generation"])
+
+    assert len(cache._user_ids) == 2
+    assert cache.get_permissions(1) is None
+    assert cache.get_permissions(5) == frozenset({"fiscal-note-generation"})
@@ -0,0 +1,44 @@
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from src.bill_data.bill_similarity_search import BillSimilaritySearcher
+from src.bill_data.vectorize_bills import DEFAULT_TFIDF_PARAMS, TfidfProjector, vectorize_bills
+
+SUMMARIES = [
+    "Appropriates funds for the department of education school repairs.",
+    "Relating to housing; establishes a rental assistance program.",
+    "Appropriates funds for affordable housing development.",
+    "Relating to taxation; amends the general excise tax exemption.",
+]
+
+
+def _bills(start, summaries):
+    return [
+        {"bill_name": f"HB{start + i}_", "url": "", "summary": text, "gemini_embedding": [float(i + 1), 1.0, 0.5]}
+        for i, text in enumerate(summaries)
+    ]
+
+
+def test_projection_matches_sklearn_fit():
+    projector = TfidfProjector.fit(SUMMARIES)
+    params = dict(DEFAULT_TFIDF_PARAMS, ngram_range=(1, 1))
+    expected = TfidfVectorizer(**params).fit_transform(SUMMARIES).toarray()
+    np.testing.assert_allclose(projector.transform(SUMMARIES), expected, rtol=1e-5, atol=1e-6)
+
+
+def test_vectorize_appends_only_new_bills(tmp_path):
+    store_dir = str(tmp_path / "vectors")
+
+    assert vectorize_bills(_bills(1, SUMMARIES[:3]), store_dir) == 3
+    # Re-running with an overlapping batch only appends the unseen bill
+    assert vectorize_bills(_bills(1, SUMMARIES), store_dir) == 1
+
+    searcher = BillSimilaritySearcher(store_dir)
+    searcher.load_data()
+    assert [doc["bill_name"] for doc in searcher.documents] == ["HB1_", "HB2_", "HB3_", "HB4_"]
+    assert searcher.tfidf_vectors.shape[0] == 4
+    assert searcher.embeddings.shape == (4, 3)
+
+    # The appended bill lives in the space fitted on the first batch
+    projector = TfidfProjector.fit(SUMMARIES[:3])
+    np.testing.assert_allclose(searcher.tfidf_vectors[3], projector.transform(SUMMARIES[3:])[0], atol=1e-6)